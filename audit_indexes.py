@@ -0,0 +1,84 @@
+"""
+索引审计脚本
+
+此脚本用于：
+- 对应用的热点查询执行 EXPLAIN QUERY PLAN
+- 标记出没有使用索引的全表扫描
+- 发现扫描时以非零状态退出，便于在部署前拦截性能回退
+
+用法：
+    python audit_indexes.py
+"""
+
+import sys
+import logging
+from flask import Flask
+from sqlalchemy import text
+from common.config import init_app
+from common.db_setup import db, init_db
+
+# 创建临时Flask应用
+app = Flask(__name__)
+init_app(app)
+init_db(app)
+
+
+def hot_queries():
+    """
+    应用中的热点查询: (说明, 模型, WHERE及之后的SQL片段, 参数)
+    """
+    from common.UserInformation import User, UserApply, OAuthClient
+    from models import UserData
+
+    return [
+        ('按用户名查询用户', User, 'WHERE username = :v', {'v': 'x'}),
+        ('按api_token查询用户', User, 'WHERE api_token = :v', {'v': 'x'}),
+        ('用户列表分页', User, 'WHERE id > :v ORDER BY id LIMIT 51', {'v': 0}),
+        ('按用户名前缀分页', User, 'WHERE username >= :a AND username < :b AND username > :c ORDER BY username LIMIT 51',
+         {'a': 'x', 'b': 'y', 'c': 'x'}),
+        ('按注册时间筛选用户', User, 'WHERE register_time >= :v', {'v': '2024-01-01 00:00:00'}),
+        ('按用户名和权限查询申请', UserApply, 'WHERE username = :u AND permission = :p', {'u': 'x', 'p': 'vip'}),
+        ('待审核队列', UserApply, 'WHERE status IS NULL ORDER BY time DESC, id DESC LIMIT 51', {}),
+        ('按client_id查询启用的客户端', OAuthClient, 'WHERE client_id = :v AND is_active = 1', {'v': 'x'}),
+        ('按创建者查询客户端', OAuthClient, 'WHERE created_by = :v', {'v': 'x'}),
+        ('按用户和键查询数据', UserData, 'WHERE user_id = :u AND data_key = :k', {'u': 'x', 'k': 'x'}),
+        ('用户数据分页', UserData, 'WHERE id > :v ORDER BY id LIMIT 101', {'v': 0}),
+    ]
+
+
+def is_full_scan(detail):
+    """判断查询计划中的一步是否为全表扫描"""
+    detail = detail.upper()
+    return detail.startswith('SCAN') and 'INDEX' not in detail and 'PRIMARY KEY' not in detail
+
+
+def audit():
+    """
+    执行审计
+
+    Returns:
+        int: 发现的全表扫描数量
+    """
+    problems = 0
+    with app.app_context():
+        for description, model, clause, params in hot_queries():
+            engine = db.engines[getattr(model, '__bind_key__', None)]
+            sql = f'EXPLAIN QUERY PLAN SELECT * FROM {model.__tablename__} {clause}'
+            with engine.connect() as conn:
+                plan = [row[-1] for row in conn.execute(text(sql), params)]
+
+            scans = [step for step in plan if is_full_scan(step)]
+            status = '全表扫描' if scans else 'OK'
+            print(f"[{status:^6}] {description}: {' | '.join(plan)}")
+            problems += len(scans)
+
+    return problems
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    problems = audit()
+    if problems:
+        print(f"发现 {problems} 处全表扫描，请运行 migrations/add_hot_lookup_indexes.py 或检查查询。")
+        sys.exit(1)
+    print("所有热点查询均使用了索引。")
@@ -0,0 +1,107 @@
+"""
+令牌验证基准测试脚本
+
+此脚本用于：
+- 测量 TokenManager.verify_token 的单次耗时
+- 对比启用/不启用令牌黑名单检查时的延迟差异
+
+用法：
+    python bench_token_verify.py [次数]
+
+参考结果(单核虚拟机，Python 3.11，本机 Redis 6.2，20000次，三次运行)：
+    无黑名单      mean≈133-139us  p50≈131-138us  p99≈193-250us
+    黑名单检查    mean≈237-325us  p50≈231-320us  p99≈299-585us
+    黑名单检查平均增加约 100-190us，即一次本机Redis往返(MGET)；
+    Redis在其他主机上时增加的是一次网络往返。
+"""
+
+import os
+import sys
+import time
+import statistics
+from uuid import uuid4
+
+import jwt
+from flask import Flask
+from common.config import config
+from common.client_registry import ClientRegistry, RegisteredClient
+from common.token_manager import TokenManager
+
+# 创建临时Flask应用
+app = Flask(__name__)
+app.config.from_object(config['default'])
+config['default'].init_app(app)
+
+
+class _BenchClient:
+    """基准测试使用的虚拟客户端"""
+    client_id = 'bench-client'
+    client_secret = 'bench-secret-0123456789abcdef0123456789'
+    name = 'bench'
+    redirect_uri = 'http://localhost/'
+    created_by = 'bench'
+    is_active = True
+
+
+def make_token():
+    """直接签发一个访问令牌，避免依赖数据库中的用户"""
+    now = int(time.time())
+    payload = {
+        'type': 'access',
+        'username': 'bench-user',
+        'vip': False,
+        'admin': False,
+        'client_id': _BenchClient.client_id,
+        'jti': uuid4().hex,
+        'exp': now + 3600,
+        'iat': now
+    }
+    return jwt.encode(payload, _BenchClient.client_secret, algorithm='HS256',
+                      headers={'kid': _BenchClient.client_id})
+
+
+def run(iterations, token):
+    """执行验证并返回每次耗时(微秒)"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        TokenManager.verify_token(token)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def report(label, samples):
+    """打印统计结果"""
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<12} mean={statistics.mean(samples):8.1f}us  "
+          f"p50={statistics.median(samples):8.1f}us  p99={p99:8.1f}us")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    with app.app_context():
+        # 预先填充注册表，排除数据库的影响
+        ClientRegistry._clients = {_BenchClient.client_id: RegisteredClient(_BenchClient)}
+        ClientRegistry._loaded_at = time.monotonic()
+        ClientRegistry._loaded_generation = ClientRegistry._generation
+        ClientRegistry._listener_pid = os.getpid()
+
+        token = make_token()
+        redis_store = app.config.get('SESSION_REDIS')
+
+        app.config['SESSION_REDIS'] = None
+        run(min(iterations, 1000), token)
+        baseline = run(iterations, token)
+        report('无黑名单', baseline)
+
+        if redis_store is None:
+            print("未配置 SESSION_REDIS，跳过黑名单检查测试。")
+        else:
+            app.config['SESSION_REDIS'] = redis_store
+            run(min(iterations, 1000), token)
+            with_denylist = run(iterations, token)
+            report('黑名单检查', with_denylist)
+            print(f"黑名单检查平均增加 "
+                  f"{statistics.mean(with_denylist) - statistics.mean(baseline):.1f}us")
@@ -1,11 +1,21 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from uuid import uuid4
+from itertools import islice
+import heapq
 import secrets
 import logging
 from flask import session
 from flask import current_app
 from .db_setup import db
+from .permission_cache import PermissionCache
+from .user_cache import UserInfoCache
+from .password_hasher import PasswordHasher, HashingBusyError
+from .hash_policy import HashPolicy
+from .rate_limiter import LoginRateLimiter
+from .db_engine import is_single_database
+from .server_stats import ServerStats
+from .session_index import SessionIndex
+from .redis_keys import RedisKeyManager
 
 # 用户模型
 class User(db.Model):
@@ -30,6 +40,36 @@ class User(db.Model):
     website = db.Column(db.String(200), nullable=True)
     last_login = db.Column(db.DateTime, nullable=True)
 
+    # 用户列表按注册时间、权限筛选时使用的索引
+    __table_args__ = (
+        db.Index('ix_users_register_time', 'register_time'),
+        db.Index('ix_users_admin_vip', 'admin', 'vip'),
+    )
+
+
+def _invalidate_user_cache(username):
+    """用户数据写入后，使该用户的权限快照和信息缓存失效"""
+    PermissionCache.invalidate(username)
+    UserInfoCache.invalidate(username)
+
+
+def _invalidate_client_cache(client_id):
+    """OAuth客户端变更后，通知所有worker重新加载客户端注册表"""
+    from .client_registry import ClientRegistry
+    ClientRegistry.notify_changed(client_id)
+
+
+def _revoke_user_tokens(username):
+    """撤销用户此前获得的OAuth令牌(令牌中的vip/admin声明已不可信)"""
+    from .token_manager import TokenManager
+    TokenManager.revoke_user_tokens(username)
+
+
+def _revoke_client_tokens(client_id):
+    """撤销客户端此前签发的OAuth令牌"""
+    from .token_manager import TokenManager
+    TokenManager.revoke_client_tokens(client_id)
+
 
 # 用户操作类
 class UserInformation:
@@ -39,7 +79,7 @@ class UserInformation:
         if User.query.filter_by(username=username).first():
             return False, "用户已存在"
 
-        hashed_password = generate_password_hash(password)
+        hashed_password = PasswordHasher.hash_password(password, HashPolicy.get_method())
         new_user = User(
             username=username,
             password_hash=hashed_password,
@@ -51,12 +91,15 @@ class UserInformation:
 
         db.session.add(new_user)
         db.session.commit()
+        _invalidate_user_cache(username)
         return True, "用户注册成功!"
 
     @staticmethod
     def verify_user(username, password):
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password_hash, password):
+        if user and PasswordHasher.check_password(user.password_hash, password):
+            if HashPolicy.needs_rehash(user.password_hash):
+                UserInformation._rehash_password(user, password)
             return {
                 "username": user.username,
                 "vip": user.vip,
@@ -64,6 +107,19 @@ class UserInformation:
             }
         return None
     
+    @staticmethod
+    def _rehash_password(user, password):
+        """登录成功后按当前哈希策略重新生成密码哈希，失败不影响登录"""
+        try:
+            user.password_hash = PasswordHasher.hash_password(password, HashPolicy.get_method())
+            db.session.commit()
+        except HashingBusyError:
+            # 工作池繁忙时跳过，下次登录再升级
+            pass
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"升级用户 {user.username} 的密码哈希失败: {e}")
+    
     @staticmethod
     def refresh_user_session(username):
         """
@@ -97,9 +153,13 @@ class UserInformation:
 
     @staticmethod
     def get_user_info(username):
+        cached, cache_version = UserInfoCache.get(username)
+        if cached is not None:
+            return cached
+
         user = User.query.filter_by(username=username).first()
         if user:
-            return {
+            user_info = {
                 "username": user.username,
                 "vip": user.vip,
                 "admin": user.admin,
@@ -114,6 +174,8 @@ class UserInformation:
                 "last_login": user.last_login.strftime('%Y-%m-%d %H:%M:%S') if user.last_login else None,
                 "api_token": user.api_token
             }
+            UserInfoCache.set(username, user_info, cache_version)
+            return user_info
         return None
 
     @staticmethod
@@ -135,6 +197,7 @@ class UserInformation:
                     setattr(user, field, profile_data[field])
             
             db.session.commit()
+            _invalidate_user_cache(username)
             return True, "个人信息更新成功"
         except Exception as e:
             db.session.rollback()
@@ -156,6 +219,7 @@ class UserInformation:
                     client.is_active = kwargs['is_active']
                 db.session.add(client)
                 db.session.commit()
+                _invalidate_client_cache(client.client_id)
                 return True, "OAuth客户端创建成功", client
                 
             elif action == 'update':
@@ -167,10 +231,15 @@ class UserInformation:
                 client.redirect_uri = kwargs['redirect_uri']
                 
                 # 处理 is_active 字段
+                was_active = client.is_active
                 if 'is_active' in kwargs:
                     client.is_active = kwargs['is_active']
                     
                 db.session.commit()
+                if was_active and not client.is_active:
+                    # 停用的客户端重新启用后，之前签发的令牌也不再有效
+                    _revoke_client_tokens(client.client_id)
+                _invalidate_client_cache(client.client_id)
                 return True, "OAuth客户端更新成功", client
                 
             elif action == 'delete':
@@ -180,6 +249,8 @@ class UserInformation:
                     
                 db.session.delete(client)
                 db.session.commit()
+                _revoke_client_tokens(kwargs['client_id'])
+                _invalidate_client_cache(kwargs['client_id'])
                 return True, "OAuth客户端删除成功", None
                 
             elif action == 'list':
@@ -194,7 +265,7 @@ class UserInformation:
 
     @staticmethod
     def get_users_name_list():
-        users = User.query.all()
+        users = User.query.with_entities(User.username).all()
         user_list = []
         for user in users:
             user_list.append(user.username)
@@ -202,7 +273,7 @@ class UserInformation:
 
     @staticmethod
     def get_users_info_list():
-        users = User.query.all()
+        users = User.query.with_entities(User.username, User.vip, User.admin, User.register_time).all()
         user_list = []
         for user in users:
             user_list.append({
@@ -213,20 +284,144 @@ class UserInformation:
             })
         return user_list
 
+    @staticmethod
+    def _prefix_upper_bound(prefix):
+        """
+        以prefix开头的字符串的上界(不含)：把最后一个字符换成下一个码点
+
+        Returns:
+            Optional[str]: 上界，prefix全部由最大码点组成时返回None(没有上界)
+        """
+        while prefix and ord(prefix[-1]) == 0x10FFFF:
+            prefix = prefix[:-1]
+        if not prefix:
+            return None
+        code_point = ord(prefix[-1]) + 1
+        if 0xD800 <= code_point <= 0xDFFF:
+            # 跳过代理区(不能编码为UTF-8)
+            code_point = 0xE000
+        return prefix[:-1] + chr(code_point)
+
+    @staticmethod
+    def list_users(limit=50, cursor=0, username_prefix=None, vip=None, admin=None,
+                   registered_from=None, registered_to=None):
+        """
+        分页、可筛选的用户列表
+
+        按id做键集分页，只查询列表需要的列，每页耗时与用户总数无关。
+        按用户名前缀筛选时改为按username排序和分页，由username上的唯一索引完成范围查找和排序。
+
+        Args:
+            limit: 每页条数(1-500)
+            cursor: 上一页返回的next_cursor(最后一个用户的id；按前缀筛选时为最后一个用户名)
+            username_prefix: 用户名前缀
+            vip: 按vip筛选(True/False/None表示不筛选)
+            admin: 按admin筛选(True/False/None表示不筛选)
+            registered_from: 注册时间下限(datetime或'YYYY-MM-DD HH:MM:SS')
+            registered_to: 注册时间上限(datetime或'YYYY-MM-DD HH:MM:SS')
+
+        Returns:
+            Tuple[list, Optional[int]]: (用户列表, 下一页cursor)
+
+        Raises:
+            ValueError: 参数格式错误
+        """
+        limit = max(1, min(int(limit), 500))
+        query = User.query.with_entities(
+            User.id, User.username, User.vip, User.admin, User.register_time
+        )
+
+        if username_prefix:
+            # 使用范围条件代替LIKE，可以利用username上的唯一索引
+            query = query.filter(User.username >= username_prefix)
+            upper_bound = UserInformation._prefix_upper_bound(username_prefix)
+            if upper_bound is not None:
+                query = query.filter(User.username < upper_bound)
+            # 默认值0表示第一页，其余为上一页最后一个用户名
+            if cursor not in (None, 0, ''):
+                query = query.filter(User.username > str(cursor))
+            order = User.username
+        else:
+            query = query.filter(User.id > int(cursor or 0))
+            order = User.id
+        if vip is not None:
+            query = query.filter(User.vip == bool(vip))
+        if admin is not None:
+            query = query.filter(User.admin == bool(admin))
+        if registered_from:
+            if isinstance(registered_from, str):
+                registered_from = datetime.strptime(registered_from, '%Y-%m-%d %H:%M:%S')
+            query = query.filter(User.register_time >= registered_from)
+        if registered_to:
+            if isinstance(registered_to, str):
+                registered_to = datetime.strptime(registered_to, '%Y-%m-%d %H:%M:%S')
+            query = query.filter(User.register_time <= registered_to)
+
+        rows = query.order_by(order).limit(limit + 1).all()
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = last.username if username_prefix else last.id
+        else:
+            next_cursor = None
+        user_list = [
+            {
+                "id": user.id,
+                "username": user.username,
+                "vip": user.vip,
+                "admin": user.admin,
+                "register_time": user.register_time.strftime('%Y-%m-%d %H:%M:%S') if user.register_time else None,
+            }
+            for user in rows[:limit]
+        ]
+        return user_list, next_cursor
+
     @staticmethod
     def delete_user(username):
         user = User.query.filter_by(username=username).first()
         if user:
             db.session.delete(user)
             db.session.commit()
+            SessionIndex.revoke_all(username)
+            _revoke_user_tokens(username)
+            _invalidate_user_cache(username)
             return True, "用户删除成功"
         return False, "用户不存在"
 
+    @staticmethod
+    def logout_everywhere(username):
+        """
+        注销用户在所有设备上的会话和OAuth令牌，并清除 force_logout 标记
+
+        Args:
+            username: 用户名
+
+        Returns:
+            Tuple[bool, str]: (是否成功, 提示信息)
+        """
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            return False, "用户不存在"
+        if user.force_logout:
+            user.force_logout = False
+            db.session.commit()
+        count = SessionIndex.revoke_all(username)
+        _revoke_user_tokens(username)
+        # 版本号变化后，其他worker会重新校验已缓存的会话
+        PermissionCache.invalidate(username)
+        return True, f"已注销用户 {username} 的 {count} 个会话"
+
     @staticmethod
     def get_server_info():
+        # 统计数据来自缓存的快照，不在每次调用时扫描用户表
+        stats = ServerStats.get()
         server_info = { 
-            "users_num": User.query.count(),
+            "users_num": stats["users"]["total"],
+            "stats": stats,
             "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "user_info_cache": UserInfoCache.get_stats(),
+            "password_hasher": PasswordHasher.get_metrics(),
+            "login_throttled": LoginRateLimiter.get_throttled_counts(),
+            "redis_keys": RedisKeyManager.get_report(current_app.config.get('SESSION_REDIS')),
             "smtp_settings": {
                 "host": current_app.config.get('MAIL_SERVER'),
                 "port": current_app.config.get('MAIL_PORT'),
@@ -254,6 +449,10 @@ class OAuthClient(db.Model):
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     is_active = db.Column(db.Boolean, default=True, nullable=False)  # 控制客户端是否启用
 
+    __table_args__ = (
+        db.Index('ix_oauth_clients_created_by', 'created_by'),
+    )
+
 
 # 权限申请模型
 class UserApply(db.Model):
@@ -267,6 +466,11 @@ class UserApply(db.Model):
     reason = db.Column(db.String(150), nullable=False)  
     time = db.Column(db.DateTime, default=db.func.current_timestamp())
 
+    __table_args__ = (
+        db.Index('ix_user_apply_username_permission', 'username', 'permission'),
+        db.Index('ix_user_apply_status_time', 'status', 'time'),
+    )
+
     permissions = ["vip", "admin", "api"]
 
     @classmethod
@@ -292,31 +496,198 @@ class UserApply(db.Model):
         db.session.commit()
         return True, "申请成功，等待管理员审核"
 
+    # 审核队列的状态筛选
+    REVIEW_STATUSES = {'pending': None, 'approved': True, 'rejected': False}
+
+    @staticmethod
+    def _encode_review_cursor(apply):
+        """将审核队列中最后一条申请编码为下一页的cursor"""
+        group = 0 if apply.status is None else 1
+        return f"{group}|{apply.time.strftime('%Y-%m-%d %H:%M:%S')}|{apply.id}"
+
+    @staticmethod
+    def _decode_review_cursor(cursor):
+        """解析cursor为(分组, 时间, id)"""
+        group, time, apply_id = cursor.split('|')
+        return int(group), datetime.strptime(time, '%Y-%m-%d %H:%M:%S'), int(apply_id)
+
     @classmethod
-    def change_apply(cls, username, permission, status, need_entry=True):
-        # 统一状态转换
-        if isinstance(status, str):
-            if status == "True":
-                status = True
-            elif status == "False":
-                status = False
+    def _review_scan(cls, status, permission, limit, after=None):
+        """
+        按申请时间倒序读取一种审核状态的申请
+
+        status是单个值，排序和分页都能直接由 (status, time) 索引完成。
+        单数据库布局下在同一条查询中LEFT JOIN申请人，取得其当前权限。
+
+        Args:
+            status: None(待审核)、True或False
+            permission: 按申请的权限筛选
+            limit: 最多读取的条数
+            after: (time, id)，只读取排在它之后的申请
+
+        Returns:
+            list: [(申请, 申请人(vip, admin, id))]，申请人不存在或分库布局(未加载)时为None
+        """
+        joined = is_single_database(current_app)
+        if joined:
+            query = (db.session.query(cls, User.vip, User.admin, User.id)
+                     .select_from(cls)
+                     .outerjoin(User, User.username == cls.username))
+        else:
+            query = cls.query
+        query = query.filter(cls.status.is_(None) if status is None else cls.status == status)
+        if permission:
+            query = query.filter(cls.permission == permission)
+        if after:
+            last_time, last_id = after
+            query = query.filter(db.or_(
+                cls.time < last_time,
+                db.and_(cls.time == last_time, cls.id < last_id)
+            ))
+        rows = query.order_by(cls.time.desc(), cls.id.desc()).limit(limit).all()
+        if not joined:
+            return [(apply, None) for apply in rows]
+        return [(apply, (vip, admin, user_id) if user_id is not None else None)
+                for apply, vip, admin, user_id in rows]
+
+    @classmethod
+    def review_queue(cls, status='pending', permission=None, limit=50, cursor=None):
+        """
+        审核队列：待审核优先、按申请时间倒序，排序和分页都在SQL中完成
+
+        按(分组, time, id)做键集分页。'all'先读待审核的申请，不足一页时再读已审核的，
+        每次查询只涉及一种状态，都由 (status, time) 索引支撑，
+        打开页面的耗时不随历史申请数量增长。单数据库布局下申请人随申请一起JOIN查出，
+        分库时再用一次IN查询取申请人。
+
+        Args:
+            status: 'pending'、'approved'、'rejected'，或'all'表示全部(待审核在前)
+            permission: 按申请的权限筛选
+            limit: 每页条数(1-200)
+            cursor: 上一页返回的next_cursor
+
+        Returns:
+            Tuple[list, Optional[str]]: (申请列表, 下一页cursor)
+
+        Raises:
+            ValueError: 参数无效
+        """
+        if status != 'all' and status not in cls.REVIEW_STATUSES:
+            raise ValueError(f"无效的状态: {status}")
+        limit = max(1, min(int(limit), 200))
+
+        last_group, after = 0, None
+        if cursor:
+            last_group, last_time, last_id = cls._decode_review_cursor(cursor)
+            after = (last_time, last_id)
+
+        # 多读一条用于判断是否还有下一页
+        size = limit + 1
+        if status != 'all':
+            rows = cls._review_scan(cls.REVIEW_STATUSES[status], permission, size, after)
+        else:
+            rows = []
+            if last_group == 0:
+                rows = cls._review_scan(None, permission, size, after)
+                after = None
+            remaining = size - len(rows)
+            if remaining > 0:
+                # 已审核的申请分别读取通过和拒绝两段索引，再按时间归并
+                reviewed = heapq.merge(
+                    *(cls._review_scan(expected, permission, remaining, after) for expected in (True, False)),
+                    key=lambda row: (row[0].time, row[0].id), reverse=True
+                )
+                rows.extend(islice(reviewed, remaining))
+
+        next_cursor = cls._encode_review_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+        rows = rows[:limit]
+        if not is_single_database(current_app):
+            rows = cls._with_users([apply for apply, _ in rows])
+        return [cls._review_item(apply, user) for apply, user in rows], next_cursor
+
+    @classmethod
+    def count_by_status(cls, permission=None):
+        """
+        按审核状态统计申请数量
+
+        Args:
+            permission: 按申请的权限筛选
+
+        Returns:
+            dict: pending、approved、rejected和total
+        """
+        query = db.session.query(cls.status, db.func.count(cls.id))
+        if permission:
+            query = query.filter(cls.permission == permission)
+        counts = {'pending': 0, 'approved': 0, 'rejected': 0}
+        for status, count in query.group_by(cls.status).all():
+            if status is None:
+                counts['pending'] = count
+            elif status:
+                counts['approved'] = count
             else:
-                return False, "状态无效"
+                counts['rejected'] = count
+        counts['total'] = sum(counts.values())
+        return counts
 
-        if permission not in cls.permissions:
-            return False, "权限不存在"
+    @staticmethod
+    def _with_users(applies):
+        """
+        分库布局下用一次IN查询取申请人当前的权限
 
-        if need_entry == True:
-            apply_entry = cls.query.filter_by(username=username, permission=permission).first()
-            if (not apply_entry):
-                return False, "申请记录不存在"
+        Returns:
+            list: [(申请, 申请人(vip, admin, id)或None)]
+        """
+        if not applies:
+            return []
+        rows = (User.query.with_entities(User.username, User.vip, User.admin, User.id)
+                .filter(User.username.in_({apply.username for apply in applies}))
+                .all())
+        users = {username: (vip, admin, user_id) for username, vip, admin, user_id in rows}
+        return [(apply, users.get(apply.username)) for apply in applies]
 
-            apply_entry.status = status
+    @staticmethod
+    def _review_item(apply, user):
+        """将申请记录和申请人当前权限合并为审核列表项"""
+        vip, admin, user_id = user if user else (None, None, None)
+        return {
+            "id": apply.id,
+            "time": apply.time.strftime('%Y-%m-%d %H:%M:%S') if apply.time else None,
+            "username": apply.username,
+            "permission": apply.permission,
+            "status": apply.status,
+            "reason": apply.reason,
+            "user_exists": user_id is not None,
+            "user_vip": vip,
+            "user_admin": admin,
+        }
 
-        user = User.query.filter_by(username=username).first()
-        if not user:
-            return False, "用户不存在"
+    # 单次批量审核允许的最大决定数
+    BATCH_DECISION_LIMIT = 500
+
+    @staticmethod
+    def _parse_status(status):
+        """
+        统一状态转换，无效时返回None
+
+        与oauth_routes.parse_bool的规则一致：布尔值原样返回，整数1/0，
+        字符串"true"/"1"、"false"/"0"(不区分大小写)。其他值视为无效而不是拒绝。
+        """
+        if isinstance(status, bool):
+            return status
+        if isinstance(status, int) and status in (0, 1):
+            return bool(status)
+        if isinstance(status, str):
+            value = status.strip().lower()
+            if value in ('true', '1'):
+                return True
+            if value in ('false', '0'):
+                return False
+        return None
 
+    @staticmethod
+    def _set_permission(user, permission, status):
+        """将审核结果写入用户权限"""
         if permission == "vip":
             user.vip = status
         elif permission == "admin":
@@ -327,13 +698,119 @@ class UserApply(db.Model):
             else:
                 user.api_token = None
 
-        db.session.commit()
-        return True, "申请状态已更新", status
+    @classmethod
+    def batch_change_apply(cls, decisions, need_entry=True):
+        """
+        批量审核权限申请
+
+        申请记录和用户各用一次IN查询加载，所有修改在同一次提交中完成。
+
+        Args:
+            decisions: [{'username': ..., 'permission': ..., 'status': True/False/1/0/"true"/"false"}, ...]
+            need_entry: 是否要求存在对应的申请记录(直接修改用户权限时为False)
+
+        Returns:
+            Tuple[bool, list]: (是否全部成功, 每项结果
+                [{'username', 'permission', 'status', 'success', 'message'}, ...])
+
+        Raises:
+            ValueError: 决定数量超过 BATCH_DECISION_LIMIT
+        """
+        if len(decisions) > cls.BATCH_DECISION_LIMIT:
+            raise ValueError(f"单次最多审核 {cls.BATCH_DECISION_LIMIT} 条申请")
+
+        results = []
+        pending = []
+        for decision in decisions:
+            username = decision.get('username')
+            permission = decision.get('permission')
+            status = cls._parse_status(decision.get('status'))
+            result = {'username': username, 'permission': permission, 'status': status,
+                      'success': False, 'message': None}
+            results.append(result)
+            if not username:
+                result['message'] = "用户名不能为空"
+            elif status is None:
+                result['message'] = "状态无效"
+            elif permission not in cls.permissions:
+                result['message'] = "权限不存在"
+            else:
+                pending.append(result)
+
+        if not pending:
+            return False, results
+
+        usernames = {result['username'] for result in pending}
+        applies = {}
+        if need_entry:
+            rows = (cls.query
+                    .filter(cls.username.in_(usernames),
+                            cls.permission.in_({result['permission'] for result in pending}))
+                    .order_by(cls.id)
+                    .all())
+            for apply in rows:
+                applies.setdefault((apply.username, apply.permission), apply)
+        users = {user.username: user for user in User.query.filter(User.username.in_(usernames)).all()}
+
+        changed = set()
+        # 被收回vip/admin权限的用户需要重新登录，已获得的令牌也需撤销
+        revoked = set()
+        for result in pending:
+            username, permission, status = result['username'], result['permission'], result['status']
+            apply_entry = applies.get((username, permission))
+            if need_entry and not apply_entry:
+                result['message'] = "申请记录不存在"
+                continue
+
+            user = users.get(username)
+            if not user:
+                result['message'] = "用户不存在"
+                continue
+
+            # 失败的项不做任何修改，避免随本次提交写入一半的状态
+            if apply_entry:
+                apply_entry.status = status
+            if not status and permission in ("vip", "admin") and getattr(user, permission):
+                revoked.add(username)
+            cls._set_permission(user, permission, status)
+            result['success'] = True
+            result['message'] = "申请状态已更新"
+            changed.add(username)
+
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"批量审核权限申请失败: {e}")
+            for result in pending:
+                result['success'] = False
+                result['message'] = f"保存失败: {e}"
+            return False, results
+
+        for username in revoked:
+            SessionIndex.revoke_all(username)
+            _revoke_user_tokens(username)
+        for username in changed:
+            _invalidate_user_cache(username)
+        return all(result['success'] for result in results), results
+
+    @classmethod
+    def change_apply(cls, username, permission, status, need_entry=True):
+        _, results = cls.batch_change_apply(
+            [{'username': username, 'permission': permission, 'status': status}],
+            need_entry=need_entry
+        )
+        result = results[0]
+        if not result['success']:
+            return False, result['message']
+        return True, result['message'], result['status']
 
 
 def initialize_system(app):
     """
-    初始化系统数据库和Redis
+    初始化系统数据库
+
+    不再清空Redis：孤立的键由各worker中的后台线程按命名空间增量清理(RedisKeyManager)，会话得以保留。
     
     Args:
         app: Flask应用实例
@@ -341,15 +818,26 @@ def initialize_system(app):
     with app.app_context():
         db.create_all()
         ensure_user_apply_columns(app)  # 确保数据表有新增字段
+        ensure_indexes(app)  # 确保数据表有热点查询所需的索引
 
-        redis_store = current_app.config.get('SESSION_REDIS')
-        if redis_store:
-            redis_store.flushdb()  # 注意：清空当前数据库，谨慎调用
-            print("Redis 数据库已清空。")
-        else:
-            print("未配置 SESSION_REDIS，跳过清空 Redis 操作。")
+    print("数据库初始化完成。")
 
-    print("数据库和 Redis 初始化完成。")
+
+def ensure_indexes(app):
+    """
+    确保已有的数据表上创建了模型中声明的索引
+    
+    Args:
+        app: Flask应用实例
+    """
+    with app.app_context():
+        for model in (User, OAuthClient, UserApply):
+            engine = db.engines[model.__bind_key__]
+            if not db.inspect(engine).has_table(model.__tablename__):
+                # 表尚未创建，create_all 时会一并创建索引
+                continue
+            for index in model.__table__.indexes:
+                index.create(bind=engine, checkfirst=True)
 
 
 def ensure_user_apply_columns(app):
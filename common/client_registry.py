@@ -0,0 +1,151 @@
+"""
+OAuth客户端注册表模块
+
+这个模块负责：
+- 在进程内保存所有启用的OAuth客户端，按client_id索引
+- 第一次查询时加载，客户端表变化时整体重新加载(表很小)
+- 通过Redis发布/订阅在各worker之间传播变更通知
+"""
+
+import os
+import time
+import logging
+import threading
+from flask import current_app
+
+# 客户端变更通知频道
+CLIENT_CHANNEL = 'oauth_clients:changed'
+# 没有收到通知时的兜底重新加载间隔(秒)
+REGISTRY_MAX_AGE = 300
+
+
+class RegisteredClient:
+    """注册表中的客户端快照，与数据库会话无关，可以跨请求共享"""
+
+    __slots__ = ('client_id', 'client_secret', 'name', 'redirect_uri', 'created_by', 'is_active')
+
+    def __init__(self, client):
+        self.client_id = client.client_id
+        self.client_secret = client.client_secret
+        self.name = client.name
+        self.redirect_uri = client.redirect_uri
+        self.created_by = client.created_by
+        self.is_active = client.is_active
+
+    def validate_redirect_uri(self, redirect_uri):
+        """验证重定向URI是否合法"""
+        return redirect_uri == self.redirect_uri
+
+
+class ClientRegistry:
+    """进程内OAuth客户端注册表"""
+
+    _clients = {}
+    _loaded_at = None
+    # 收到变更通知的次数；与已加载注册表的计数不同时需要重新加载
+    _generation = 0
+    _loaded_generation = None
+    _lock = threading.Lock()
+    _listener_pid = None
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        订阅变更通知；客户端在第一次查询时才加载
+
+        导入时数据表可能尚未创建(新数据库)，因此启动时不查询数据库。
+
+        Args:
+            app: Flask应用实例
+        """
+        cls._ensure_listener(app.config.get('SESSION_REDIS'))
+
+    @classmethod
+    def reload(cls):
+        """从数据库重新加载所有启用的客户端"""
+        from .oauth_models import OAuthClient
+
+        # 先记下计数再查询：查询期间到达的通知会使计数变化，下一次查询时再次加载
+        generation = cls._generation
+        clients = OAuthClient.query.filter_by(is_active=True).all()
+        registry = {client.client_id: RegisteredClient(client) for client in clients}
+        with cls._lock:
+            if cls._loaded_generation is not None and generation < cls._loaded_generation:
+                # 并发的重新加载中已有更新的结果
+                return
+            cls._clients = registry
+            cls._loaded_at = time.monotonic()
+            cls._loaded_generation = generation
+        logging.info(f"OAuth客户端注册表已加载 {len(registry)} 个客户端")
+
+    @classmethod
+    def get(cls, client_id):
+        """
+        获取启用的客户端
+
+        Args:
+            client_id: 客户端ID
+
+        Returns:
+            RegisteredClient: 客户端快照，不存在或已停用时返回None
+        """
+        cls._ensure_listener(current_app.config.get('SESSION_REDIS'))
+        if cls._loaded_generation != cls._generation or time.monotonic() - cls._loaded_at > REGISTRY_MAX_AGE:
+            cls.reload()
+        return cls._clients.get(client_id)
+
+    @classmethod
+    def mark_stale(cls):
+        """标记当前进程的注册表需要重新加载"""
+        with cls._lock:
+            cls._generation += 1
+
+    @classmethod
+    def notify_changed(cls, client_id):
+        """
+        客户端被创建、更新、停用或删除后调用，通知所有worker重新加载
+
+        Args:
+            client_id: 发生变化的客户端ID
+        """
+        cls.mark_stale()
+        redis_store = current_app.config.get('SESSION_REDIS')
+        if not redis_store:
+            return
+        try:
+            redis_store.publish(CLIENT_CHANNEL, client_id)
+        except Exception as e:
+            logging.error(f"发布OAuth客户端变更通知失败: {e}")
+
+    @classmethod
+    def _ensure_listener(cls, redis_store):
+        """确保当前进程已启动订阅线程(fork后的子进程需要重新启动)"""
+        if not redis_store or cls._listener_pid == os.getpid():
+            return
+        with cls._lock:
+            if cls._listener_pid == os.getpid():
+                return
+            cls._listener_pid = os.getpid()
+        thread = threading.Thread(
+            target=cls._listen,
+            args=(redis_store,),
+            name='oauth-client-registry',
+            daemon=True
+        )
+        thread.start()
+
+    @classmethod
+    def _listen(cls, redis_store):
+        """订阅变更频道，收到消息后标记注册表需要重新加载"""
+        while True:
+            try:
+                pubsub = redis_store.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CLIENT_CHANNEL)
+                # 重新订阅期间可能错过了通知
+                cls.mark_stale()
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        cls.mark_stale()
+            except Exception as e:
+                logging.error(f"OAuth客户端变更订阅中断: {e}")
+                time.sleep(5)
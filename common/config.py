@@ -9,12 +9,17 @@
 """
 
 import os
+import stat
 from dotenv import load_dotenv
 
 # 加载.env文件中的环境变量
 load_dotenv()
 import json
+import copy
+import time
 import logging
+import tempfile
+import threading
 from datetime import timedelta
 from typing import Dict, Any, Optional, Union
 import redis
@@ -41,6 +46,19 @@ class Config:
         'apply_db': 'sqlite:///apply.db'
     }
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 单数据库布局：为True时所有bind使用SQLALCHEMY_DATABASE_URI
+    # (先用 migrations/merge_sqlite_binds.py 合并数据)
+    SINGLE_DATABASE = False
+    SQLALCHEMY_POOL_SIZE = 5
+    SQLALCHEMY_MAX_OVERFLOW = 10
+    SQLALCHEMY_POOL_TIMEOUT = 30
+    SQLALCHEMY_POOL_RECYCLE = 3600
+    
+    # SQLite连接参数(每个连接建立时通过PRAGMA设置)
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_MMAP_SIZE = 268435456  # 256MB
+    SQLITE_BUSY_TIMEOUT = 5000  # 毫秒
     
     # Redis配置
     REDIS_PASSWORD = os.environ.get('REDIS_PASSWORD', '') or "123456"
@@ -54,10 +72,39 @@ class Config:
     SESSION_PERMANENT = True
     SESSION_USE_SIGNER = True
     SESSION_KEY_PREFIX = 'user_management:'
+    SESSION_REFRESH_EACH_REQUEST = False  # 会话未修改时不写回Redis
+    
+    # 密码哈希策略，None表示使用werkzeug默认值(可用 python -m common.hash_policy 选择)
+    PASSWORD_HASH_METHOD = None
+    
+    # 登录限流配置(滑动窗口)
+    LOGIN_RATE_LIMIT_WINDOW = 60  # 窗口长度(秒)
+    LOGIN_RATE_LIMIT_PER_USER = 5  # 每个用户名在窗口内允许的尝试次数
+    LOGIN_RATE_LIMIT_PER_IP = 20  # 每个IP在窗口内允许的尝试次数
+    # 服务前面的反向代理层数(nginx -> uWSGI 为1)，按X-Forwarded-For取真实客户端IP；
+    # 直接对外提供服务时设为0，否则客户端可以伪造IP
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 1))
+    
+    # 密码哈希工作池配置
+    PASSWORD_HASH_WORKERS = None  # 每个worker进程的哈希进程数，None表示2；总数为 worker数 × 该值，建议不超过CPU核数
+    PASSWORD_HASH_QUEUE_SIZE = None  # 同时执行和排队的上限，None表示进程数的4倍
+    PASSWORD_HASH_TIMEOUT = 10  # 等待结果的超时时间(秒)
+    
+    # Redis键后台清理配置(SCAN分批，批间暂停)
+    REDIS_CLEANUP_ENABLED = True
+    REDIS_CLEANUP_INTERVAL = 3600  # 两次清理的间隔(秒)
+    REDIS_CLEANUP_BATCH_SIZE = 200  # 每批扫描和删除的键数
+    REDIS_CLEANUP_PAUSE = 0.05  # 批间暂停(秒)
+    
+    # 服务器统计快照的缓存时间(秒)，写操作不使其失效，统计最多滞后这么久
+    SERVER_STATS_TTL = 30
     
     # OAuth配置
     OAUTH_TOKEN_EXPIRES = timedelta(hours=1)
     OAUTH_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # 读取令牌黑名单失败(Redis不可用)时：True放行令牌(可用性优先，已撤销的令牌在此期间仍可用)，
+    # False拒绝所有令牌
+    OAUTH_DENYLIST_FAIL_OPEN = True
     
     # 邮件配置
     MAIL_SERVER = ''
@@ -106,12 +153,12 @@ class Config:
         if db_pool_size is not None:
             Config.SQLALCHEMY_POOL_SIZE = db_pool_size
         
-        # 保存到配置文件
+        # 保存到配置文件(合并到已有设置，保留其他字段)
         config_data = load_server_config()
-        config_data['database_settings'] = {
+        config_data.setdefault('database_settings', {}).update({
             'db_url': Config.SQLALCHEMY_DATABASE_URI,
             'pool_size': getattr(Config, 'SQLALCHEMY_POOL_SIZE', None)
-        }
+        })
         save_server_config(config_data)
 
     @staticmethod
@@ -187,6 +234,7 @@ class Config:
         redis_url = app.config.get('REDIS_URL')
         if redis_url:
             app.config['SESSION_REDIS'] = redis.from_url(redis_url)
+            ServerConfigStore.attach_redis(app.config['SESSION_REDIS'])
         
         # 加载服务器配置
         try:
@@ -218,6 +266,29 @@ class Config:
                     # 只有当配置中有密码时才更新密码
                     if 'password' in smtp_settings:
                         app.config['MAIL_PASSWORD'] = smtp_settings['password']
+                
+                # 更新数据库连接池配置
+                database_settings = server_config.get('database_settings', {})
+                if database_settings.get('pool_size'):
+                    app.config['SQLALCHEMY_POOL_SIZE'] = int(database_settings['pool_size'])
+                # 单数据库布局使用独立的顶层键(兼容旧版写在 database_settings 中的值)
+                single_database = server_config.get('single_database', database_settings.get('single_database'))
+                if single_database is not None:
+                    app.config['SINGLE_DATABASE'] = bool(single_database)
+                
+                # 更新登录限流阈值
+                rate_limit_settings = server_config.get('rate_limit_settings', {})
+                if rate_limit_settings:
+                    app.config.update({
+                        'LOGIN_RATE_LIMIT_WINDOW': rate_limit_settings.get('window_seconds', app.config.get('LOGIN_RATE_LIMIT_WINDOW')),
+                        'LOGIN_RATE_LIMIT_PER_USER': rate_limit_settings.get('max_attempts_per_user', app.config.get('LOGIN_RATE_LIMIT_PER_USER')),
+                        'LOGIN_RATE_LIMIT_PER_IP': rate_limit_settings.get('max_attempts_per_ip', app.config.get('LOGIN_RATE_LIMIT_PER_IP'))
+                    })
+                
+                # 更新密码哈希策略
+                hash_settings = server_config.get('password_hash_settings', {})
+                if hash_settings.get('method'):
+                    app.config['PASSWORD_HASH_METHOD'] = hash_settings['method']
         except Exception as e:
             logging.error(f"加载服务器配置失败: {e}")
 
@@ -274,21 +345,187 @@ config = {
 SERVER_CONFIG_FILE = 'server_config.json'
 
 
+# 服务器配置变更通知频道
+SERVER_CONFIG_CHANNEL = 'server_config:changed'
+# 检查配置文件是否变化的最小间隔(秒)
+SERVER_CONFIG_CHECK_INTERVAL = 1.0
+
+
+class ServerConfigStore:
+    """
+    进程内的服务器配置缓存
+
+    解析后的配置保存在内存中，最多每 SERVER_CONFIG_CHECK_INTERVAL 秒检查一次
+    文件的mtime/inode/大小，变化或收到Redis通知时才重新读取。写入通过临时文件
+    加重命名完成，读取方不会看到写了一半的文件。
+    """
+
+    _data = {}
+    _file_key = None
+    _checked_at = 0.0
+    _stale = True
+    _lock = threading.Lock()
+    _redis = None
+    _listener_pid = None
+
+    @classmethod
+    def attach_redis(cls, redis_store):
+        """设置用于发布/订阅配置变更通知的Redis连接"""
+        cls._redis = redis_store
+
+    @staticmethod
+    def _stat_key():
+        """配置文件的(inode, mtime, size)，文件不存在时返回None"""
+        try:
+            st = os.stat(SERVER_CONFIG_FILE)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    @classmethod
+    def _reload_if_changed(cls):
+        """文件有变化或收到通知时重新读取"""
+        file_key = cls._stat_key()
+        if not cls._stale and file_key == cls._file_key:
+            return
+        # 先清除标记，读取期间到达的通知会触发下一次重新读取
+        cls._stale = False
+        data = {}
+        if file_key is not None:
+            try:
+                with open(SERVER_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                logging.error(f"加载服务器配置文件失败: {e}")
+                # 保留上一次成功加载的配置
+                data = cls._data
+        cls._data = data
+        cls._file_key = file_key
+
+    @classmethod
+    def get(cls) -> Dict[str, Any]:
+        """
+        获取当前配置(只读，调用方不要修改返回的字典)
+
+        Returns:
+            Dict[str, Any]: 服务器配置字典
+        """
+        cls._ensure_listener()
+        now = time.monotonic()
+        if cls._stale or now - cls._checked_at >= SERVER_CONFIG_CHECK_INTERVAL:
+            with cls._lock:
+                if cls._stale or now - cls._checked_at >= SERVER_CONFIG_CHECK_INTERVAL:
+                    cls._reload_if_changed()
+                    cls._checked_at = now
+        return cls._data
+
+    @staticmethod
+    def _file_mode() -> int:
+        """
+        配置文件应有的权限：沿用已有文件的权限，文件不存在时按umask取普通文件的默认权限
+
+        Returns:
+            int: 权限位
+        """
+        try:
+            return stat.S_IMODE(os.stat(SERVER_CONFIG_FILE).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
+
+    @classmethod
+    def save(cls, config_data: Dict[str, Any]) -> bool:
+        """
+        原子写入配置文件并通知其他进程
+
+        Args:
+            config_data: 完整的配置数据
+
+        Returns:
+            bool: 保存是否成功
+        """
+        directory = os.path.dirname(os.path.abspath(SERVER_CONFIG_FILE))
+        tmp_path = None
+        try:
+            with cls._lock:
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory,
+                                                 prefix='.server_config.', suffix='.tmp',
+                                                 delete=False) as f:
+                    tmp_path = f.name
+                    json.dump(config_data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # 临时文件创建时为0600，替换前恢复原文件的权限
+                os.chmod(tmp_path, cls._file_mode())
+                os.replace(tmp_path, SERVER_CONFIG_FILE)
+                tmp_path = None
+                cls._data = copy.deepcopy(config_data)
+                cls._file_key = cls._stat_key()
+                cls._checked_at = time.monotonic()
+                cls._stale = False
+        except Exception as e:
+            logging.error(f"保存服务器配置文件失败: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        if cls._redis:
+            try:
+                cls._redis.publish(SERVER_CONFIG_CHANNEL, str(os.getpid()))
+            except Exception as e:
+                logging.error(f"发布服务器配置变更通知失败: {e}")
+        return True
+
+    @classmethod
+    def _ensure_listener(cls):
+        """确保当前进程已启动订阅线程(fork后的子进程需要重新启动)"""
+        if not cls._redis or cls._listener_pid == os.getpid():
+            return
+        with cls._lock:
+            if cls._listener_pid == os.getpid():
+                return
+            cls._listener_pid = os.getpid()
+        thread = threading.Thread(target=cls._listen, name='server-config-store', daemon=True)
+        thread.start()
+
+    @classmethod
+    def _listen(cls):
+        """订阅变更频道，收到消息后标记配置需要重新读取"""
+        while True:
+            try:
+                pubsub = cls._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(SERVER_CONFIG_CHANNEL)
+                # 重新订阅期间可能错过了通知
+                cls._stale = True
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        cls._stale = True
+            except Exception as e:
+                logging.error(f"服务器配置变更订阅中断: {e}")
+                time.sleep(5)
+
+
+def get_server_config() -> Dict[str, Any]:
+    """
+    获取缓存的服务器配置，供请求热路径只读使用
+
+    Returns:
+        Dict[str, Any]: 服务器配置字典(不要修改)
+    """
+    return ServerConfigStore.get()
+
+
 def load_server_config() -> Dict[str, Any]:
     """
     从配置文件加载服务器配置
     
+    返回缓存配置的副本，调用方可以修改后传给 save_server_config。
+    
     Returns:
         Dict[str, Any]: 服务器配置字典
     """
-    try:
-        if os.path.exists(SERVER_CONFIG_FILE):
-            with open(SERVER_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception as e:
-        logging.error(f"加载服务器配置文件失败: {e}")
-    
-    return {}
+    return copy.deepcopy(ServerConfigStore.get())
 
 
 def save_server_config(config_data: Dict[str, Any]) -> bool:
@@ -301,13 +538,7 @@ def save_server_config(config_data: Dict[str, Any]) -> bool:
     Returns:
         bool: 保存是否成功
     """
-    try:
-        with open(SERVER_CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=2, ensure_ascii=False)
-        return True
-    except Exception as e:
-        logging.error(f"保存服务器配置文件失败: {e}")
-        return False
+    return ServerConfigStore.save(config_data)
 
 
 # 导出配置实例
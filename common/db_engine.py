@@ -0,0 +1,146 @@
+"""
+数据库引擎配置模块
+
+这个模块负责：
+- 为默认数据库和每个bind生成引擎参数(连接池大小等)
+- 支持单数据库布局：所有bind共用同一个数据库和同一个引擎
+- 为SQLite连接设置PRAGMA：WAL日志、synchronous、mmap_size、busy_timeout
+"""
+
+import logging
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _is_sqlite(url):
+    """判断连接URL是否为SQLite"""
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def _is_memory_sqlite(url):
+    """判断是否为内存SQLite(使用单连接池，不能设置连接池大小)"""
+    database = make_url(url).database
+    return not database or database == ':memory:'
+
+
+def _engine_options(app, url):
+    """
+    生成单个数据库的引擎参数
+
+    Args:
+        app: Flask应用实例
+        url: 数据库连接URL
+
+    Returns:
+        dict: 传给create_engine的参数
+    """
+    config = app.config
+    options = {}
+    if not (_is_sqlite(url) and _is_memory_sqlite(url)):
+        options.update({
+            'pool_size': config.get('SQLALCHEMY_POOL_SIZE', 5),
+            'max_overflow': config.get('SQLALCHEMY_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('SQLALCHEMY_POOL_TIMEOUT', 30),
+            'pool_recycle': config.get('SQLALCHEMY_POOL_RECYCLE', 3600),
+        })
+    if _is_sqlite(url):
+        # 连接在池中被多个线程复用；锁等待交给busy_timeout处理
+        options['connect_args'] = {
+            'check_same_thread': False,
+            'timeout': config.get('SQLITE_BUSY_TIMEOUT', 5000) / 1000,
+        }
+    return options
+
+
+def is_single_database(app):
+    """
+    是否使用单数据库布局(所有bind指向同一个数据库，可以跨表JOIN)
+
+    Args:
+        app: Flask应用实例
+    """
+    return bool(app.config.get('SINGLE_DATABASE'))
+
+
+def configure_engine_options(app):
+    """
+    将连接池等参数写入每个bind的配置，需在 db.init_app 之前调用
+
+    单数据库布局下，所有bind的URL都改为默认数据库的URL。
+
+    Args:
+        app: Flask应用实例
+    """
+    default_url = app.config['SQLALCHEMY_DATABASE_URI']
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(app, default_url)
+
+    binds = {}
+    for key, value in app.config.get('SQLALCHEMY_BINDS', {}).items():
+        if is_single_database(app):
+            value = {**value, 'url': default_url} if isinstance(value, dict) else default_url
+        if isinstance(value, dict):
+            url = value['url']
+            bind_options = {**_engine_options(app, url), **value}
+        else:
+            bind_options = {'url': value, **_engine_options(app, value)}
+        binds[key] = bind_options
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def share_default_engine(app, engines):
+    """
+    单数据库布局下让所有bind使用默认数据库的引擎，需在 db.init_app 之后调用
+
+    每个bind各自建引擎时，同一个会话会在同一个数据库上持有多个连接，
+    一次提交中写入多个bind的表时连接之间互相等待写锁(SQLite报 database is locked)。
+
+    Args:
+        app: Flask应用实例
+        engines: {bind_key: Engine}，会被原地修改
+    """
+    if not is_single_database(app):
+        return
+    default_engine = engines[None]
+    for key, engine in list(engines.items()):
+        if engine is default_engine:
+            continue
+        engine.dispose()
+        engines[key] = default_engine
+
+
+def install_sqlite_pragmas(app, engines):
+    """
+    为SQLite引擎注册连接时执行的PRAGMA，需在 db.init_app 之后调用
+
+    Args:
+        app: Flask应用实例
+        engines: {bind_key: Engine}
+    """
+    pragmas = {
+        'journal_mode': app.config.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': app.config.get('SQLITE_MMAP_SIZE', 268435456),
+        'busy_timeout': app.config.get('SQLITE_BUSY_TIMEOUT', 5000),
+    }
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    installed = set()
+    for key, engine in engines.items():
+        # 单数据库布局下多个bind共用一个引擎，只注册一次
+        if id(engine) in installed:
+            continue
+        installed.add(id(engine))
+        if engine.dialect.name != 'sqlite':
+            continue
+        if _is_memory_sqlite(str(engine.url)):
+            # 内存数据库不支持WAL
+            continue
+        event.listen(engine, 'connect', set_pragmas)
+        logging.info(f"已为数据库 {key or 'default'} 启用SQLite连接参数: {pragmas}")
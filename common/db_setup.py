@@ -11,10 +11,7 @@ from flask_migrate import Migrate
 import logging
 from pathlib import Path
 from .db_instance import db  # 使用相对导入
-from models import UserData  # 从根目录导入UserData模型
-
-# 确保模型被导入
-__all__ = ['UserData']
+from .db_engine import configure_engine_options, share_default_engine, install_sqlite_pragmas
 
 # 初始化迁移
 migrate = Migrate()
@@ -30,12 +27,23 @@ def init_db(app):
         # 确保instance目录存在
         Path(app.instance_path).mkdir(parents=True, exist_ok=True)
         
+        # 按bind应用连接池参数
+        configure_engine_options(app)
+        
         # 初始化数据库
         db.init_app(app)
         
+        # 单数据库布局下所有bind共用一个引擎，并为SQLite连接启用WAL等参数
+        with app.app_context():
+            share_default_engine(app, db.engines)
+            install_sqlite_pragmas(app, db.engines)
+        
         # 初始化迁移
         migrate.init_app(app, db, directory='migrations')
         
+        # 确保根目录的UserData模型已注册(models导入common，不能在模块顶层导入)
+        import models  # noqa: F401
+
         # 在应用上下文中创建所有表
         with app.app_context():
             db.create_all()
@@ -0,0 +1,151 @@
+"""
+密码哈希策略模块
+
+这个模块负责：
+- 从配置中读取统一的密码哈希方法及其成本参数
+- 判断已存储的哈希是否使用了过时的参数，需要在登录时重新哈希
+- 启动时预先计算配置方法的规范化前缀，请求线程中不运行哈希函数
+- 提供基准测试命令，按目标耗时自动选择成本参数
+
+用法：
+    python -m common.hash_policy --target-ms 100 [--algorithm scrypt|pbkdf2] [--save]
+"""
+
+import time
+import argparse
+import statistics
+from werkzeug.security import generate_password_hash
+from flask import current_app
+from .password_hasher import PasswordHasher
+
+# 基准测试时允许的参数范围
+SCRYPT_MIN_N = 2 ** 12
+SCRYPT_MAX_N = 2 ** 20
+PBKDF2_MIN_ITERATIONS = 100000
+PBKDF2_MAX_ITERATIONS = 5000000
+
+
+class HashPolicy:
+    """密码哈希策略"""
+
+    # {配置的方法: 规范化后的方法前缀}
+    _normalized = {}
+
+    @staticmethod
+    def get_method():
+        """
+        获取当前配置的哈希方法
+
+        Returns:
+            str: werkzeug哈希方法(如 'scrypt:32768:8:1')，未配置时返回None表示使用werkzeug默认值
+        """
+        return current_app.config.get('PASSWORD_HASH_METHOD') or None
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        启动时计算配置方法的规范化前缀(需在加载服务器配置之后调用)
+
+        在fork worker之前完成，worker继承结果，登录请求中不再需要计算。
+        """
+        method = app.config.get('PASSWORD_HASH_METHOD')
+        if method and method not in cls._normalized:
+            cls._normalized[method] = generate_password_hash('', method=method).split('$', 1)[0]
+
+    @classmethod
+    def _normalize(cls, method):
+        """
+        将配置的方法转换为werkzeug实际写入哈希中的前缀
+
+        例如 'pbkdf2' 会被补全为 'pbkdf2:sha256:600000'，每个方法只计算一次。
+        启动时未预先计算的方法在哈希工作池中计算，不占用请求线程。
+
+        Raises:
+            HashingBusyError: 工作池繁忙
+        """
+        if method not in cls._normalized:
+            cls._normalized[method] = PasswordHasher.hash_password('', method).split('$', 1)[0]
+        return cls._normalized[method]
+
+    @classmethod
+    def needs_rehash(cls, password_hash):
+        """
+        判断存储的哈希是否需要按当前策略重新生成
+
+        Args:
+            password_hash: 存储的密码哈希
+
+        Returns:
+            bool: 是否需要重新哈希
+        """
+        method = cls.get_method()
+        if not method or not password_hash:
+            return False
+        return password_hash.split('$', 1)[0] != cls._normalize(method)
+
+
+def _measure(method, samples):
+    """测量指定方法生成一次哈希的中位耗时(毫秒)"""
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        generate_password_hash('benchmark-password', method=method)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def benchmark(target_ms, algorithm='scrypt', samples=5):
+    """
+    在当前机器上选择最接近目标耗时(不超过)的成本参数
+
+    Args:
+        target_ms: 单次哈希的目标耗时(毫秒)
+        algorithm: 'scrypt' 或 'pbkdf2'
+        samples: 每个候选参数的测量次数
+
+    Returns:
+        Tuple[str, float]: (哈希方法, 实测耗时毫秒)
+    """
+    if algorithm == 'scrypt':
+        # scrypt按N的2次幂调整，r=8、p=1保持不变
+        best = (f'scrypt:{SCRYPT_MIN_N}:8:1', _measure(f'scrypt:{SCRYPT_MIN_N}:8:1', samples))
+        n = SCRYPT_MIN_N * 2
+        while n <= SCRYPT_MAX_N:
+            method = f'scrypt:{n}:8:1'
+            elapsed = _measure(method, samples)
+            if elapsed > target_ms:
+                break
+            best = (method, elapsed)
+            n *= 2
+        return best
+
+    if algorithm == 'pbkdf2':
+        # pbkdf2耗时与迭代次数近似线性，先按比例估算再校正
+        base = PBKDF2_MIN_ITERATIONS
+        elapsed = _measure(f'pbkdf2:sha256:{base}', samples)
+        iterations = int(base * target_ms / max(elapsed, 0.001))
+        iterations = max(PBKDF2_MIN_ITERATIONS, min(iterations, PBKDF2_MAX_ITERATIONS))
+        iterations = iterations // 10000 * 10000 or PBKDF2_MIN_ITERATIONS
+        method = f'pbkdf2:sha256:{iterations}'
+        return method, _measure(method, samples)
+
+    raise ValueError(f"不支持的哈希算法: {algorithm}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='密码哈希成本基准测试')
+    parser.add_argument('--target-ms', type=float, default=100, help='单次哈希的目标耗时(毫秒)')
+    parser.add_argument('--algorithm', choices=['scrypt', 'pbkdf2'], default='scrypt')
+    parser.add_argument('--samples', type=int, default=5, help='每个候选参数的测量次数')
+    parser.add_argument('--save', action='store_true', help='将结果写入server_config.json')
+    args = parser.parse_args()
+
+    method, elapsed = benchmark(args.target_ms, args.algorithm, args.samples)
+    print(f"推荐哈希方法: {method} (实测 {elapsed:.1f}ms，目标 {args.target_ms:.0f}ms)")
+
+    if args.save:
+        from .config import load_server_config, save_server_config
+        config_data = load_server_config()
+        config_data['password_hash_settings'] = {'method': method}
+        if save_server_config(config_data):
+            print("已写入 server_config.json，重启服务后生效。")
@@ -0,0 +1,250 @@
+"""
+请求指标模块
+
+这个模块负责：
+- 在每个请求前后记录请求数、状态码和耗时直方图(按端点，包括蓝图中的端点)
+- 通过SQLAlchemy引擎事件统计每个请求的SQL查询数和SQL耗时
+- 统计每个请求的Redis调用次数(单条命令和一次pipeline各算一次往返)
+- 各worker在进程内累计，定期合并到Redis哈希中，/metrics 输出所有worker的合计
+- 以Prometheus文本格式输出
+"""
+
+import time
+import logging
+import threading
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+# Redis中保存合计值的哈希
+METRICS_KEY = 'metrics:counters'
+# 进程内增量合并到Redis的最小间隔(秒)
+METRICS_FLUSH_INTERVAL = 10
+# 耗时直方图的桶上界(秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _count_redis_call():
+    """当前请求的Redis调用次数加一"""
+    if has_request_context():
+        g._metrics_redis_calls = g.get('_metrics_redis_calls', 0) + 1
+
+
+def instrument_redis(redis_store):
+    """
+    包装Redis客户端，统计每个请求的Redis往返次数
+
+    Args:
+        redis_store: redis.Redis实例
+    """
+    if getattr(redis_store, '_metrics_instrumented', False):
+        return
+    execute_command = redis_store.execute_command
+    create_pipeline = redis_store.pipeline
+
+    def counted_execute_command(*args, **kwargs):
+        _count_redis_call()
+        return execute_command(*args, **kwargs)
+
+    def counted_pipeline(*args, **kwargs):
+        pipe = create_pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*e_args, **e_kwargs):
+            _count_redis_call()
+            return execute(*e_args, **e_kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    redis_store.execute_command = counted_execute_command
+    redis_store.pipeline = counted_pipeline
+    redis_store._metrics_instrumented = True
+
+
+def instrument_engine(engine):
+    """
+    注册引擎事件，统计每个请求的SQL查询数和耗时
+
+    Args:
+        engine: SQLAlchemy引擎
+    """
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context():
+            g._metrics_sql_queries = g.get('_metrics_sql_queries', 0) + 1
+            g._metrics_sql_seconds = g.get('_metrics_sql_seconds', 0.0) + elapsed
+
+
+class Metrics:
+    """请求指标收集与输出"""
+
+    # 进程内的累计值和尚未合并到Redis的增量：{字段: 值}
+    _totals = {}
+    _pending = {}
+    _flushed_at = 0.0
+    _lock = threading.Lock()
+    _redis = None
+
+    @classmethod
+    def init_app(cls, app, engines=None):
+        """
+        注册请求钩子并为数据库引擎和Redis添加统计，应在其他 before_request 之前调用
+
+        Args:
+            app: Flask应用实例
+            engines: 需要统计的SQLAlchemy引擎
+        """
+        for engine in set(engines or []):
+            instrument_engine(engine)
+        cls._redis = app.config.get('SESSION_REDIS')
+        if cls._redis:
+            instrument_redis(cls._redis)
+
+        app.before_request(cls._before_request)
+        app.after_request(cls._after_request)
+        app.teardown_request(cls._teardown_request)
+
+    @staticmethod
+    def _before_request():
+        g._metrics_start = time.perf_counter()
+        g._metrics_sql_queries = 0
+        g._metrics_sql_seconds = 0.0
+        g._metrics_redis_calls = 0
+
+    @classmethod
+    def _after_request(cls, response):
+        cls._record(response.status_code)
+        return response
+
+    @classmethod
+    def _teardown_request(cls, exc):
+        # 视图抛出未处理的异常时不会执行after_request
+        if exc is not None:
+            cls._record(500)
+
+    @classmethod
+    def _record(cls, status_code):
+        """记录当前请求的指标(每个请求只记录一次)"""
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        bucket = next((le for le in LATENCY_BUCKETS if elapsed <= le), '+Inf')
+
+        increments = {
+            f'req|{endpoint}|{request.method}|{status_code}': 1,
+            f'lat_bucket|{endpoint}|{bucket}': 1,
+            f'lat_sum|{endpoint}': elapsed,
+            f'lat_count|{endpoint}': 1,
+            f'sql_queries|{endpoint}': g.get('_metrics_sql_queries', 0),
+            f'sql_seconds|{endpoint}': g.get('_metrics_sql_seconds', 0.0),
+            f'redis_calls|{endpoint}': g.get('_metrics_redis_calls', 0),
+        }
+        with cls._lock:
+            for field, value in increments.items():
+                cls._totals[field] = cls._totals.get(field, 0) + value
+                cls._pending[field] = cls._pending.get(field, 0) + value
+
+        if cls._redis and time.monotonic() - cls._flushed_at >= METRICS_FLUSH_INTERVAL:
+            cls.flush()
+
+    @classmethod
+    def flush(cls):
+        """将进程内的增量合并到Redis"""
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+            cls._flushed_at = time.monotonic()
+        if not pending or not cls._redis:
+            return
+        try:
+            pipe = cls._redis.pipeline(transaction=False)
+            for field, value in pending.items():
+                if value:
+                    pipe.hincrbyfloat(METRICS_KEY, field, value)
+            pipe.execute()
+        except Exception as e:
+            logging.error(f"合并请求指标失败: {e}")
+            # 放回增量，下次再合并
+            with cls._lock:
+                for field, value in pending.items():
+                    cls._pending[field] = cls._pending.get(field, 0) + value
+
+    @classmethod
+    def _collect(cls):
+        """获取所有worker的合计值；没有Redis时只有本进程的数据"""
+        if cls._redis:
+            cls.flush()
+            try:
+                raw = cls._redis.hgetall(METRICS_KEY)
+                return {
+                    (k.decode() if isinstance(k, bytes) else k): float(v)
+                    for k, v in raw.items()
+                }
+            except Exception as e:
+                logging.error(f"读取请求指标失败: {e}")
+        with cls._lock:
+            return dict(cls._totals)
+
+    @classmethod
+    def render(cls):
+        """
+        以Prometheus文本格式输出指标
+
+        Returns:
+            str: 指标文本
+        """
+        requests, buckets, latency, per_endpoint = {}, {}, {}, {}
+        for field, value in cls._collect().items():
+            kind, *labels = field.split('|')
+            if kind == 'req':
+                requests[tuple(labels)] = value
+            elif kind == 'lat_bucket':
+                buckets.setdefault(labels[0], {})[labels[1]] = value
+            elif kind in ('lat_sum', 'lat_count'):
+                latency.setdefault(labels[0], {})[kind] = value
+            else:
+                per_endpoint.setdefault(kind, {})[labels[0]] = value
+
+        def fmt(value):
+            return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+        lines = [
+            '# HELP http_requests_total 按端点、方法和状态码统计的请求数',
+            '# TYPE http_requests_total counter',
+        ]
+        for (endpoint, method, status), value in sorted(requests.items()):
+            lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {fmt(value)}')
+
+        lines += [
+            '# HELP http_request_duration_seconds 请求耗时',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for endpoint in sorted(latency):
+            cumulative = 0
+            counts = buckets.get(endpoint, {})
+            for le in LATENCY_BUCKETS:
+                cumulative += counts.get(str(le), 0)
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{le}"}} {fmt(cumulative)}')
+            lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {fmt(latency[endpoint].get("lat_count", 0))}')
+            lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {fmt(latency[endpoint].get("lat_sum", 0))}')
+            lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {fmt(latency[endpoint].get("lat_count", 0))}')
+
+        for kind, name, help_text in (
+            ('sql_queries', 'http_request_sql_queries_total', '请求中执行的SQL查询数'),
+            ('sql_seconds', 'http_request_sql_seconds_total', '请求中执行SQL的总耗时'),
+            ('redis_calls', 'http_request_redis_calls_total', '请求中的Redis往返次数'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for endpoint, value in sorted(per_endpoint.get(kind, {}).items()):
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {fmt(value)}')
+
+        return '\n'.join(lines) + '\n'
@@ -44,12 +44,15 @@ class OAuthClient(db.Model):
         client = OAuthClient(name=name, redirect_uri=redirect_uri, created_by=created_by)
         db.session.add(client)
         db.session.commit()
+        from .client_registry import ClientRegistry
+        ClientRegistry.notify_changed(client.client_id)
         return client
 
     @staticmethod
     def get_client(client_id):
-        """通过client_id获取客户端"""
-        return OAuthClient.query.filter_by(client_id=client_id, is_active=True).first()
+        """通过client_id获取启用的客户端(从进程内注册表读取)"""
+        from .client_registry import ClientRegistry
+        return ClientRegistry.get(client_id)
 
     def validate_redirect_uri(self, redirect_uri):
         """验证重定向URI是否合法"""
@@ -4,6 +4,9 @@ from typing import Dict, Optional, Tuple, Any, Callable
 from .token_manager import TokenManager, TokenError
 from .UserInformation import UserInformation
 from .oauth_models import OAuthClient
+from .password_hasher import HashingBusyError
+from .rate_limiter import LoginRateLimiter
+from .route_flags import sessionless
 from .config import get_config
 from flask_cors import cross_origin
 import urllib.parse
@@ -47,6 +50,19 @@ def require_client_auth(f: Callable) -> Callable:
         return f(*args, **kwargs)
     return decorated
 
+def parse_bool(value: Any) -> bool:
+    """
+    解析请求中的布尔参数
+
+    只有JSON的true，或字符串"true"/"1"(不区分大小写)视为真；
+    字符串"false"等其他值都视为假。
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1')
+    return False
+
 def validate_redirect_uri(client: OAuthClient, redirect_uri: str) -> Optional[str]:
     """
     验证重定向URI的有效性和安全性
@@ -169,6 +185,7 @@ def authorize() -> Any:
     return redirect('/login?oauth=1')
 
 @oauth_bp.route('/oauth/token', methods=['POST'])
+@sessionless
 @cross_origin()
 @require_client_auth
 def get_token() -> Tuple[Dict, int]:
@@ -199,12 +216,31 @@ def get_token() -> Tuple[Dict, int]:
                     'message': '缺少用户名或密码'
                 }), 400
                 
-            if not UserInformation.verify_password(username, password):
+            # 请求来自已认证的客户端服务器，所有用户共用它的IP，只按用户名限流
+            allowed, reason = LoginRateLimiter.check(username, None)
+            if not allowed:
+                return jsonify({
+                    'success': False,
+                    'error': 'too_many_requests',
+                    'message': reason
+                }), 429
+
+            try:
+                user_info = UserInformation.verify_user(username, password)
+            except HashingBusyError as e:
+                return jsonify({
+                    'success': False,
+                    'error': 'temporarily_unavailable',
+                    'message': str(e)
+                }), 503
+
+            if not user_info:
                 return jsonify({
                     'success': False,
                     'error': 'invalid_grant',
                     'message': '用户名或密码错误'
                 }), 401
+            LoginRateLimiter.reset(username)
                 
             access_token, refresh_token = TokenManager.generate_token(
                 username,
@@ -259,6 +295,7 @@ def get_token() -> Tuple[Dict, int]:
         }), 500
 
 @oauth_bp.route('/oauth/verify', methods=['POST'])
+@sessionless
 @cross_origin()
 @require_client_auth
 def verify_token() -> Tuple[Dict, int]:
@@ -267,6 +304,7 @@ def verify_token() -> Tuple[Dict, int]:
     
     请求体参数：
     - token: 要验证的访问令牌
+    - strict: 可选，为true时额外检查用户是否仍然存在
     
     Returns:
         JSON响应，包含令牌信息或错误消息
@@ -280,7 +318,8 @@ def verify_token() -> Tuple[Dict, int]:
                 'message': '缺少令牌'
             }), 400
             
-        valid, token_info = TokenManager.verify_token(token)
+        strict = parse_bool(request.json.get('strict', False))
+        valid, token_info = TokenManager.verify_token(token, strict=strict)
         if not valid or not token_info:
             return jsonify({
                 'success': False,
@@ -320,6 +359,61 @@ def verify_token() -> Tuple[Dict, int]:
             'message': '服务器内部错误'
         }), 500
 
+@oauth_bp.route('/oauth/revoke', methods=['POST'])
+@sessionless
+@cross_origin()
+@require_client_auth
+def revoke_token() -> Tuple[Dict, int]:
+    """
+    撤销令牌端点
+    
+    请求体参数：
+    - token: 要撤销的访问令牌或刷新令牌
+    
+    Returns:
+        JSON响应
+    """
+    try:
+        token = request.json.get('token')
+        if not token:
+            return jsonify({
+                'success': False,
+                'error': 'invalid_request',
+                'message': '缺少令牌'
+            }), 400
+
+        # 确保令牌属于当前客户端
+        if TokenManager.get_token_client_id(token) != request.oauth_client.client_id:
+            return jsonify({
+                'success': False,
+                'error': 'invalid_token',
+                'message': '令牌不属于此客户端'
+            }), 401
+
+        if not TokenManager.revoke_token(token):
+            return jsonify({
+                'success': False,
+                'error': 'unsupported_token_type',
+                'message': '该令牌无法撤销'
+            }), 400
+
+        return jsonify({'success': True})
+
+    except TokenError as e:
+        return jsonify({
+            'success': False,
+            'error': 'invalid_token',
+            'message': str(e)
+        }), 401
+
+    except Exception as e:
+        logging.error(f"令牌撤销错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'server_error',
+            'message': '服务器内部错误'
+        }), 500
+
 def add_params_to_url(url: str, params: Dict[str, Any]) -> str:
     """
     向URL添加查询参数
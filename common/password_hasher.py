@@ -0,0 +1,201 @@
+"""
+密码哈希工作池模块
+
+这个模块负责：
+- 在独立的进程池中执行耗时的密码哈希/校验，不占用worker的GIL
+- 限制排队数量，队列满时立即拒绝(调用方返回503)，避免登录风暴拖垮所有worker
+- 统计队列深度、提交、完成和拒绝次数
+- 工作池异常退出时重建，并在当前请求中直接计算，不让登录失败
+"""
+
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
+
+
+class HashingBusyError(Exception):
+    """哈希工作池已满或等待超时"""
+    pass
+
+
+def _generate_hash(password, method=None):
+    """在工作进程中生成密码哈希"""
+    if method:
+        return generate_password_hash(password, method=method)
+    return generate_password_hash(password)
+
+
+def _check_hash(password_hash, password):
+    """在工作进程中校验密码"""
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """有界的密码哈希进程池"""
+
+    # 每个worker进程默认的哈希进程数(池是每个worker各自创建的，按CPU核数会成倍超额)
+    DEFAULT_WORKERS = 2
+
+    _executor = None
+    _executor_pid = None
+    _slots = None
+    _lock = threading.Lock()
+    _metrics = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'timeouts': 0,
+                'pool_restarts': 0, 'in_flight': 0}
+
+    @staticmethod
+    def _settings():
+        """读取工作池配置"""
+        config = current_app.config
+        workers = config.get('PASSWORD_HASH_WORKERS') or PasswordHasher.DEFAULT_WORKERS
+        queue_size = config.get('PASSWORD_HASH_QUEUE_SIZE') or workers * 4
+        timeout = config.get('PASSWORD_HASH_TIMEOUT', 10)
+        return workers, queue_size, timeout
+
+    @staticmethod
+    def _mp_context():
+        """
+        工作进程的启动方式
+
+        worker中有Redis订阅等后台线程，直接fork可能复制到被其他线程持有的锁，
+        因此优先使用forkserver，不支持时(Windows/macOS)使用spawn。
+        """
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context('forkserver')
+        return multiprocessing.get_context('spawn')
+
+    @classmethod
+    def _get_executor(cls):
+        """获取当前进程的工作池(fork后的子进程或工作池损坏后需要重新创建)"""
+        if cls._executor is not None and cls._executor_pid == os.getpid():
+            return cls._executor
+        with cls._lock:
+            if cls._executor is None or cls._executor_pid != os.getpid():
+                workers, queue_size, _ = cls._settings()
+                if cls._executor_pid != os.getpid():
+                    # 允许同时在池中(执行+排队)的任务数；重建工作池时沿用，
+                    # 旧池中任务结束时仍会释放名额
+                    cls._slots = threading.BoundedSemaphore(queue_size)
+                    cls._metrics['in_flight'] = 0
+                cls._executor = ProcessPoolExecutor(max_workers=workers, mp_context=cls._mp_context())
+                cls._executor_pid = os.getpid()
+        return cls._executor
+
+    @classmethod
+    def _discard_executor(cls, executor):
+        """丢弃已损坏的工作池，下次提交时重新创建"""
+        with cls._lock:
+            if cls._executor is not executor:
+                return
+            cls._executor = None
+            cls._metrics['pool_restarts'] += 1
+        logging.error("密码哈希工作进程异常退出，重建工作池")
+        executor.shutdown(wait=False)
+
+    @classmethod
+    def _release(cls, future):
+        """任务结束后释放名额，成功和失败(含工作池损坏)分别计数"""
+        failed = future.cancelled() or future.exception() is not None
+        with cls._lock:
+            cls._metrics['in_flight'] -= 1
+            cls._metrics['failed' if failed else 'completed'] += 1
+        cls._slots.release()
+
+    @classmethod
+    def _run(cls, func, *args):
+        """
+        提交任务并等待结果
+
+        工作池损坏(工作进程被杀死等)时丢弃工作池，本次在当前线程中直接计算。
+
+        Raises:
+            HashingBusyError: 队列已满或等待超时
+        """
+        executor = cls._get_executor()
+        _, _, timeout = cls._settings()
+
+        if not cls._slots.acquire(blocking=False):
+            with cls._lock:
+                cls._metrics['rejected'] += 1
+            logging.warning("密码哈希队列已满，拒绝请求")
+            raise HashingBusyError("服务器繁忙，请稍后再试")
+
+        try:
+            future = executor.submit(func, *args)
+        except BrokenProcessPool:
+            cls._slots.release()
+            cls._discard_executor(executor)
+            return func(*args)
+        except Exception:
+            cls._slots.release()
+            raise
+
+        with cls._lock:
+            cls._metrics['submitted'] += 1
+            cls._metrics['in_flight'] += 1
+        future.add_done_callback(cls._release)
+
+        try:
+            return future.result(timeout=timeout)
+        except BrokenProcessPool:
+            cls._discard_executor(executor)
+            return func(*args)
+        except FutureTimeoutError:
+            with cls._lock:
+                cls._metrics['timeouts'] += 1
+            logging.warning("密码哈希等待超时")
+            raise HashingBusyError("服务器繁忙，请稍后再试")
+
+    @classmethod
+    def hash_password(cls, password, method=None):
+        """
+        生成密码哈希
+
+        Args:
+            password: 明文密码
+            method: werkzeug哈希方法，为None时使用默认方法
+
+        Returns:
+            str: 密码哈希
+
+        Raises:
+            HashingBusyError: 工作池繁忙
+        """
+        return cls._run(_generate_hash, password, method)
+
+    @classmethod
+    def check_password(cls, password_hash, password):
+        """
+        校验密码
+
+        Args:
+            password_hash: 存储的密码哈希
+            password: 明文密码
+
+        Returns:
+            bool: 密码是否正确
+
+        Raises:
+            HashingBusyError: 工作池繁忙
+        """
+        return cls._run(_check_hash, password_hash, password)
+
+    @classmethod
+    def get_metrics(cls):
+        """
+        获取工作池统计信息(当前进程)
+
+        Returns:
+            dict: 队列深度、容量及累计计数
+        """
+        _, queue_size, _ = cls._settings()
+        with cls._lock:
+            metrics = dict(cls._metrics)
+        metrics['queue_depth'] = metrics.pop('in_flight')
+        metrics['queue_capacity'] = queue_size
+        return metrics
@@ -0,0 +1,146 @@
+"""
+用户权限快照缓存模块
+
+这个模块负责：
+- 缓存每个用户的权限快照 (vip, admin, force_logout, version)
+- 在单个请求内复用同一份快照
+- 跨请求使用短TTL的进程内缓存，过期后只比对Redis中的版本号；按LRU限制条目数
+- 在权限变更时显式失效，使其他worker在下一次检查时重新加载
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from flask import current_app, g, has_request_context
+
+# 进程内缓存的有效期(秒)，过期后需要比对一次版本号
+PERMISSION_CACHE_TTL = 5
+# 进程内缓存的最大用户数，超出时淘汰最久未使用的用户
+PERMISSION_CACHE_MAX_ENTRIES = 10000
+# Redis中保存权限版本号的键前缀
+PERMISSION_VERSION_PREFIX = 'permission_version:'
+
+
+class PermissionCache:
+    """用户权限快照缓存"""
+
+    # {username: {'snapshot': ..., 'checked_at': ...}}，按最近使用排序
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _get_redis():
+        """获取Redis连接，未配置时返回None"""
+        try:
+            return current_app.config.get('SESSION_REDIS')
+        except RuntimeError:
+            return None
+
+    @classmethod
+    def _read_version(cls, username):
+        """读取用户当前的权限版本号"""
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return None
+        try:
+            version = redis_store.get(f'{PERMISSION_VERSION_PREFIX}{username}')
+            return int(version) if version else 0
+        except Exception as e:
+            logging.error(f"读取权限版本号失败: {e}")
+            return None
+
+    @staticmethod
+    def _load_snapshot(username, version):
+        """从数据库加载权限快照，只查询需要的列"""
+        from .UserInformation import User
+
+        row = (User.query
+               .with_entities(User.vip, User.admin, User.force_logout)
+               .filter_by(username=username)
+               .first())
+        if not row:
+            return None
+        return {
+            "vip": bool(row.vip),
+            "admin": bool(row.admin),
+            "force_logout": bool(row.force_logout),
+            "version": version or 0,
+        }
+
+    @classmethod
+    def get(cls, username):
+        """
+        获取用户的权限快照
+
+        Args:
+            username: 用户名
+
+        Returns:
+            dict: 包含vip、admin、force_logout、version的快照；用户不存在时返回None
+        """
+        # 请求内缓存
+        request_cache = None
+        if has_request_context():
+            request_cache = g.setdefault('_permission_snapshots', {})
+            if username in request_cache:
+                return request_cache[username]
+
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._entries.get(username)
+            if entry:
+                cls._entries.move_to_end(username)
+        snapshot = None
+
+        if entry and now - entry['checked_at'] < PERMISSION_CACHE_TTL:
+            snapshot = entry['snapshot']
+        else:
+            version = cls._read_version(username)
+            if entry and version is not None and version == entry['snapshot']['version']:
+                # 版本号未变化，权限没有被修改过，延长本地缓存
+                entry['checked_at'] = now
+                snapshot = entry['snapshot']
+            else:
+                snapshot = cls._load_snapshot(username, version)
+                with cls._lock:
+                    if snapshot:
+                        cls._entries[username] = {'snapshot': snapshot, 'checked_at': now}
+                        cls._entries.move_to_end(username)
+                        while len(cls._entries) > PERMISSION_CACHE_MAX_ENTRIES:
+                            cls._entries.popitem(last=False)
+                    else:
+                        cls._entries.pop(username, None)
+
+        if request_cache is not None:
+            request_cache[username] = snapshot
+        return snapshot
+
+    @classmethod
+    def invalidate(cls, username):
+        """
+        使用户的权限快照失效
+
+        本进程的缓存立即删除，其他进程在TTL到期后发现版本号变化并重新加载。
+
+        Args:
+            username: 用户名
+        """
+        with cls._lock:
+            cls._entries.pop(username, None)
+
+        if has_request_context():
+            g.setdefault('_permission_snapshots', {}).pop(username, None)
+
+        redis_store = cls._get_redis()
+        if redis_store:
+            try:
+                redis_store.incr(f'{PERMISSION_VERSION_PREFIX}{username}')
+            except Exception as e:
+                logging.error(f"更新权限版本号失败: {e}")
+
+    @classmethod
+    def clear(cls):
+        """清空本进程的全部缓存"""
+        with cls._lock:
+            cls._entries.clear()
@@ -0,0 +1,136 @@
+"""
+登录限流模块
+
+这个模块负责：
+- 按用户名和客户端IP分别维护滑动时间窗口(Redis有序集合)，IP由ProxyFix从反向代理的转发头中取得
+- 在进行任何密码哈希之前拒绝超出阈值的登录尝试
+- 每次检查通过一个Lua脚本原子完成，只需一次Redis往返
+- 统计被限流的次数，供管理员查看
+"""
+
+import time
+import logging
+from uuid import uuid4
+from flask import current_app
+
+# 限流键前缀
+RATE_LIMIT_USER_PREFIX = 'rate_limit:login:user:'
+RATE_LIMIT_IP_PREFIX = 'rate_limit:login:ip:'
+# 被限流次数统计
+RATE_LIMIT_THROTTLED_KEY = 'rate_limit:login:throttled'
+
+# KEYS: 限流统计, 用户名窗口[, IP窗口]
+# ARGV: 当前毫秒时间, 窗口毫秒数, 本次尝试的唯一标识, 用户名阈值[, IP阈值]
+# 返回: 0表示允许，1表示用户名超限，2表示IP超限
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+for i = 2, #KEYS do
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], 0, now - window)
+    if redis.call('ZCARD', KEYS[i]) >= tonumber(ARGV[i + 2]) then
+        redis.call('HINCRBY', KEYS[1], i == 2 and 'user' or 'ip', 1)
+        return i - 1
+    end
+end
+for i = 2, #KEYS do
+    redis.call('ZADD', KEYS[i], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[i], window)
+end
+return 0
+"""
+
+
+class LoginRateLimiter:
+    """基于Redis滑动窗口的登录限流器"""
+
+    _scripts = {}
+
+    @staticmethod
+    def _get_redis():
+        """获取Redis连接，未配置时返回None"""
+        return current_app.config.get('SESSION_REDIS')
+
+    @classmethod
+    def _get_script(cls, redis_store):
+        """获取已注册的Lua脚本(按连接缓存，避免重复传输脚本内容)"""
+        script = cls._scripts.get(id(redis_store))
+        if script is None:
+            script = redis_store.register_script(SLIDING_WINDOW_SCRIPT)
+            cls._scripts[id(redis_store)] = script
+        return script
+
+    @classmethod
+    def check(cls, username, client_ip):
+        """
+        检查并记录一次登录尝试
+
+        Args:
+            username: 尝试登录的用户名
+            client_ip: 客户端IP，为None时只按用户名限流
+                (已认证的OAuth客户端代用户登录时，所有请求都来自客户端服务器的IP)
+
+        Returns:
+            Tuple[bool, Optional[str]]: (是否允许, 拒绝原因)
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return True, None
+
+        config = current_app.config
+        window = int(config.get('LOGIN_RATE_LIMIT_WINDOW', 60))
+        keys = [RATE_LIMIT_THROTTLED_KEY, f'{RATE_LIMIT_USER_PREFIX}{username}']
+        args = [int(time.time() * 1000), window * 1000, uuid4().hex,
+                int(config.get('LOGIN_RATE_LIMIT_PER_USER', 5))]
+        if client_ip is not None:
+            keys.append(f'{RATE_LIMIT_IP_PREFIX}{client_ip}')
+            args.append(int(config.get('LOGIN_RATE_LIMIT_PER_IP', 20)))
+        try:
+            result = cls._get_script(redis_store)(keys=keys, args=args)
+        except Exception as e:
+            # Redis不可用时不阻止登录
+            logging.error(f"登录限流检查失败: {e}")
+            return True, None
+
+        if result == 1:
+            logging.warning(f"用户 {username} 登录尝试过于频繁")
+            return False, f"该账号登录尝试过于频繁，请{window}秒后再试"
+        if result == 2:
+            logging.warning(f"IP {client_ip} 登录尝试过于频繁")
+            return False, f"登录尝试过于频繁，请{window}秒后再试"
+        return True, None
+
+    @classmethod
+    def reset(cls, username):
+        """
+        登录成功后清除该用户名的失败窗口
+
+        Args:
+            username: 用户名
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return
+        try:
+            redis_store.delete(f'{RATE_LIMIT_USER_PREFIX}{username}')
+        except Exception as e:
+            logging.error(f"清除登录限流记录失败: {e}")
+
+    @classmethod
+    def get_throttled_counts(cls):
+        """
+        获取被限流的登录尝试次数
+
+        Returns:
+            dict: 按用户名和按IP被拒绝的次数
+        """
+        counts = {'user': 0, 'ip': 0}
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return counts
+        try:
+            for field, value in redis_store.hgetall(RATE_LIMIT_THROTTLED_KEY).items():
+                field = field.decode() if isinstance(field, bytes) else field
+                counts[field] = int(value)
+        except Exception as e:
+            logging.error(f"读取登录限流统计失败: {e}")
+        return counts
@@ -0,0 +1,254 @@
+"""
+Redis键空间管理模块
+
+这个模块负责：
+- 登记应用使用的所有键命名空间及其清理策略
+- 在后台线程中用SCAN增量清理孤立的键(分批、批间暂停，不阻塞Redis)
+- 清理时统计各命名空间的键数量和内存占用(抽样估算)，供管理员查看
+- 多个worker之间用Redis锁保证同一时间只有一个在清理
+
+代替原先启动时的 flushdb：部署不再清空会话。
+"""
+
+import os
+import time
+import json
+import logging
+import threading
+
+# 清理锁和最近一次统计报告
+CLEANUP_LOCK_KEY = 'redis_keys:cleanup_lock'
+REPORT_KEY = 'redis_keys:report'
+# 每个命名空间抽样计算内存占用的键数
+MEMORY_SAMPLE_SIZE = 50
+
+# 清理策略
+POLICY_KEEP = 'keep'  # 只统计
+POLICY_DELETE = 'delete'  # 已废弃的键，全部删除
+POLICY_REQUIRE_TTL = 'require_ttl'  # 应该带过期时间的键，没有过期时间的视为孤立键删除
+POLICY_TRIM_EXPIRED = 'trim_expired'  # 以过期时间为分数的有序集合，删除过期成员，为空时删除键
+POLICY_ORPHANED_USER = 'orphaned_user'  # 以用户名结尾的键，用户不存在时删除
+
+
+def get_namespaces(app):
+    """
+    应用使用的键命名空间，按顺序匹配键前缀
+
+    Args:
+        app: Flask应用实例
+
+    Returns:
+        list: [(名称, 键前缀元组, 清理策略)]
+    """
+    return [
+        ('stats', ('user_info_cache:stats', 'rate_limit:login:throttled', 'server_stats:', 'redis_keys:', 'metrics:'),
+         POLICY_KEEP),
+        ('session', (app.config.get('SESSION_KEY_PREFIX', 'session:'),), POLICY_REQUIRE_TTL),
+        ('legacy_user_session', ('user_session:',), POLICY_DELETE),
+        ('session_index', ('user_sessions:',), POLICY_TRIM_EXPIRED),
+        ('permission_version', ('permission_version:',), POLICY_ORPHANED_USER),
+        ('user_info', ('user_info:',), POLICY_REQUIRE_TTL),
+        ('user_info_version', ('user_info_version:',), POLICY_ORPHANED_USER),
+        ('token_denylist', ('token_denylist:',), POLICY_REQUIRE_TTL),
+        ('login_rate_limit', ('rate_limit:login:user:', 'rate_limit:login:ip:'), POLICY_REQUIRE_TTL),
+    ]
+
+
+class RedisKeyManager:
+    """Redis键空间清理和统计"""
+
+    _worker_pid = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        注册在worker进程中启动后台清理线程的钩子
+
+        应用在预fork的服务器(uWSGI、gunicorn)的主进程中导入，此时启动的线程不会
+        被fork到worker中，因此改为在每个进程处理第一个请求时启动。
+
+        Args:
+            app: Flask应用实例
+        """
+        if not app.config.get('SESSION_REDIS') or not app.config.get('REDIS_CLEANUP_ENABLED', True):
+            return
+        app.before_request(lambda: cls.ensure_worker(app))
+
+    @classmethod
+    def ensure_worker(cls, app):
+        """
+        确保当前进程已启动后台清理线程
+
+        Args:
+            app: Flask应用实例
+
+        Returns:
+            bool: 本次调用是否启动了线程
+        """
+        if cls._worker_pid == os.getpid():
+            return False
+        with cls._lock:
+            if cls._worker_pid == os.getpid():
+                return False
+            cls._worker_pid = os.getpid()
+        thread = threading.Thread(target=cls._run_forever, args=(app,), name='redis-key-cleanup', daemon=True)
+        thread.start()
+        return True
+
+    @classmethod
+    def _run_forever(cls, app):
+        """按间隔执行清理，同一时间只有一个worker持有清理锁"""
+        interval = int(app.config.get('REDIS_CLEANUP_INTERVAL', 3600))
+        redis_store = app.config['SESSION_REDIS']
+        while True:
+            try:
+                # 锁在间隔结束时自动释放，其余worker本轮跳过
+                if redis_store.set(CLEANUP_LOCK_KEY, os.getpid(), nx=True, ex=interval):
+                    with app.app_context():
+                        cls.cleanup(app)
+            except Exception as e:
+                logging.error(f"Redis键清理失败: {e}")
+            time.sleep(interval)
+
+    @staticmethod
+    def _existing_users(usernames):
+        """一次IN查询返回存在的用户名"""
+        from .UserInformation import User
+        rows = User.query.with_entities(User.username).filter(User.username.in_(usernames)).all()
+        return {username for (username,) in rows}
+
+    @classmethod
+    def _clean_batch(cls, redis_store, keys, policy):
+        """
+        按策略清理一批键
+
+        Returns:
+            int: 删除的键数
+        """
+        if policy == POLICY_KEEP:
+            return 0
+        if policy == POLICY_DELETE:
+            return redis_store.delete(*keys)
+
+        if policy == POLICY_REQUIRE_TTL:
+            pipe = redis_store.pipeline()
+            for key in keys:
+                pipe.ttl(key)
+            orphaned = [key for key, ttl in zip(keys, pipe.execute()) if ttl == -1]
+            return redis_store.delete(*orphaned) if orphaned else 0
+
+        if policy == POLICY_TRIM_EXPIRED:
+            now = time.time()
+            pipe = redis_store.pipeline()
+            for key in keys:
+                pipe.zremrangebyscore(key, 0, now)
+                pipe.zcard(key)
+            results = pipe.execute()
+            # 成员全部过期的有序集合已被Redis自动删除
+            return sum(1 for remaining in results[1::2] if remaining == 0)
+
+        if policy == POLICY_ORPHANED_USER:
+            names = {}
+            for key in keys:
+                text = key.decode() if isinstance(key, bytes) else key
+                names[key] = text.split(':', 1)[1]
+            existing = cls._existing_users(set(names.values()))
+            orphaned = [key for key, username in names.items() if username not in existing]
+            return redis_store.delete(*orphaned) if orphaned else 0
+
+        raise ValueError(f"未知的清理策略: {policy}")
+
+    @classmethod
+    def cleanup(cls, app, dry_run=False):
+        """
+        用一次SCAN遍历键空间，按命名空间清理孤立的键并生成统计报告，需在应用上下文中调用
+
+        Args:
+            app: Flask应用实例
+            dry_run: 只统计，不删除
+
+        Returns:
+            dict: {命名空间: {keys, deleted, memory_bytes}}，未登记的键计入 'other'
+        """
+        redis_store = app.config.get('SESSION_REDIS')
+        if not redis_store:
+            return {}
+        batch_size = int(app.config.get('REDIS_CLEANUP_BATCH_SIZE', 200))
+        pause = float(app.config.get('REDIS_CLEANUP_PAUSE', 0.05))
+
+        namespaces = get_namespaces(app) + [('other', ('',), POLICY_KEEP)]
+        report = {name: {'keys': 0, 'deleted': 0, 'memory_bytes': 0} for name, _, _ in namespaces}
+        samples = {name: [] for name, _, _ in namespaces}
+        pending = {name: [] for name, _, _ in namespaces}
+        policies = {name: policy for name, _, policy in namespaces}
+
+        def flush(name):
+            if pending[name] and not dry_run:
+                report[name]['deleted'] += cls._clean_batch(redis_store, pending[name], policies[name])
+            pending[name] = []
+
+        scanned = 0
+        for key in redis_store.scan_iter(count=batch_size):
+            text = key.decode() if isinstance(key, bytes) else key
+            name = next(name for name, prefixes, _ in namespaces if text.startswith(prefixes))
+            report[name]['keys'] += 1
+            if len(samples[name]) < MEMORY_SAMPLE_SIZE:
+                samples[name].append(key)
+            if policies[name] != POLICY_KEEP:
+                pending[name].append(key)
+                if len(pending[name]) >= batch_size:
+                    flush(name)
+            scanned += 1
+            if scanned % batch_size == 0:
+                # 批间暂停，避免长时间占用Redis
+                time.sleep(pause)
+        for name in pending:
+            flush(name)
+
+        for name, stats in report.items():
+            stats['keys'] -= stats['deleted']
+            stats['memory_bytes'] = cls._estimate_memory(redis_store, samples[name], stats['keys'])
+            if stats['deleted']:
+                logging.info(f"Redis命名空间 {name} 清理了 {stats['deleted']} 个键")
+
+        report_data = {'namespaces': report, 'generated_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        try:
+            redis_store.set(REPORT_KEY, json.dumps(report_data, separators=(',', ':')))
+        except Exception as e:
+            logging.error(f"保存Redis键统计失败: {e}")
+        return report
+
+    @staticmethod
+    def _estimate_memory(redis_store, sample, total):
+        """根据抽样键的 MEMORY USAGE 估算整个命名空间的内存占用(字节)"""
+        if not sample or not total:
+            return 0
+        try:
+            pipe = redis_store.pipeline()
+            for key in sample:
+                pipe.memory_usage(key)
+            sizes = [size for size in pipe.execute() if size]
+        except Exception:
+            # 部分Redis兼容实现不支持 MEMORY USAGE
+            return None
+        if not sizes:
+            return 0
+        return int(sum(sizes) / len(sizes) * total)
+
+    @staticmethod
+    def get_report(redis_store):
+        """
+        读取最近一次清理生成的统计报告
+
+        Returns:
+            dict: 报告；尚未生成或Redis不可用时返回None
+        """
+        if not redis_store:
+            return None
+        try:
+            raw = redis_store.get(REPORT_KEY)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logging.error(f"读取Redis键统计失败: {e}")
+            return None
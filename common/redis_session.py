@@ -0,0 +1,379 @@
+"""
+Redis服务端会话模块
+
+这个模块负责：
+- 将会话保存在Redis中，Cookie里只保存签名后的会话键
+- 使用带版本号的紧凑JSON格式：常用字段使用短键名，与罕用字段分开存储
+- 会话在第一次被访问时才从Redis读取，不使用会话的请求没有Redis往返
+- 罕用字段(OAuth授权流程的临时字段等)只在被访问时才从Redis读取
+- 会话未修改时不写回Redis；写入值与原值相同时不视为修改
+- 登录时更换会话键(防止会话固定攻击)，数据复制到新键，旧键删除
+"""
+
+import secrets
+import logging
+from flask.sessions import SessionInterface, SessionMixin
+from flask.json.tag import TaggedJSONSerializer
+from itsdangerous import Signer, BadSignature
+
+# 会话数据格式版本，格式变化时递增；版本不符的会话视为新会话
+SESSION_SCHEMA_VERSION = 1
+
+# 每个请求都会用到的字段及其短键名，保存在主键中
+HOT_FIELDS = {
+    'IsLogin': 'l',
+    'username': 'u',
+    'vip': 'v',
+    'admin': 'a',
+    'sid': 's',
+    '_permanent': 'p',
+}
+HOT_KEYS = {short: name for name, short in HOT_FIELDS.items()}
+
+# 罕用字段的短键名，保存在附加键中
+EXTRA_FIELDS = {
+    'oauth_client_id': 'oc',
+    'oauth_redirect_uri': 'or',
+    'oauth_state': 'os',
+}
+EXTRA_KEYS = {short: name for name, short in EXTRA_FIELDS.items()}
+
+_serializer = TaggedJSONSerializer()
+_MISSING = object()
+
+
+def _encode(data, fields):
+    """将会话字段转换为短键名后序列化"""
+    payload = {'_v': SESSION_SCHEMA_VERSION}
+    for name, value in data.items():
+        payload[fields.get(name, name)] = value
+    return _serializer.dumps(payload)
+
+
+def _decode(raw, keys):
+    """反序列化并还原字段名；版本不符时返回None"""
+    payload = _serializer.loads(raw.decode('utf-8') if isinstance(raw, bytes) else raw)
+    if payload.pop('_v', None) != SESSION_SCHEMA_VERSION:
+        return None
+    return {keys.get(short, short): value for short, value in payload.items()}
+
+
+class RedisSession(dict, SessionMixin):
+    """
+    服务端会话
+
+    第一次访问时加载常用字段；访问其他字段时才加载附加键。
+    记录被修改的部分，保存时只写回变化的那一部分。
+    """
+
+    def __init__(self, session_key=None, loader=None, extra_loader=None):
+        super().__init__()
+        self.session_key = session_key
+        self.new = session_key is None
+        self.modified = False
+        # 被regenerate()替换掉的会话键，保存时删除
+        self.replaced_key = None
+        # 被修改的部分：'hot' 和/或 'extra'
+        self.dirty = set()
+        self._loader = loader
+        self._extra_loader = extra_loader
+
+    @property
+    def loaded(self):
+        """会话是否已被访问(未访问的会话无需保存)"""
+        return self._loader is None
+
+    @staticmethod
+    def _part(key):
+        return 'hot' if key in HOT_FIELDS else 'extra'
+
+    def _load(self):
+        """第一次访问时读取常用字段；会话不存在时变为新会话"""
+        if self._loader is None:
+            return
+        loader, self._loader = self._loader, None
+        data = loader()
+        if data is None:
+            self.session_key = None
+            self.new = True
+            self._extra_loader = None
+        else:
+            dict.update(self, data)
+
+    def _load_extra(self, key=_MISSING):
+        """按需加载附加字段；key为常用字段时不需要加载"""
+        self._load()
+        if self._extra_loader is None or (key is not _MISSING and key in HOT_FIELDS):
+            return
+        loader, self._extra_loader = self._extra_loader, None
+        for name, value in (loader() or {}).items():
+            dict.setdefault(self, name, value)
+
+    def _mark(self, key):
+        self.modified = True
+        self.dirty.add(self._part(key))
+
+    def __getitem__(self, key):
+        self._load_extra(key)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        self._load_extra(key)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        self._load_extra(key)
+        return dict.get(self, key, default)
+
+    def __setitem__(self, key, value):
+        self._load_extra(key)
+        if dict.get(self, key, _MISSING) is not _MISSING and dict.__getitem__(self, key) == value:
+            # 值未变化，不触发写回
+            return
+        dict.__setitem__(self, key, value)
+        self._mark(key)
+
+    def __delitem__(self, key):
+        self._load_extra(key)
+        dict.__delitem__(self, key)
+        self._mark(key)
+
+    def pop(self, key, default=_MISSING):
+        self._load_extra(key)
+        if dict.__contains__(self, key):
+            self._mark(key)
+            return dict.pop(self, key)
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def setdefault(self, key, default=None):
+        self._load_extra(key)
+        if not dict.__contains__(self, key):
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        # 附加键会在保存时一并删除，无需先加载
+        self._load()
+        had_extra = self._extra_loader is not None
+        self._extra_loader = None
+        if dict.__len__(self) or had_extra:
+            dict.clear(self)
+            self.modified = True
+            self.dirty.update(('hot', 'extra'))
+
+    def popitem(self):
+        self._load_extra()
+        key, value = dict.popitem(self)
+        self._mark(key)
+        return key, value
+
+    def keys(self):
+        self._load_extra()
+        return dict.keys(self)
+
+    def values(self):
+        self._load_extra()
+        return dict.values(self)
+
+    def items(self):
+        self._load_extra()
+        return dict.items(self)
+
+    def copy(self):
+        self._load_extra()
+        return dict(self)
+
+    def __iter__(self):
+        self._load_extra()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._load_extra()
+        return dict.__len__(self)
+
+    def __bool__(self):
+        # 判断会话是否为空时不需要加载附加键
+        self._load()
+        return bool(dict.__len__(self)) or self._extra_loader is not None
+
+    def regenerate(self):
+        """
+        更换会话键，保留全部数据
+
+        登录前写入的会话键(可能由攻击者预先设置)在保存时被删除，新键只发给本次登录的客户端。
+        """
+        self._load_extra()
+        if self.session_key:
+            self.replaced_key = self.replaced_key or self.session_key
+        self.session_key = None
+        self.modified = True
+        self.dirty.update(('hot', 'extra'))
+
+    def split(self):
+        """按常用/罕用拆分会话字段"""
+        self._load_extra()
+        hot, extra = {}, {}
+        for name, value in dict.items(self):
+            (hot if name in HOT_FIELDS else extra)[name] = value
+        return hot, extra
+
+
+class RedisSessionInterface(SessionInterface):
+    """将会话保存在Redis中的SessionInterface"""
+
+    session_class = RedisSession
+
+    def __init__(self, redis_store, key_prefix='session:'):
+        self.redis = redis_store
+        self.key_prefix = key_prefix
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='redis-session', key_derivation='hmac')
+
+    def _main_key(self, session_key):
+        return f'{self.key_prefix}{session_key}'
+
+    def _extra_key(self, session_key):
+        return f'{self.key_prefix}{session_key}:x'
+
+    def _expiration_seconds(self, app):
+        return int(app.permanent_session_lifetime.total_seconds())
+
+    def _session_key_from_cookie(self, app, request):
+        """从Cookie中取出并校验会话键，无效时返回None"""
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return None
+        try:
+            return self._signer(app).unsign(cookie).decode('utf-8')
+        except BadSignature:
+            return None
+
+    def _extra_loader(self, session_key):
+        """返回读取附加字段的函数"""
+        def load():
+            try:
+                raw = self.redis.get(self._extra_key(session_key))
+                return _decode(raw, EXTRA_KEYS) if raw else None
+            except Exception as e:
+                logging.error(f"读取会话附加字段失败: {e}")
+                return None
+        return load
+
+    def _loader(self, session_key):
+        """返回读取常用字段的函数"""
+        def load():
+            try:
+                raw = self.redis.get(self._main_key(session_key))
+                return _decode(raw, HOT_KEYS) if raw else None
+            except Exception as e:
+                logging.error(f"读取会话失败: {e}")
+                return None
+        return load
+
+    def open_session(self, app, request):
+        # 此时还未匹配路由，只解析Cookie，推迟到第一次访问会话时再读取Redis
+        session_key = self._session_key_from_cookie(app, request)
+        if session_key:
+            return self.session_class(
+                session_key,
+                loader=self._loader(session_key),
+                extra_loader=self._extra_loader(session_key)
+            )
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        if not session.loaded:
+            # 本次请求没有使用会话
+            return
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.replaced_key:
+            self.redis.delete(self._main_key(session.replaced_key), self._extra_key(session.replaced_key))
+            session.replaced_key = None
+
+        if not session:
+            # 会话被清空：删除Redis中的数据和Cookie
+            if session.modified and session.session_key:
+                self.redis.delete(self._main_key(session.session_key), self._extra_key(session.session_key))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.session_key is None:
+            session.session_key = secrets.token_urlsafe(24)
+            session.dirty.update(('hot', 'extra'))
+
+        ttl = self._expiration_seconds(app)
+        main_key = self._main_key(session.session_key)
+        extra_key = self._extra_key(session.session_key)
+
+        if session.modified or session.new:
+            hot, extra = session.split()
+            pipe = self.redis.pipeline()
+            if 'hot' in session.dirty:
+                pipe.set(main_key, _encode(hot, HOT_FIELDS), ex=ttl)
+            else:
+                pipe.expire(main_key, ttl)
+            if 'extra' in session.dirty:
+                if extra:
+                    pipe.set(extra_key, _encode(extra, EXTRA_FIELDS), ex=ttl)
+                else:
+                    pipe.delete(extra_key)
+            else:
+                pipe.expire(extra_key, ttl)
+            pipe.execute()
+        elif self.should_set_cookie(app, session):
+            # SESSION_REFRESH_EACH_REQUEST 为True时只续期，不重写数据
+            pipe = self.redis.pipeline()
+            pipe.expire(main_key, ttl)
+            pipe.expire(extra_key, ttl)
+            pipe.execute()
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.session_key).decode('utf-8'),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def regenerate_session(session):
+    """
+    登录成功后更换会话键；Flask默认的签名Cookie会话没有服务端键，无需处理
+
+    Args:
+        session: 当前请求的会话
+    """
+    if isinstance(session, RedisSession):
+        session.regenerate()
+
+
+def init_session(app):
+    """
+    配置了Redis时启用服务端会话，否则保留Flask默认的签名Cookie会话
+
+    Args:
+        app: Flask应用实例
+    """
+    redis_store = app.config.get('SESSION_REDIS')
+    if not redis_store or app.config.get('SESSION_TYPE') != 'redis':
+        return
+    app.session_interface = RedisSessionInterface(
+        redis_store,
+        key_prefix=app.config.get('SESSION_KEY_PREFIX', 'session:')
+    )
@@ -0,0 +1,39 @@
+"""
+路由分类模块
+
+这个模块负责：
+- 用 @sessionless 标记不使用Cookie会话的端点(静态文件、机器间调用的接口等)
+- 也可以在蓝图上设置 sessionless = True 标记整个蓝图
+- 这些请求跳过会话读取、权限同步和语言选择
+"""
+
+from flask import current_app, request, has_request_context
+
+
+def sessionless(view):
+    """
+    标记视图函数不使用会话
+
+    被标记的端点不会读取Redis会话，也不会同步用户权限。
+    视图中仍然可以访问session，此时会按需读取。
+    """
+    view.sessionless = True
+    return view
+
+
+def is_sessionless_request():
+    """
+    当前请求的端点是否不使用会话
+
+    Returns:
+        bool: 静态文件、被 @sessionless 标记的视图或标记为sessionless的蓝图返回True
+    """
+    if not has_request_context() or request.endpoint is None:
+        return False
+    endpoint = request.endpoint
+    if endpoint == 'static' or endpoint.endswith('.static'):
+        return True
+    if getattr(current_app.view_functions.get(endpoint), 'sessionless', False):
+        return True
+    blueprint = current_app.blueprints.get(request.blueprint) if request.blueprint else None
+    return bool(getattr(blueprint, 'sessionless', False))
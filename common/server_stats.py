@@ -0,0 +1,73 @@
+"""
+服务器统计快照模块
+
+这个模块负责：
+- 用一次聚合查询统计用户总数、VIP数和管理员数，一次分组查询统计权限申请
+- 将统计快照缓存在Redis中，所有worker共享，只按TTL过期
+
+写操作不使快照失效：否则每次注册、申请或审核后的下一次读取都要重新扫描全表，
+统计数据最多滞后 SERVER_STATS_TTL 秒，generated_at 标明了快照的生成时间。
+"""
+
+import json
+import logging
+from datetime import datetime
+from flask import current_app
+
+# Redis中统计快照的键
+SERVER_STATS_KEY = 'server_stats:snapshot'
+
+
+class ServerStats:
+    """服务器统计快照"""
+
+    @staticmethod
+    def _get_redis():
+        """获取Redis连接，未配置时返回None"""
+        try:
+            return current_app.config.get('SESSION_REDIS')
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    def _compute():
+        """从数据库计算统计快照"""
+        from .db_setup import db
+        from .UserInformation import User, UserApply
+
+        total, vip, admin = db.session.query(
+            db.func.count(User.id),
+            db.func.coalesce(db.func.sum(db.case((User.vip.is_(True), 1), else_=0)), 0),
+            db.func.coalesce(db.func.sum(db.case((User.admin.is_(True), 1), else_=0)), 0),
+        ).one()
+        return {
+            "users": {"total": total, "vip": vip, "admin": admin},
+            "applications": UserApply.count_by_status(),
+            "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    @classmethod
+    def get(cls):
+        """
+        获取统计快照
+
+        Returns:
+            dict: users(total, vip, admin)、applications(pending, approved, rejected, total)和generated_at
+        """
+        redis_store = cls._get_redis()
+        if redis_store:
+            try:
+                raw = redis_store.get(SERVER_STATS_KEY)
+                if raw:
+                    return json.loads(raw)
+            except Exception as e:
+                logging.error(f"读取统计快照失败: {e}")
+
+        snapshot = cls._compute()
+        if redis_store:
+            try:
+                ttl = int(current_app.config.get('SERVER_STATS_TTL', 30))
+                redis_store.set(SERVER_STATS_KEY, json.dumps(snapshot, separators=(',', ':')), ex=ttl)
+            except Exception as e:
+                logging.error(f"写入统计快照失败: {e}")
+        return snapshot
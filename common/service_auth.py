@@ -0,0 +1,207 @@
+"""
+服务间调用认证模块
+
+这个模块负责：
+- 校验后端服务调用 /api/user_data 时携带的server_token
+- 配置中只保存令牌的SHA-256摘要，支持多个同时有效的令牌
+- 轮换某个名称的令牌时，同名的旧令牌在过渡期内继续有效，到期后自动失效
+- 校验只访问内存中的摘要集合，比较使用常量时间
+
+server_config.json 中的格式：
+    "server_settings": {
+        "service_tokens": [
+            {"name": "backend", "sha256": "<hex>", "expires_at": "2026-01-01 00:00:00"}
+        ]
+    }
+旧的明文 "server_token" 在第一次加载时转换为名为 legacy 的摘要并从文件中删除，
+继续有效，可用 rotate --name legacy 替换。
+
+用法：
+    python -m common.service_auth rotate [--name backend] [--grace-hours 24]
+    python -m common.service_auth list
+"""
+
+import hmac
+import time
+import secrets
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from .config import get_server_config, load_server_config, save_server_config
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+# 由明文server_token转换而来的令牌名称
+LEGACY_TOKEN_NAME = 'legacy'
+
+
+def hash_token(token):
+    """计算令牌的SHA-256摘要(十六进制)；令牌是高熵随机串，不需要慢哈希"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class ServiceTokenAuth:
+    """server_token校验"""
+
+    # [(摘要bytes, 过期时间戳或None)]
+    _tokens = []
+    # 生成 _tokens 时使用的配置对象，配置重新加载后会是新的对象
+    _source = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _parse_tokens(server_config):
+        """从配置中解析出所有令牌摘要"""
+        settings = server_config.get('server_settings', {}) or {}
+        tokens = []
+        legacy = settings.get('server_token')
+        if legacy:
+            tokens.append((hashlib.sha256(legacy.encode('utf-8')).digest(), None))
+        for entry in settings.get('service_tokens', []) or []:
+            try:
+                digest = bytes.fromhex(entry['sha256'])
+                expires_at = entry.get('expires_at')
+                if expires_at:
+                    expires_at = datetime.strptime(expires_at, TIME_FORMAT).timestamp()
+                tokens.append((digest, expires_at or None))
+            except (KeyError, ValueError, TypeError) as e:
+                logging.error(f"忽略格式错误的服务令牌 {entry.get('name', '')}: {e}")
+        return tokens
+
+    @staticmethod
+    def _migrate_settings(settings):
+        """
+        将server_settings中的明文server_token转换为摘要条目(就地修改)
+
+        Returns:
+            bool: 是否有需要转换的明文令牌
+        """
+        legacy = settings.pop('server_token', None)
+        if not legacy:
+            return False
+        tokens = settings.get('service_tokens') or []
+        digest = hash_token(legacy)
+        # 多个进程同时转换时，后保存的一方不会重复添加
+        if not any(entry.get('sha256') == digest for entry in tokens):
+            tokens.append({
+                'name': LEGACY_TOKEN_NAME,
+                'sha256': digest,
+                'created_at': datetime.now().strftime(TIME_FORMAT)
+            })
+        settings['service_tokens'] = tokens
+        return True
+
+    @classmethod
+    def _migrate_legacy(cls):
+        """将配置文件中的明文server_token替换为摘要，失败时明文继续有效"""
+        config_data = load_server_config()
+        if not cls._migrate_settings(config_data.get('server_settings') or {}):
+            return False
+        if not save_server_config(config_data):
+            logging.error("明文server_token转换为摘要后保存失败，明文仍保留在配置文件中")
+            return False
+        logging.info("已将明文server_token转换为摘要")
+        return True
+
+    @classmethod
+    def _get_tokens(cls):
+        """获取内存中的令牌集合，配置变化后重建"""
+        server_config = get_server_config()
+        if server_config is not cls._source:
+            with cls._lock:
+                if server_config is not cls._source:
+                    if (server_config.get('server_settings') or {}).get('server_token') and cls._migrate_legacy():
+                        server_config = get_server_config()
+                    cls._tokens = cls._parse_tokens(server_config)
+                    cls._source = server_config
+        return cls._tokens
+
+    @classmethod
+    def init_app(cls, app):
+        """启动时加载令牌，配置中的明文server_token随即转换为摘要"""
+        cls._get_tokens()
+
+    @classmethod
+    def verify(cls, token):
+        """
+        校验server_token
+
+        Args:
+            token: 请求中携带的令牌
+
+        Returns:
+            bool: 是否为有效的服务令牌
+        """
+        if not token or not isinstance(token, str):
+            return False
+        digest = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        matched = False
+        # 与所有令牌逐一比较，不提前返回，耗时与匹配位置无关
+        for stored, expires_at in cls._get_tokens():
+            if hmac.compare_digest(digest, stored) and (expires_at is None or expires_at > now):
+                matched = True
+        return matched
+
+    @classmethod
+    def rotate(cls, name='default', grace_hours=24):
+        """
+        生成新令牌，同名的现有令牌在过渡期后过期，其他名称的令牌不受影响
+
+        Args:
+            name: 要轮换的令牌名称
+            grace_hours: 同名旧令牌继续有效的小时数
+
+        Returns:
+            Tuple[bool, str]: (是否成功, 新令牌明文或错误信息)，明文只返回这一次
+        """
+        config_data = load_server_config()
+        settings = config_data.setdefault('server_settings', {})
+        cls._migrate_settings(settings)
+        tokens = settings.get('service_tokens', []) or []
+        expires_at = (datetime.now() + timedelta(hours=grace_hours)).strftime(TIME_FORMAT)
+
+        for entry in tokens:
+            if entry.get('name') != name:
+                continue
+            if not entry.get('expires_at') or entry['expires_at'] > expires_at:
+                entry['expires_at'] = expires_at
+
+        token = secrets.token_urlsafe(32)
+        tokens.append({
+            'name': name,
+            'sha256': hash_token(token),
+            'created_at': datetime.now().strftime(TIME_FORMAT)
+        })
+        # 清理已过期的令牌
+        now = datetime.now().strftime(TIME_FORMAT)
+        settings['service_tokens'] = [t for t in tokens if not t.get('expires_at') or t['expires_at'] > now]
+
+        if not save_server_config(config_data):
+            return False, "保存服务器配置失败"
+        return True, token
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='服务令牌管理')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rotate_parser = subparsers.add_parser('rotate', help='生成新令牌，旧令牌进入过渡期')
+    rotate_parser.add_argument('--name', default='default', help='新令牌的名称')
+    rotate_parser.add_argument('--grace-hours', type=float, default=24, help='旧令牌继续有效的小时数')
+    subparsers.add_parser('list', help='列出已配置的令牌')
+    args = parser.parse_args()
+
+    if args.command == 'rotate':
+        success, result = ServiceTokenAuth.rotate(args.name, args.grace_hours)
+        if success:
+            print(f"新令牌(只显示一次): {result}")
+            print(f"名为 {args.name} 的旧令牌将在 {args.grace_hours:g} 小时后失效。")
+        else:
+            print(result)
+    else:
+        settings = load_server_config().get('server_settings', {})
+        if settings.get('server_token'):
+            print(f"{LEGACY_TOKEN_NAME} (明文server_token) 将在服务启动时转换为摘要")
+        for entry in settings.get('service_tokens', []):
+            print(f"{entry.get('name', '')}: {entry['sha256'][:12]}... 过期时间: {entry.get('expires_at') or '永久'}")
@@ -0,0 +1,192 @@
+"""
+用户会话索引模块
+
+这个模块负责：
+- 登录时为会话分配sid，记录在 user_sessions:{username} 有序集合中(分数为过期时间)
+- 每个请求校验会话是否仍在索引中；结果按用户的权限版本号缓存在进程内，
+  版本号不变时不访问Redis；按LRU限制缓存的用户数
+- "在所有设备上退出"和权限收回时删除该用户的全部会话，代价只与该用户的会话数有关
+"""
+
+import time
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from flask import current_app
+
+# 会话索引键前缀
+SESSION_INDEX_PREFIX = 'user_sessions:'
+# 进程内缓存校验结果的最大用户数，超出时淘汰最久未使用的用户
+SESSION_INDEX_MAX_USERS = 10000
+
+
+class SessionIndex:
+    """基于Redis有序集合的用户会话索引"""
+
+    # {username: (权限版本号, 已校验的sid集合)}，按最近使用排序
+    _validated = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _get_redis():
+        """获取Redis连接，未配置时返回None"""
+        try:
+            return current_app.config.get('SESSION_REDIS')
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    def _lifetime():
+        """会话有效期(秒)，与 PERMANENT_SESSION_LIFETIME 一致"""
+        return int(current_app.permanent_session_lifetime.total_seconds())
+
+    @classmethod
+    def available(cls):
+        """会话索引是否可用(配置了Redis)"""
+        return cls._get_redis() is not None
+
+    @classmethod
+    def register(cls, username):
+        """
+        登录成功后登记一个新会话
+
+        Args:
+            username: 用户名
+
+        Returns:
+            str: 新会话的sid，需保存到session中；Redis不可用时返回None
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return None
+        sid = secrets.token_urlsafe(16)
+        lifetime = cls._lifetime()
+        now = time.time()
+        key = f'{SESSION_INDEX_PREFIX}{username}'
+        try:
+            pipe = redis_store.pipeline()
+            pipe.zremrangebyscore(key, 0, now)
+            pipe.zadd(key, {sid: now + lifetime})
+            pipe.expire(key, lifetime)
+            pipe.execute()
+        except Exception as e:
+            logging.error(f"登记用户 {username} 的会话失败: {e}")
+            return None
+        return sid
+
+    @classmethod
+    def is_active(cls, username, sid, version=None):
+        """
+        校验会话是否仍然有效
+
+        Args:
+            username: 用户名
+            sid: 会话的sid
+            version: 用户当前的权限版本号；与上次校验时相同则直接使用进程内结果
+
+        Returns:
+            bool: 会话是否有效；Redis不可用时返回True
+        """
+        if version is not None:
+            with cls._lock:
+                entry = cls._validated.get(username)
+                if entry and entry[0] == version and sid in entry[1]:
+                    cls._validated.move_to_end(username)
+                    return True
+
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return True
+        try:
+            expires_at = redis_store.zscore(f'{SESSION_INDEX_PREFIX}{username}', sid)
+        except Exception as e:
+            logging.error(f"校验用户 {username} 的会话失败: {e}")
+            return True
+
+        active = expires_at is not None and expires_at > time.time()
+        if active and version is not None:
+            with cls._lock:
+                entry = cls._validated.get(username)
+                if entry and entry[0] == version:
+                    entry[1].add(sid)
+                else:
+                    # 版本号变化后旧的校验结果全部作废
+                    cls._validated[username] = (version, {sid})
+                cls._validated.move_to_end(username)
+                while len(cls._validated) > SESSION_INDEX_MAX_USERS:
+                    cls._validated.popitem(last=False)
+        return active
+
+    @classmethod
+    def revoke(cls, username, sid):
+        """
+        退出登录时删除单个会话
+
+        Args:
+            username: 用户名
+            sid: 会话的sid
+        """
+        with cls._lock:
+            entry = cls._validated.get(username)
+            if entry:
+                entry[1].discard(sid)
+                if not entry[1]:
+                    del cls._validated[username]
+        redis_store = cls._get_redis()
+        if not redis_store or not sid:
+            return
+        try:
+            redis_store.zrem(f'{SESSION_INDEX_PREFIX}{username}', sid)
+        except Exception as e:
+            logging.error(f"删除用户 {username} 的会话失败: {e}")
+
+    @classmethod
+    def revoke_all(cls, username):
+        """
+        删除用户的全部会话
+
+        调用方还需使用户的权限版本号失效(PermissionCache.invalidate)，
+        其他worker才会重新校验缓存过的会话。
+
+        Args:
+            username: 用户名
+
+        Returns:
+            int: 被删除的会话数
+        """
+        with cls._lock:
+            cls._validated.pop(username, None)
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return 0
+        key = f'{SESSION_INDEX_PREFIX}{username}'
+        try:
+            pipe = redis_store.pipeline()
+            pipe.zcount(key, time.time(), '+inf')
+            pipe.delete(key)
+            count, _ = pipe.execute()
+            return int(count)
+        except Exception as e:
+            logging.error(f"删除用户 {username} 的全部会话失败: {e}")
+            return 0
+
+    @classmethod
+    def count(cls, username):
+        """
+        获取用户当前有效的会话数
+
+        Args:
+            username: 用户名
+
+        Returns:
+            int: 会话数
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return 0
+        try:
+            return int(redis_store.zcount(f'{SESSION_INDEX_PREFIX}{username}', time.time(), '+inf'))
+        except Exception as e:
+            logging.error(f"统计用户 {username} 的会话失败: {e}")
+            return 0
@@ -0,0 +1,141 @@
+"""
+令牌撤销黑名单模块
+
+这个模块负责：
+- 按jti撤销单个令牌，黑名单条目在令牌exp时刻自动过期
+- 按用户或客户端批量撤销：记录撤销时间(精确到微秒)，之前签发的令牌全部失效
+- 验证时用一次MGET完成全部检查；Redis不可用时按 OAUTH_DENYLIST_FAIL_OPEN 放行或拒绝
+"""
+
+import time
+import logging
+from flask import current_app
+
+# 黑名单键前缀
+DENYLIST_JTI_PREFIX = 'token_denylist:jti:'
+DENYLIST_USER_PREFIX = 'token_denylist:user:'
+DENYLIST_CLIENT_PREFIX = 'token_denylist:client:'
+
+
+class TokenDenylist:
+    """基于Redis的令牌黑名单"""
+
+    @staticmethod
+    def _get_redis():
+        """获取Redis连接，未配置时返回None"""
+        return current_app.config.get('SESSION_REDIS')
+
+    @staticmethod
+    def _bulk_ttl():
+        """批量撤销记录的保留时间：覆盖最长有效期的刷新令牌"""
+        return int(current_app.config['OAUTH_REFRESH_TOKEN_EXPIRES'].total_seconds())
+
+    @classmethod
+    def revoke_jti(cls, jti, exp):
+        """
+        撤销单个令牌
+
+        Args:
+            jti: 令牌ID
+            exp: 令牌过期时间戳，黑名单条目在此时刻自动删除
+
+        Returns:
+            bool: 是否写入成功
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return False
+        if exp <= time.time():
+            # 令牌已经过期，无需记录
+            return True
+        try:
+            key = f'{DENYLIST_JTI_PREFIX}{jti}'
+            pipe = redis_store.pipeline()
+            pipe.set(key, 1)
+            pipe.expireat(key, int(exp))
+            pipe.execute()
+            return True
+        except Exception as e:
+            logging.error(f"写入令牌黑名单失败: {e}")
+            return False
+
+    @classmethod
+    def _revoke_before(cls, key):
+        """
+        记录批量撤销时间
+
+        令牌的iat精确到微秒，撤销后同一秒内重新签发的令牌不会被误判为已撤销。
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return False
+        try:
+            redis_store.set(key, f'{time.time():.6f}', ex=cls._bulk_ttl())
+            return True
+        except Exception as e:
+            logging.error(f"写入批量撤销记录失败: {e}")
+            return False
+
+    @classmethod
+    def revoke_user(cls, username):
+        """
+        撤销用户在此之前获得的所有令牌
+
+        Args:
+            username: 用户名
+
+        Returns:
+            bool: 是否写入成功
+        """
+        return cls._revoke_before(f'{DENYLIST_USER_PREFIX}{username}')
+
+    @classmethod
+    def revoke_client(cls, client_id):
+        """
+        撤销客户端在此之前签发的所有令牌
+
+        Args:
+            client_id: 客户端ID
+
+        Returns:
+            bool: 是否写入成功
+        """
+        return cls._revoke_before(f'{DENYLIST_CLIENT_PREFIX}{client_id}')
+
+    @classmethod
+    def is_revoked(cls, payload):
+        """
+        检查令牌是否已被撤销
+
+        未配置Redis时不启用黑名单。读取黑名单失败时按 OAUTH_DENYLIST_FAIL_OPEN 处理：
+        为True时视为未撤销，为False时视为已撤销(拒绝所有令牌)。
+
+        Args:
+            payload: 已验证签名的令牌载荷
+
+        Returns:
+            bool: 是否已被撤销
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return False
+
+        keys = [
+            f"{DENYLIST_JTI_PREFIX}{payload.get('jti', '')}",
+            f"{DENYLIST_USER_PREFIX}{payload.get('username', '')}",
+            f"{DENYLIST_CLIENT_PREFIX}{payload.get('client_id', '')}",
+        ]
+        try:
+            jti_revoked, user_revoked_at, client_revoked_at = redis_store.mget(keys)
+        except Exception as e:
+            fail_open = current_app.config.get('OAUTH_DENYLIST_FAIL_OPEN', True)
+            logging.error(f"读取令牌黑名单失败({'放行' if fail_open else '拒绝'}令牌): {e}")
+            return not fail_open
+
+        if payload.get('jti') and jti_revoked is not None:
+            return True
+        issued_at = payload.get('iat', 0)
+        for revoked_at in (user_revoked_at, client_revoked_at):
+            if revoked_at is not None and issued_at <= float(revoked_at):
+                return True
+        return False
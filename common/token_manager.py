@@ -1,9 +1,11 @@
 from typing import Dict, Optional, Tuple, Union
 import jwt
 import time
+from uuid import uuid4
 from datetime import datetime, timedelta
 from .UserInformation import UserInformation
 from .oauth_models import OAuthClient
+from .token_denylist import TokenDenylist
 from .config import get_config
 
 class TokenError(Exception):
@@ -24,6 +26,42 @@ class InvalidClientError(TokenError):
 
 class TokenManager:
     """Token管理器，处理JWT令牌的生成、验证和刷新"""
+
+    @staticmethod
+    def _get_client_secret(client_id: str) -> Optional[str]:
+        """
+        获取客户端密钥（来自进程内客户端注册表，不访问数据库）
+
+        Args:
+            client_id: OAuth客户端ID
+
+        Returns:
+            str: 客户端密钥，客户端无效时返回None
+        """
+        client = OAuthClient.get_client(client_id)
+        return client.client_secret if client else None
+
+    @staticmethod
+    def get_token_client_id(token: str) -> str:
+        """
+        读取令牌所属的client_id（不验证签名）
+
+        新令牌的client_id保存在头部kid中，只需解析头部；
+        旧令牌回退到解析载荷。
+        """
+        try:
+            client_id = jwt.get_unverified_header(token).get('kid')
+            if not client_id:
+                client_id = jwt.decode(
+                    token,
+                    options={"verify_signature": False}
+                ).get('client_id')
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(f"令牌解码失败: {str(e)}")
+
+        if not client_id:
+            raise InvalidTokenError("令牌中缺少client_id")
+        return client_id
     
     @classmethod
     def _get_config(cls) -> Dict:
@@ -31,8 +69,7 @@ class TokenManager:
         config = get_config()
         return {
             'token_expiration': config.OAUTH_TOKEN_EXPIRES.total_seconds(),
-            'refresh_token_expiration': config.OAUTH_REFRESH_TOKEN_EXPIRES.total_seconds(),
-            'token_length': config.OAUTH_TOKEN_LENGTH
+            'refresh_token_expiration': config.OAUTH_REFRESH_TOKEN_EXPIRES.total_seconds()
         }
 
     @classmethod
@@ -70,7 +107,9 @@ class TokenManager:
         
         # 获取配置
         config = cls._get_config()
-        now = int(time.time())
+        # iat精确到微秒，用于和批量撤销时间比较；exp取整秒
+        issued_at = round(time.time(), 6)
+        now = int(issued_at)
         
         # 生成访问令牌
         access_payload = {
@@ -79,14 +118,16 @@ class TokenManager:
             'vip': user_info.get('vip', False),
             'admin': user_info.get('admin', False),
             'client_id': client_id,
+            'jti': uuid4().hex,
             'exp': now + int(config['token_expiration']),
-            'iat': now
+            'iat': issued_at
         }
         
         access_token = jwt.encode(
             access_payload,
             client.client_secret,
-            algorithm='HS256'
+            algorithm='HS256',
+            headers={'kid': client_id}
         )
         
         if not include_refresh_token:
@@ -97,14 +138,16 @@ class TokenManager:
             'type': 'refresh',
             'username': username,
             'client_id': client_id,
+            'jti': uuid4().hex,
             'exp': now + int(config['refresh_token_expiration']),
-            'iat': now
+            'iat': issued_at
         }
         
         refresh_token = jwt.encode(
             refresh_payload,
             client.client_secret,
-            algorithm='HS256'
+            algorithm='HS256',
+            headers={'kid': client_id}
         )
         
         return access_token, refresh_token
@@ -113,14 +156,19 @@ class TokenManager:
     def verify_token(
         cls,
         token: str,
-        verify_type: Optional[str] = None
+        verify_type: Optional[str] = None,
+        strict: bool = False
     ) -> Tuple[bool, Optional[Dict]]:
         """
         验证JWT令牌
+
+        默认只使用进程内缓存的客户端密钥校验签名，vip/admin直接取自已签名的声明，
+        不访问数据库。strict为True时会额外查询用户，确认用户仍然存在并返回最新权限。
         
         Args:
             token: JWT令牌
             verify_type: 可选的令牌类型验证('access'或'refresh')
+            strict: 是否查询用户以检查撤销情况
             
         Returns:
             Tuple[bool, Optional[Dict]]: (是否有效, 令牌信息)
@@ -130,63 +178,60 @@ class TokenManager:
             ExpiredTokenError: 令牌已过期
             InvalidClientError: 客户端无效
         """
+        client_id = cls.get_token_client_id(token)
+        client_secret = cls._get_client_secret(client_id)
+        if not client_secret:
+            raise InvalidClientError("无效的客户端")
+
         try:
-            # 先尝试解码令牌以获取client_id（不验证签名）
-            try:
-                unverified_payload = jwt.decode(
-                    token,
-                    options={"verify_signature": False}
-                )
-                client_id = unverified_payload.get('client_id')
-                if not client_id:
-                    raise InvalidTokenError("令牌中缺少client_id")
-                    
-                client = OAuthClient.get_client(client_id)
-                if not client:
-                    raise InvalidClientError("无效的客户端")
-                    
-            except jwt.PyJWTError as e:
-                raise InvalidTokenError(f"令牌解码失败: {str(e)}")
-            
-            # 使用客户端密钥验证令牌
+            # 使用客户端密钥验证令牌（同时校验exp）
             payload = jwt.decode(
                 token,
-                client.client_secret,
-                algorithms=['HS256']
+                client_secret,
+                algorithms=['HS256'],
+                options={'require': ['exp', 'iat']}
             )
-            
-            # 验证令牌类型
-            if verify_type and payload.get('type') != verify_type:
-                raise InvalidTokenError(f"令牌类型不匹配，期望{verify_type}")
-            
-            # 检查令牌是否过期
-            if payload.get('exp', 0) < time.time():
-                raise ExpiredTokenError("令牌已过期")
-            
-            # 验证用户是否存在
-            username = payload.get('username')
-            if not username:
-                raise InvalidTokenError("令牌中缺少username")
-                
+        except jwt.ExpiredSignatureError:
+            raise ExpiredTokenError("令牌已过期")
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(f"令牌验证失败: {str(e)}")
+
+        if payload.get('client_id') != client_id:
+            raise InvalidTokenError("令牌client_id不匹配")
+        
+        # 验证令牌类型
+        if verify_type and payload.get('type') != verify_type:
+            raise InvalidTokenError(f"令牌类型不匹配，期望{verify_type}")
+        
+        username = payload.get('username')
+        if not username:
+            raise InvalidTokenError("令牌中缺少username")
+
+        # 检查令牌是否已被撤销（单次MGET）
+        if TokenDenylist.is_revoked(payload):
+            raise InvalidTokenError("令牌已被撤销")
+
+        vip = payload.get('vip', False)
+        admin = payload.get('admin', False)
+
+        if strict:
+            # 验证用户是否存在，并以数据库中的权限为准
             user_info = UserInformation.get_user_info(username)
             if not user_info:
                 raise InvalidTokenError("用户不存在")
-            
-            # 返回令牌信息
-            return True, {
-                'type': payload.get('type', 'access'),
-                'username': username,
-                'vip': user_info.get('vip', False),
-                'admin': user_info.get('admin', False),
-                'client_id': client_id,
-                'exp': datetime.fromtimestamp(payload['exp']),
-                'iat': datetime.fromtimestamp(payload['iat'])
-            }
-            
-        except (InvalidTokenError, ExpiredTokenError, InvalidClientError):
-            raise
-        except jwt.PyJWTError as e:
-            raise InvalidTokenError(f"令牌验证失败: {str(e)}")
+            vip = user_info.get('vip', False)
+            admin = user_info.get('admin', False)
+        
+        # 返回令牌信息
+        return True, {
+            'type': payload.get('type', 'access'),
+            'username': username,
+            'vip': vip,
+            'admin': admin,
+            'client_id': client_id,
+            'exp': datetime.fromtimestamp(payload['exp']),
+            'iat': datetime.fromtimestamp(payload['iat'])
+        }
     
     @classmethod
     def refresh_token(cls, refresh_token: str) -> str:
@@ -206,7 +251,7 @@ class TokenManager:
         """
         # 验证刷新令牌
         try:
-            valid, token_info = cls.verify_token(refresh_token, verify_type='refresh')
+            valid, token_info = cls.verify_token(refresh_token, verify_type='refresh', strict=True)
             if not valid or not token_info:
                 raise InvalidTokenError("无效的刷新令牌")
         except ExpiredTokenError:
@@ -222,13 +267,61 @@ class TokenManager:
     @classmethod
     def revoke_token(cls, token: str) -> bool:
         """
-        撤销令牌（可选实现，需要令牌黑名单支持）
+        撤销令牌，令牌的jti会被加入黑名单直到其过期
         
         Args:
             token: 要撤销的令牌
             
+        Returns:
+            bool: 撤销是否成功
+            
+        Raises:
+            InvalidTokenError: 令牌无效
+            InvalidClientError: 客户端无效
+        """
+        client_id = cls.get_token_client_id(token)
+        client_secret = cls._get_client_secret(client_id)
+        if not client_secret:
+            raise InvalidClientError("无效的客户端")
+
+        try:
+            payload = jwt.decode(
+                token,
+                client_secret,
+                algorithms=['HS256'],
+                options={'verify_exp': False}
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(f"令牌验证失败: {str(e)}")
+
+        jti = payload.get('jti')
+        if not jti:
+            # 旧令牌没有jti，无法单独撤销
+            return False
+        return TokenDenylist.revoke_jti(jti, payload.get('exp', 0))
+
+    @classmethod
+    def revoke_user_tokens(cls, username: str) -> bool:
+        """
+        撤销用户此前获得的所有令牌
+
+        Args:
+            username: 用户名
+
+        Returns:
+            bool: 撤销是否成功
+        """
+        return TokenDenylist.revoke_user(username)
+
+    @classmethod
+    def revoke_client_tokens(cls, client_id: str) -> bool:
+        """
+        撤销客户端此前签发的所有令牌
+
+        Args:
+            client_id: OAuth客户端ID
+
         Returns:
             bool: 撤销是否成功
         """
-        # TODO: 实现令牌撤销逻辑，需要Redis支持
-        raise NotImplementedError("令牌撤销功能尚未实现")
\ No newline at end of file
+        return TokenDenylist.revoke_client(client_id)
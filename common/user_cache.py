@@ -0,0 +1,191 @@
+"""
+用户信息分布式缓存模块
+
+这个模块负责：
+- 在共享的Redis中缓存 get_user_info 返回的用户信息字典
+- 使用紧凑的JSON序列化，所有uWSGI worker共用同一份缓存
+- 在用户信息写入后立即失效(write-through)
+- 按用户的版本号条件写入：读取期间数据被修改过时不写入，避免把旧数据重新缓存
+- 统计缓存命中/未命中次数，用于评估节省的数据库负载
+"""
+
+import json
+import logging
+import threading
+from flask import current_app
+
+# 缓存键前缀
+USER_INFO_PREFIX = 'user_info:'
+# 缓存版本号键前缀，每次失效时加一
+USER_INFO_VERSION_PREFIX = 'user_info_version:'
+# 命中统计保存的哈希键
+USER_INFO_STATS_KEY = 'user_info_cache:stats'
+# 缓存有效期(秒)，作为失效遗漏时的兜底
+USER_INFO_TTL = 300
+# 本地计数累计到多少次后写入Redis
+STATS_FLUSH_THRESHOLD = 100
+
+# KEYS: 版本号键, 缓存键
+# ARGV: 读取缓存时的版本号, 用户信息JSON, 有效期(秒)
+# 返回: 1表示已写入，0表示版本号已变化
+SET_IF_VERSION_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') ~= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class UserInfoCache:
+    """基于Redis的用户信息缓存"""
+
+    _stats = {'hits': 0, 'misses': 0}
+    _lock = threading.Lock()
+    _scripts = {}
+
+    @staticmethod
+    def _get_redis():
+        """获取Redis连接，未配置时返回None"""
+        try:
+            return current_app.config.get('SESSION_REDIS')
+        except RuntimeError:
+            return None
+
+    @classmethod
+    def _get_script(cls, redis_store):
+        """获取已注册的Lua脚本(按连接缓存，避免重复传输脚本内容)"""
+        script = cls._scripts.get(id(redis_store))
+        if script is None:
+            script = redis_store.register_script(SET_IF_VERSION_SCRIPT)
+            cls._scripts[id(redis_store)] = script
+        return script
+
+    @classmethod
+    def _record(cls, field):
+        """记录一次命中或未命中，累计到阈值后批量写入Redis"""
+        with cls._lock:
+            cls._stats[field] += 1
+            if cls._stats['hits'] + cls._stats['misses'] < STATS_FLUSH_THRESHOLD:
+                return
+            pending = dict(cls._stats)
+            cls._stats = {'hits': 0, 'misses': 0}
+        cls._flush(pending)
+
+    @classmethod
+    def _flush(cls, pending):
+        """将本地统计写入Redis"""
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return
+        try:
+            pipe = redis_store.pipeline(transaction=False)
+            for field, count in pending.items():
+                if count:
+                    pipe.hincrby(USER_INFO_STATS_KEY, field, count)
+            pipe.execute()
+        except Exception as e:
+            logging.error(f"写入用户缓存统计失败: {e}")
+
+    @classmethod
+    def get(cls, username):
+        """
+        从缓存读取用户信息
+
+        Args:
+            username: 用户名
+
+        Returns:
+            Tuple[Optional[dict], Optional[int]]: (缓存的用户信息, 版本号)；
+                未命中时用户信息为None，从数据库读取后将版本号传给 set；
+                Redis不可用时返回(None, None)
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return None, None
+        try:
+            raw, version = redis_store.mget(
+                f'{USER_INFO_PREFIX}{username}',
+                f'{USER_INFO_VERSION_PREFIX}{username}'
+            )
+        except Exception as e:
+            logging.error(f"读取用户缓存失败: {e}")
+            return None, None
+
+        version = int(version) if version else 0
+        if raw is None:
+            cls._record('misses')
+            return None, version
+        cls._record('hits')
+        return json.loads(raw), version
+
+    @classmethod
+    def set(cls, username, user_info, version):
+        """
+        写入用户信息缓存，版本号与读取缓存时不同则不写入
+
+        读取数据库期间用户信息被修改并失效时，本次读到的可能是旧数据，
+        此时跳过写入，下一次读取会重新加载。
+
+        Args:
+            username: 用户名
+            user_info: get_user_info 返回的字典
+            version: get 返回的版本号
+        """
+        redis_store = cls._get_redis()
+        if not redis_store or version is None:
+            return
+        try:
+            payload = json.dumps(user_info, separators=(',', ':'), ensure_ascii=False)
+            cls._get_script(redis_store)(
+                keys=[f'{USER_INFO_VERSION_PREFIX}{username}', f'{USER_INFO_PREFIX}{username}'],
+                args=[version, payload, USER_INFO_TTL]
+            )
+        except Exception as e:
+            logging.error(f"写入用户缓存失败: {e}")
+
+    @classmethod
+    def invalidate(cls, username):
+        """
+        删除用户信息缓存，并使读取中的旧数据不能再写入
+
+        Args:
+            username: 用户名
+        """
+        redis_store = cls._get_redis()
+        if not redis_store:
+            return
+        try:
+            pipe = redis_store.pipeline()
+            pipe.incr(f'{USER_INFO_VERSION_PREFIX}{username}')
+            pipe.delete(f'{USER_INFO_PREFIX}{username}')
+            pipe.execute()
+        except Exception as e:
+            logging.error(f"删除用户缓存失败: {e}")
+
+    @classmethod
+    def get_stats(cls):
+        """
+        获取缓存命中统计(所有worker汇总)
+
+        Returns:
+            dict: hits、misses和hit_rate
+        """
+        with cls._lock:
+            pending = dict(cls._stats)
+            cls._stats = {'hits': 0, 'misses': 0}
+        cls._flush(pending)
+
+        stats = {'hits': 0, 'misses': 0}
+        redis_store = cls._get_redis()
+        if redis_store:
+            try:
+                for field, value in redis_store.hgetall(USER_INFO_STATS_KEY).items():
+                    field = field.decode() if isinstance(field, bytes) else field
+                    stats[field] = int(value)
+            except Exception as e:
+                logging.error(f"读取用户缓存统计失败: {e}")
+
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 4) if total else 0.0
+        return stats
@@ -0,0 +1,282 @@
+"""
+用户批量导入导出模块
+
+这个模块负责：
+- 从CSV/NDJSON流式读取用户，按块处理，内存占用与文件大小无关
+- 在进程池中并行哈希密码(已有password_hash的记录直接导入，不再哈希)
+- 每块只用一次IN查询检测已存在的用户名，整块在一个事务中插入
+- 以CSV/NDJSON流式导出用户，可选包含密码哈希以便迁移
+"""
+
+import io
+import csv
+import json
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from .db_setup import db
+from .UserInformation import User
+from .password_hasher import _generate_hash
+from .hash_policy import HashPolicy
+
+# 每块处理的用户数
+TRANSFER_CHUNK_SIZE = 1000
+# 导出时每次从数据库读取的行数
+EXPORT_BATCH_SIZE = 1000
+
+# 导出的用户字段(不含密码哈希)
+EXPORT_FIELDS = [
+    'username', 'vip', 'admin', 'register_time', 'usericon_url', 'email', 'phone',
+    'real_name', 'bio', 'location', 'website', 'last_login'
+]
+# 导入时允许写入的用户字段
+IMPORT_FIELDS = set(EXPORT_FIELDS) | {'password_hash'}
+DATETIME_FIELDS = {'register_time', 'last_login'}
+BOOLEAN_FIELDS = {'vip', 'admin'}
+
+
+def _parse_bool(value):
+    """将CSV中的布尔值('1'、'true'、'是'等)转换为bool"""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y', '是')
+
+
+def _parse_datetime(value):
+    """解析 YYYY-MM-DD HH:MM:SS 格式的时间，空值返回None"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+def read_records(stream, fmt):
+    """
+    逐条读取导入文件中的用户记录
+
+    Args:
+        stream: 文本流
+        fmt: 'csv' 或 'ndjson'
+
+    Yields:
+        Tuple[int, dict]: (行号, 用户记录)
+    """
+    if fmt == 'csv':
+        # 第1行为表头
+        for line_no, record in enumerate(csv.DictReader(stream), start=2):
+            yield line_no, record
+    elif fmt == 'ndjson':
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, {'_error': f"JSON格式错误: {e}"}
+    else:
+        raise ValueError(f"不支持的格式: {fmt}")
+
+
+class UserTransfer:
+    """用户批量导入导出"""
+
+    @staticmethod
+    def _prepare(line_no, record):
+        """
+        校验并规范化一条导入记录
+
+        Returns:
+            Tuple[Optional[dict], Optional[str], Optional[str]]: (用户字段, 明文密码, 错误信息)
+        """
+        if record.get('_error'):
+            return None, None, record['_error']
+        username = (record.get('username') or '').strip()
+        password = record.get('password')
+        if not username:
+            return None, None, "用户名不能为空"
+        if not password and not record.get('password_hash'):
+            return None, None, "缺少password或password_hash"
+
+        row = {}
+        try:
+            for field in IMPORT_FIELDS:
+                value = record.get(field)
+                if value in (None, ''):
+                    continue
+                if field in BOOLEAN_FIELDS:
+                    value = _parse_bool(value)
+                elif field in DATETIME_FIELDS:
+                    value = _parse_datetime(value)
+                row[field] = value
+        except ValueError as e:
+            return None, None, f"字段格式错误: {e}"
+
+        row['username'] = username
+        row.setdefault('vip', False)
+        row.setdefault('admin', False)
+        row.setdefault('register_time', datetime.now().replace(microsecond=0))
+        return row, None if row.get('password_hash') else password, None
+
+    @staticmethod
+    def _insert_chunk(rows):
+        """
+        在一个事务中插入一块用户；违反唯一约束时逐行重试以定位失败的记录
+
+        Returns:
+            list: [(行号, 错误信息)]
+        """
+        try:
+            db.session.execute(db.insert(User), [row for _, row in rows])
+            db.session.commit()
+            return []
+        except Exception as e:
+            db.session.rollback()
+            logging.warning(f"批量插入失败，改为逐行插入: {getattr(e, 'orig', e)}")
+
+        errors = []
+        for line_no, row in rows:
+            try:
+                db.session.execute(db.insert(User), [row])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                errors.append((line_no, f"插入失败: {e.__class__.__name__}"))
+        return errors
+
+    @classmethod
+    def import_users(cls, records, chunk_size=TRANSFER_CHUNK_SIZE, workers=None, dry_run=False):
+        """
+        批量导入用户，需在应用上下文中调用
+
+        已存在的用户名和文件内重复的用户名会被跳过，不会覆盖现有用户。
+
+        Args:
+            records: read_records() 返回的 (行号, 记录) 迭代器
+            chunk_size: 每个事务插入的用户数
+            workers: 哈希进程数，None表示CPU核数
+            dry_run: 只校验和检测重复，不写入数据库
+
+        Returns:
+            dict: imported、skipped、failed 计数和 errors 列表[(行号, 错误信息)]
+        """
+        method = HashPolicy.get_method()
+        stats = {'imported': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+        seen = set()
+
+        def flush(chunk, executor):
+            usernames = [row['username'] for _, row, _ in chunk]
+            existing = {
+                username for (username,) in
+                User.query.with_entities(User.username).filter(User.username.in_(usernames)).all()
+            }
+
+            pending = []
+            for line_no, row, password in chunk:
+                if row['username'] in existing:
+                    stats['skipped'] += 1
+                    stats['errors'].append((line_no, f"用户 {row['username']} 已存在"))
+                else:
+                    pending.append((line_no, row, password))
+            if not pending:
+                return
+            if dry_run:
+                # 试运行时imported表示可以导入的数量
+                stats['imported'] += len(pending)
+                return
+
+            # 只对提供明文密码的记录哈希，并行在进程池中完成
+            to_hash = [(row, password) for _, row, password in pending if password is not None]
+            hashes = executor.map(_generate_hash, [p for _, p in to_hash], [method] * len(to_hash), chunksize=16)
+            for (row, _), password_hash in zip(to_hash, hashes):
+                row['password_hash'] = password_hash
+
+            errors = cls._insert_chunk([(line_no, row) for line_no, row, _ in pending])
+            stats['imported'] += len(pending) - len(errors)
+            stats['failed'] += len(errors)
+            stats['errors'].extend(errors)
+            logging.info(f"已导入 {stats['imported']} 个用户")
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk = []
+            for line_no, record in records:
+                row, password, error = cls._prepare(line_no, record)
+                if error:
+                    stats['failed'] += 1
+                    stats['errors'].append((line_no, error))
+                    continue
+                if row['username'] in seen:
+                    stats['skipped'] += 1
+                    stats['errors'].append((line_no, f"用户 {row['username']} 在文件中重复"))
+                    continue
+                seen.add(row['username'])
+
+                chunk.append((line_no, row, password))
+                if len(chunk) >= chunk_size:
+                    flush(chunk, executor)
+                    chunk = []
+            if chunk:
+                flush(chunk, executor)
+
+        # 新用户不会有权限快照或信息缓存，无需逐个失效
+        return stats
+
+    @staticmethod
+    def iter_users(include_hash=False, batch_size=EXPORT_BATCH_SIZE):
+        """
+        按id分批读取用户，需在应用上下文中调用
+
+        Yields:
+            dict: 用户字段，时间格式化为 YYYY-MM-DD HH:MM:SS
+        """
+        fields = EXPORT_FIELDS + (['password_hash'] if include_hash else [])
+        columns = [getattr(User, field) for field in fields]
+        last_id = 0
+        while True:
+            rows = (User.query.with_entities(User.id, *columns)
+                    .filter(User.id > last_id)
+                    .order_by(User.id)
+                    .limit(batch_size)
+                    .all())
+            if not rows:
+                return
+            for row in rows:
+                item = dict(zip(fields, row[1:]))
+                for field in DATETIME_FIELDS:
+                    if item[field]:
+                        item[field] = item[field].strftime('%Y-%m-%d %H:%M:%S')
+                yield item
+            last_id = rows[-1][0]
+            # 已导出的对象不再需要留在会话中
+            db.session.expunge_all()
+
+    @classmethod
+    def export_users(cls, fmt, include_hash=False):
+        """
+        流式导出用户
+
+        Args:
+            fmt: 'csv' 或 'ndjson'
+            include_hash: 是否包含密码哈希(用于迁移，导出文件需妥善保管)
+
+        Yields:
+            str: 导出文件的文本块
+        """
+        if fmt == 'ndjson':
+            for item in cls.iter_users(include_hash):
+                yield json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n'
+        elif fmt == 'csv':
+            fields = EXPORT_FIELDS + (['password_hash'] if include_hash else [])
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=fields)
+            writer.writeheader()
+            for count, item in enumerate(cls.iter_users(include_hash), start=1):
+                writer.writerow({k: int(v) if isinstance(v, bool) else v for k, v in item.items()})
+                if count % EXPORT_BATCH_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            raise ValueError(f"不支持的格式: {fmt}")
@@ -1,12 +1,12 @@
-from flask import Flask, render_template, redirect, url_for, session, request, jsonify, make_response
+from flask import Flask, render_template, redirect, url_for, session, request, jsonify, make_response, Response, stream_with_context
 from flask_cors import CORS
 from flask_babel import Babel, gettext as _, ngettext
 from werkzeug.utils import secure_filename
 import logging
 import os
-from uuid import uuid4
+import json
 from functools import wraps
-from common.config import load_server_config
+from common.route_flags import sessionless, is_sessionless_request
 
 # 配置日志
 logging.basicConfig(
@@ -26,6 +26,9 @@ app.config['BABEL_LANGUAGES'] = ['zh', 'en']
 app.config['BABEL_TRANSLATION_DIRECTORIES'] = 'translations'
 
 def get_locale():
+    # 静态文件和机器间接口不需要翻译
+    if is_sessionless_request():
+        return app.config['BABEL_DEFAULT_LOCALE']
     # 优先从cookie中获取语言设置
     if request.cookies.get('lang'):
         return request.cookies.get('lang')
@@ -46,13 +49,40 @@ app.jinja_env.install_gettext_callables(
 from common.config import init_app
 init_app(app)
 
+# 位于反向代理之后时，request.remote_addr 取X-Forwarded-For中的真实客户端IP(登录限流按IP计数)
+from werkzeug.middleware.proxy_fix import ProxyFix
+if app.config.get('PROXY_FIX_X_FOR'):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+# 配置了Redis时使用服务端会话
+from common.redis_session import init_session, regenerate_session
+init_session(app)
+
 # 初始化数据库
 from common.db_setup import db, init_db
 init_db(app)
 
+# 预先计算密码哈希策略，登录时判断是否需要重新哈希不再运行哈希函数
+from common.hash_policy import HashPolicy
+HashPolicy.init_app(app)
+
+# 请求指标(需在其他before_request钩子之前注册，才能统计到它们的SQL和Redis调用)
+from common.metrics import Metrics
+with app.app_context():
+    Metrics.init_app(app, db.engines.values())
+
 # 导入模型和功能模块
-from common.UserInformation import UserInformation, UserApply
+from common.UserInformation import UserInformation, UserApply, ensure_indexes
+ensure_indexes(app)
 from common.token_manager import TokenManager
+from common.permission_cache import PermissionCache
+from common.session_index import SessionIndex
+from common.password_hasher import HashingBusyError
+from common.rate_limiter import LoginRateLimiter
+from common.user_transfer import UserTransfer
+from common.service_auth import ServiceTokenAuth
+# 加载服务令牌，配置中的明文server_token转换为摘要
+ServiceTokenAuth.init_app(app)
 from models import User
 
 # 确保上传目录存在
@@ -65,13 +95,34 @@ def index():
 
 @app.before_request
 def sync_user_permission():
+    if is_sessionless_request():
+        # 不读取会话，也就没有需要同步的权限
+        return
     if session.get("IsLogin") and session.get("username"):
-        user_info = UserInformation.get_user_info(session["username"])
-        if user_info:
-            session["vip"] = user_info["vip"]
-            session["admin"] = user_info["admin"]
+        username = session["username"]
+        snapshot = PermissionCache.get(username)
+        if not snapshot:
+            # 用户已被删除
+            session.clear()
+            return
+        if snapshot["force_logout"]:
+            # 管理员要求强制下线
+            UserInformation.logout_everywhere(username)
+            session.clear()
+            return
+        # 会话已被注销(在所有设备上退出、权限被收回)；版本号未变化时不访问Redis
+        if SessionIndex.available():
+            sid = session.get("sid")
+            if not sid or not SessionIndex.is_active(username, sid, snapshot["version"]):
+                session.clear()
+                return
+        if session.get("vip") != snapshot["vip"]:
+            session["vip"] = snapshot["vip"]
+        if session.get("admin") != snapshot["admin"]:
+            session["admin"] = snapshot["admin"]
 
 @app.route('/set_language/<lang_code>')
+@sessionless
 def set_language(lang_code):
     if lang_code not in ['en', 'zh']:
         lang_code = 'zh'  # 默认中文
@@ -96,17 +147,29 @@ def login():
     elif request.method == "POST":
         username = request.form.get("username")
         password = request.form.get("password")
-        user_info = UserInformation.verify_user(username, password)
+        allowed, reason = LoginRateLimiter.check(username, request.remote_addr)
+        if not allowed:
+            return render_template('login.html', error=reason, is_oauth=is_oauth), 429
+        try:
+            user_info = UserInformation.verify_user(username, password)
+        except HashingBusyError as e:
+            return render_template('login.html', error=str(e), is_oauth=is_oauth), 503
         if user_info:
-            redis_store = app.config.get('SESSION_REDIS')
-
+            LoginRateLimiter.reset(username)
+
+            # 更换会话键，登录前的键(含OAuth流程字段)复制到新键后作废；
+            # 同一浏览器之前登录的会话从索引中移除
+            if session.get("sid"):
+                SessionIndex.revoke(session.get("username"), session["sid"])
+            regenerate_session(session)
+            # Cookie与Redis中的会话同时过期
+            session.permanent = True
             session["IsLogin"] = True
             session["username"] = user_info["username"]
             session["vip"] = user_info["vip"]
             session["admin"] = user_info["admin"]
-
-            session_id = request.cookies.get('session') or session.sid if hasattr(session, 'sid') else str(uuid4())
-            redis_store.set(f'user_session:{username}', session_id)
+            # 登记到用户的会话索引，用于在所有设备上退出
+            session["sid"] = SessionIndex.register(user_info["username"])
 
             # 如果是OAuth流程，生成令牌并重定向
             if 'oauth_client_id' in session and 'oauth_redirect_uri' in session:
@@ -151,7 +214,10 @@ def signup():
     elif request.method == "POST":
         username = request.form.get("username")
         password = request.form.get("password")
-        response, back_text = UserInformation.store_user(username, password)
+        try:
+            response, back_text = UserInformation.store_user(username, password)
+        except HashingBusyError as e:
+            return render_template('sign.html', error=str(e)), 503
         if response:
             return redirect(url_for("login"))
         else:
@@ -159,6 +225,8 @@ def signup():
 
 @app.route('/logout')
 def logout():
+    if session.get("username"):
+        SessionIndex.revoke(session["username"], session.get("sid"))
     session.clear()
     return redirect(url_for("login"))
 
@@ -190,6 +258,32 @@ def apply():
         else:
             return render_template('apply.html', error=back_text)
 
+# 审核页每页显示的申请数
+APPLY_REVIEW_PAGE_SIZE = 50
+
+def _render_review_queue(**messages):
+    """按请求参数渲染审核队列页面(默认只显示待审核申请)"""
+    status = request.args.get('status', 'pending')
+    permission = request.args.get('permission') or None
+    try:
+        apply_list, next_cursor = UserApply.review_queue(
+            status, permission,
+            limit=request.args.get('limit', APPLY_REVIEW_PAGE_SIZE),
+            cursor=request.args.get('cursor') or None
+        )
+    except ValueError:
+        status, permission = 'pending', None
+        apply_list, next_cursor = UserApply.review_queue(status, limit=APPLY_REVIEW_PAGE_SIZE)
+    return render_template(
+        'apply_change.html',
+        apply_list=apply_list,
+        next_cursor=next_cursor,
+        counts=UserApply.count_by_status(permission),
+        current_status=status,
+        current_permission=permission,
+        **messages
+    )
+
 @app.route('/apply_change', methods=["GET", "POST"])
 def apply_change():
     if not session.get("IsLogin"):
@@ -197,9 +291,25 @@ def apply_change():
     if not session.get("admin"):
         return redirect(url_for("home"))
 
-    apply_list = UserApply.query.all()
     if request.method == "GET":
-        return render_template('apply_change.html', apply_list=list(reversed(apply_list)))
+        return _render_review_queue()
+    elif request.method == "POST" and request.form.get("batch_status"):
+        # 批量审核：勾选项的值为 "用户名:权限"
+        status = request.form.get("batch_status")
+        decisions = []
+        for item in request.form.getlist("selected"):
+            username, _, permission = item.rpartition(":")
+            decisions.append({"username": username, "permission": permission, "status": status})
+        if not decisions:
+            return _render_review_queue(error="请先勾选要审核的申请")
+        try:
+            _, results = UserApply.batch_change_apply(decisions)
+        except ValueError as e:
+            return _render_review_queue(error=str(e))
+        failed = [f"{r['username']}({r['permission']}): {r['message']}" for r in results if not r['success']]
+        if failed:
+            return _render_review_queue(error=f"{len(results) - len(failed)} 条已更新，失败: " + "; ".join(failed))
+        return _render_review_queue(success=f"已批量更新 {len(results)} 条申请")
     elif request.method == "POST":
         username = request.form.get("username")
         permission = request.form.get("permission")
@@ -209,18 +319,116 @@ def apply_change():
 
         try:
             result = UserApply.change_apply(username, permission, status)
-            response, back_text = result
+            response, back_text = result[0], result[1]
             if len(result) > 2:
                 status = result[2]
                 back_text += f", 用户{username}的{permission}权限被设为{status}"
         except Exception as e:
             logging.error(f"修改权限申请时出错: {e}")
-            return render_template('apply_change.html', apply_list=apply_list, error=f"操作失败: {e}")
+            return _render_review_queue(error=f"操作失败: {e}")
 
         if response:
-            return render_template('apply_change.html', apply_list=apply_list, success=back_text)
+            return _render_review_queue(success=back_text)
         else:
-            return render_template('apply_change.html', apply_list=apply_list, error=back_text)
+            return _render_review_queue(error=back_text)
+
+@app.route('/api/apply/queue', methods=['GET'])
+def apply_queue():
+    """
+    审核队列API
+    
+    Query参数：
+    - status: pending(默认)/approved/rejected/all
+    - permission: 可选，按申请的权限筛选
+    - limit: 每页条数，默认50，最大200
+    - cursor: 上一页返回的next_cursor
+    """
+    if not session.get("IsLogin") or not session.get("admin"):
+        return jsonify({"error": "未授权"}), 403
+    try:
+        apply_list, next_cursor = UserApply.review_queue(
+            request.args.get('status', 'pending'),
+            request.args.get('permission') or None,
+            limit=request.args.get('limit', APPLY_REVIEW_PAGE_SIZE),
+            cursor=request.args.get('cursor') or None
+        )
+    except ValueError as e:
+        return jsonify({"error": f"参数错误: {e}"}), 400
+    return jsonify({"items": apply_list, "next_cursor": next_cursor})
+
+@app.route('/api/apply/batch', methods=['POST'])
+def apply_batch():
+    """
+    批量审核权限申请
+    
+    请求体：
+    {
+        "decisions": [{"username": "...", "permission": "vip", "status": true}, ...]
+    }
+    
+    所有修改在一次提交中完成，返回每一项的结果。
+    """
+    if not session.get("IsLogin") or not session.get("admin"):
+        return jsonify({"error": "未授权"}), 403
+    data = request.get_json(silent=True) or {}
+    decisions = data.get('decisions')
+    if not isinstance(decisions, list) or not all(isinstance(d, dict) for d in decisions):
+        return jsonify({"error": "decisions必须是对象数组"}), 400
+    try:
+        success, results = UserApply.batch_change_apply(decisions)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"success": success, "results": results})
+
+@app.route('/api/apply/count', methods=['GET'])
+def apply_count():
+    """按审核状态统计申请数量，可用permission参数筛选"""
+    if not session.get("IsLogin") or not session.get("admin"):
+        return jsonify({"error": "未授权"}), 403
+    return jsonify(UserApply.count_by_status(request.args.get('permission') or None))
+
+@app.route('/api/users/export', methods=['GET'])
+def export_users():
+    """
+    流式导出用户(不含密码哈希)
+    
+    Query参数：
+    - format: ndjson(默认)或csv
+    
+    包含密码哈希的迁移导出请使用 transfer_users.py。
+    """
+    if not session.get("IsLogin") or not session.get("admin"):
+        return jsonify({"error": "未授权"}), 403
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({"error": "format只支持ndjson或csv"}), 400
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(UserTransfer.export_users(fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=users.{fmt}'
+    return response
+
+# 用户管理页每页显示的用户数
+USER_MANAGE_PAGE_SIZE = 50
+
+def _parse_flag(value):
+    """将'1'/'0'、'true'/'false'形式的筛选参数转换为布尔值，未提供时返回None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes')
+
+def _user_list_filters(args):
+    """从请求参数中提取用户列表的分页和筛选条件"""
+    return {
+        'limit': args.get('limit', USER_MANAGE_PAGE_SIZE),
+        'cursor': args.get('cursor', 0),
+        'username_prefix': args.get('prefix') or None,
+        'vip': _parse_flag(args.get('vip')),
+        'admin': _parse_flag(args.get('admin')),
+        'registered_from': args.get('registered_from') or None,
+        'registered_to': args.get('registered_to') or None,
+    }
 
 @app.route('/user_manage', methods=["GET", "POST"])
 def user_manage():
@@ -229,22 +437,6 @@ def user_manage():
     if not session.get("admin"):
         return redirect(url_for("home"))
 
-    try:
-        user_list = UserInformation.get_users_info_list()
-        formatted_users = [
-            {
-                "id": idx,
-                "time": user.get("register_time", ""),
-                "username": user.get("username", ""),
-                "permission": "管理员" if user.get("admin") else "普通用户",
-                "vip": "拥有" if user.get("vip") else "无"
-            }
-            for idx, user in enumerate(user_list, start=1)
-        ]
-    except Exception as e:
-        logging.error(f"获取用户信息时出错: {e}")
-        return render_template('user_manage.html', user_list=[], error=f"加载用户信息失败: {e}")
-
     success = None
     error = None
 
@@ -263,21 +455,11 @@ def user_manage():
                 response, back_text = UserInformation.store_user(add_username, add_password, add_vip, add_admin)
                 if response:
                     success = f"用户 {add_username} 已成功添加"
-                    user_list = UserInformation.get_users_info_list()
-                    formatted_users = [
-                        {
-                            "id": idx,
-                            "time": user.get("register_time", ""),
-                            "username": user.get("username", ""),
-                            "permission": "管理员" if user.get("admin") else "普通用户",
-                            "vip": "拥有" if user.get("vip") else "无"
-                        }
-                        for idx, user in enumerate(user_list, start=1)
-                    ]
                     print(f"用户 {add_username} 已成功添加")
-
                 else:
                     error = back_text
+            except HashingBusyError as e:
+                error = str(e)
             except Exception as e:
                 logging.error(f"添加用户时出错: {e}")
                 error = f"添加用户失败: {e}"
@@ -288,17 +470,6 @@ def user_manage():
                 response, back_text = UserInformation.delete_user(username)
                 if response:
                     success = f"用户 {username} 已成功删除"
-                    user_list = UserInformation.get_users_info_list()
-                    formatted_users = [
-                        {
-                            "id": idx,
-                            "time": user.get("register_time", ""),
-                            "username": user.get("username", ""),
-                            "permission": "管理员" if user.get("admin") else "普通用户",
-                            "vip": "拥有" if user.get("vip") else "无"
-                        }
-                        for idx, user in enumerate(user_list, start=1)
-                    ]
                     print(f"用户 {username} 已成功删除")
                 else:
                     error = back_text
@@ -306,39 +477,59 @@ def user_manage():
                 logging.error(f"删除用户时出错: {e}")
                 error = f"删除用户失败: {e}"
 
+        # 处理在所有设备上退出请求
+        elif request.form.get("logout_all") and username:
+            try:
+                response, back_text = UserInformation.logout_everywhere(username)
+                if response:
+                    success = back_text
+                else:
+                    error = back_text
+            except Exception as e:
+                logging.error(f"注销用户会话时出错: {e}")
+                error = f"注销用户会话失败: {e}"
+
         # 处理权限修改请求
         elif request.form.get("username"):
             username = request.form.get("username")
             vip_status = request.form.get("vip") == "1"
             admin_status = request.form.get("admin") == "1"
             try:
-                response, back_text, _ = UserApply.change_apply(username, "vip", "True" if vip_status else "False", need_entry=False)
+                response, results = UserApply.batch_change_apply([
+                    {"username": username, "permission": "vip", "status": vip_status},
+                    {"username": username, "permission": "admin", "status": admin_status},
+                ], need_entry=False)
                 if response:
-                    response, back_text, _ = UserApply.change_apply(username, "admin", "True" if admin_status else "False", need_entry=False)
-                    if response:
-                        success = f"用户 {username} 的权限已成功更新"
-                        user_list = UserInformation.get_users_info_list()
-                        formatted_users = [
-                            {
-                                "id": idx,
-                                "time": user.get("register_time", ""),
-                                "username": user.get("username", ""),
-                                "permission": "管理员" if user.get("admin") else "普通用户",
-                                "vip": "拥有" if user.get("vip") else "无"
-                            }
-                            for idx, user in enumerate(user_list, start=1)
-                        ]
-                    else:
-                        error = back_text
+                    success = f"用户 {username} 的权限已成功更新"
                 else:
-                    error = back_text
+                    error = next(r['message'] for r in results if not r['success'])
             except Exception as e:
                 logging.error(f"更新用户权限时出错: {e}")
                 error = f"更新用户权限失败: {e}"
 
+    # 处理完操作后只加载一次当前页
+    filters = _user_list_filters(request.args)
+    try:
+        user_list, next_cursor = UserInformation.list_users(**filters)
+        formatted_users = [
+            {
+                "id": user.get("id"),
+                "time": user.get("register_time", ""),
+                "username": user.get("username", ""),
+                "permission": "管理员" if user.get("admin") else "普通用户",
+                "vip": "拥有" if user.get("vip") else "无"
+            }
+            for user in user_list
+        ]
+    except Exception as e:
+        logging.error(f"获取用户信息时出错: {e}")
+        return render_template('user_manage.html', user_list=[], filters={}, error=f"加载用户信息失败: {e}")
+
     return render_template(
         "user_manage.html",
         user_list=formatted_users,
+        next_cursor=next_cursor,
+        filters=request.args.to_dict(),
         success=success,
         error=error
     )
@@ -553,32 +744,100 @@ def manage_oauth_clients():
         logging.error(f"管理OAuth客户端失败: {e}")
         return jsonify({"error": str(e)}), 500
 
+# 用户数据分页参数
+USER_DATA_PAGE_SIZE = 100
+USER_DATA_MAX_PAGE_SIZE = 1000
+# 流式导出时每批从游标读取的行数
+USER_DATA_STREAM_BATCH = 1000
+
+def _parse_page_args(default_limit=USER_DATA_PAGE_SIZE, max_limit=USER_DATA_MAX_PAGE_SIZE):
+    """
+    解析limit/cursor分页参数
+    
+    Returns:
+        Tuple[int, int]: (limit, cursor)，cursor为上一页最后一条记录的id
+        
+    Raises:
+        ValueError: 参数不是整数
+    """
+    limit = int(request.args.get('limit', default_limit))
+    cursor = int(request.args.get('cursor', 0))
+    return max(1, min(limit, max_limit)), max(0, cursor)
+
+def _user_data_columns(UserData):
+    """列表查询只选择需要的列"""
+    return (UserData.id, UserData.user_id, UserData.data_key, UserData.data_value,
+            UserData.created_at, UserData.updated_at)
+
+def _format_user_data(data, parse_json=False):
+    """将用户数据行转换为字典，可选将JSON字符串还原为对象"""
+    data_value = data.data_value
+    if parse_json and data_value and isinstance(data_value, str) and data_value.strip().startswith('{'):
+        try:
+            data_value = json.loads(data_value)
+        except json.JSONDecodeError:
+            # 如果不是有效的JSON字符串，保持原样
+            data_value = data.data_value
+    return {
+        'id': data.id,
+        'user_id': data.user_id,
+        'data_key': data.data_key,
+        'data_value': data_value,
+        'created_at': data.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': data.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def _user_data_query(UserData, target_username=None):
+    """按id排序的用户数据查询"""
+    from models import db
+    query = db.session.query(*_user_data_columns(UserData))
+    if target_username:
+        query = query.filter(UserData.user_id == target_username)
+    return query.order_by(UserData.id)
+
+def _user_data_page(UserData, limit, cursor, target_username=None, parse_json=False):
+    """
+    按id做键集分页，每页耗时与表大小无关
+    
+    Returns:
+        Tuple[list, Optional[int]]: (当前页数据, 下一页cursor)
+    """
+    rows = (_user_data_query(UserData, target_username)
+            .filter(UserData.id > cursor)
+            .limit(limit + 1)
+            .all())
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return [_format_user_data(row, parse_json) for row in rows[:limit]], next_cursor
+
+def _stream_user_data(UserData, target_username=None):
+    """以NDJSON格式逐行输出用户数据，使用服务端游标，内存占用恒定"""
+    query = _user_data_query(UserData, target_username).execution_options(
+        stream_results=True,
+        yield_per=USER_DATA_STREAM_BATCH
+    )
+    for row in query:
+        yield json.dumps(_format_user_data(row, parse_json=True), ensure_ascii=False) + '\n'
+
 @app.route('/user_data_manage')
 def user_data_manage():
-    """用户数据管理页面"""
+    """用户数据管理页面(按id分页)"""
     if not session.get("IsLogin"):
         return redirect(url_for("login"))
     if not session.get("admin"):
         return redirect(url_for("home"))
     
     from models import UserData
-    all_data = UserData.query.all()
-    
-    # 将SQLAlchemy对象转换为字典列表
-    formatted_data = [
-        {
-            'id': data.id,
-            'user_id': data.user_id,
-            'data_key': data.data_key,
-            'data_value': data.data_value,
-            'created_at': data.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': data.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
-        for data in all_data
-    ]
+    try:
+        limit, cursor = _parse_page_args()
+    except ValueError:
+        limit, cursor = USER_DATA_PAGE_SIZE, 0
+    formatted_data, next_cursor = _user_data_page(UserData, limit, cursor)
     
     return render_template('user_data_manage.html', 
                          user_data=formatted_data,
+                         next_cursor=next_cursor,
+                         is_first_page=(cursor == 0),
+                         limit=limit,
                          username=session.get("username"))
 
 @app.route('/api/user_data', methods=['GET', 'POST', 'DELETE'])
@@ -637,25 +896,21 @@ def handle_user_data():
     from models import UserData, db
     username = session.get("username")
     is_admin = session.get("admin")
-    server_info = load_server_config()
-    # 检查server_token
+    # 检查server_token(服务间调用)，只在内存中比对令牌摘要
+    service_authenticated = False
     if request.is_json:
         data = request.json
         server_token = data.get('server_token')
-        if server_token:
-            try:
-                
-                if server_info and server_info.get('server_settings', {}).get('server_token') == server_token:
-                    is_admin = True
-                    username = data.get('username')  # 使用请求中的username
-                    if not username:
-                        return jsonify({"error": "使用server_token时必须提供username"}), 400
-            except Exception as e:
-                logging.error(f"验证server_token时出错: {e}")
-                return jsonify({"error": f"验证server_token时出错: {str(e)}"}), 500
+        if server_token and ServiceTokenAuth.verify(server_token):
+            service_authenticated = True
+            is_admin = True
+            username = data.get('username')  # 使用请求中的username
+            if not username:
+                return jsonify({"error": "使用server_token时必须提供username"}), 400
     
     if request.args.get('server_token'):
-        if request.args.get('server_token') == server_info.get('server_settings', {}).get('server_token'):
+        if ServiceTokenAuth.verify(request.args.get('server_token')):
+            service_authenticated = True
             is_admin = True
             username = request.args.get('username')  # 使用URL参数中的username
             if not username:
@@ -674,35 +929,34 @@ def handle_user_data():
                     user_exists = UserInformation.get_user_info(target_username)
                     if not user_exists:
                         return jsonify({"error": f"用户 {target_username} 不存在"}), 404
-                    user_data = UserData.query.filter_by(user_id=target_username).all()
-                else:
-                    # 管理员查看所有数据
-                    user_data = UserData.query.all()
-                
-                if user_data is None:
-                    return jsonify({"error": "获取数据失败"}), 500
-                
-                # 尝试将JSON字符串转换回字典
-                formatted_data = []
-                for data in user_data:
-                    try:
-                        import json
-                        data_value = data.data_value
-                        if data_value and isinstance(data_value, str) and data_value.strip().startswith('{'):
-                            data_value = json.loads(data_value)
-                    except json.JSONDecodeError:
-                        # 如果不是有效的JSON字符串，保持原样
-                        data_value = data.data_value
 
-                    formatted_data.append({
-                        'id': data.id,
-                        'user_id': data.user_id,
-                        'data_key': data.data_key,
-                        'data_value': data_value,
-                        'created_at': data.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                        'updated_at': data.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+                # 流式输出: format=ndjson
+                if request.args.get('format') == 'ndjson':
+                    return Response(
+                        stream_with_context(_stream_user_data(UserData, target_username)),
+                        mimetype='application/x-ndjson'
+                    )
+
+                # 键集分页: limit/cursor
+                if request.args.get('limit') or request.args.get('cursor'):
+                    try:
+                        limit, cursor = _parse_page_args()
+                    except ValueError:
+                        return jsonify({"error": "limit和cursor必须是整数"}), 400
+                    items, next_cursor = _user_data_page(
+                        UserData, limit, cursor, target_username, parse_json=True
+                    )
+                    return jsonify({
+                        'items': items,
+                        'next_cursor': next_cursor,
+                        'limit': limit
                     })
-                return jsonify(formatted_data)
+
+                # 不带分页参数时保持原有的数组格式
+                query = _user_data_query(UserData, target_username).execution_options(
+                    yield_per=USER_DATA_STREAM_BATCH
+                )
+                return jsonify([_format_user_data(data, parse_json=True) for data in query])
             else:
                 # 普通用户获取自己的数据
                 if data_key:
@@ -768,7 +1022,7 @@ def handle_user_data():
                     return jsonify({"error": "用户名不能为空"}), 400
 
                 # 如果使用server_token，直接使用提供的username
-                if server_token and server_token == server_info.get('server_settings', {}).get('server_token'):
+                if service_authenticated:
                     target_username = data.get('username')
                     if not target_username:
                         return jsonify({"error": "使用server_token时必须提供username"}), 400
@@ -947,6 +1201,36 @@ def handle_user_data():
         logging.error(f"用户数据操作失败: {e}")
         return jsonify({"error": str(e)}), 500
 
+# 批量操作时IN列表的分块大小(低于SQLite的参数数量上限)
+BULK_IN_CHUNK_SIZE = 500
+
+def _chunked(items, size):
+    """将列表按固定大小分块"""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _load_user_data_rows(UserData, username, keys):
+    """
+    用IN查询一次取出用户的多条数据记录
+    
+    Args:
+        UserData: 用户数据模型
+        username: 用户名
+        keys: 数据键名集合
+        
+    Returns:
+        dict: {data_key: UserData}
+    """
+    rows = {}
+    for chunk in _chunked(keys, BULK_IN_CHUNK_SIZE):
+        for user_data in UserData.query.filter(
+            UserData.user_id == username,
+            UserData.data_key.in_(chunk)
+        ).all():
+            rows[user_data.data_key] = user_data
+    return rows
+
 @app.route('/api/user_data/bulk', methods=['POST', 'DELETE'])
 def handle_bulk_user_data():
     """
@@ -1046,20 +1330,25 @@ def handle_bulk_user_data():
             success_count = 0
             failed_operations = []
             try:
+                # 一次IN查询取出所有涉及的已有记录(非字符串的键在下面逐条报错)
+                keys = {item['key'] for item in data_list
+                        if item['action'] in ['get', 'add', 'update'] and isinstance(item['key'], str)}
+                existing = _load_user_data_rows(UserData, username, keys)
+                new_rows = []
+                user_exists = None
+
                 for item in data_list:
                     try:
+                        if not isinstance(item['key'], str):
+                            failed_operations.append({
+                                'key': item['key'],
+                                'error': '键名必须是字符串'
+                            })
+                            continue
+                        user_data = existing.get(item['key'])
                         if item['action'] == 'get':
                             # 获取数据
-                            user_data = UserData.query.filter_by(user_id=username, data_key=item['key']).first()
                             if user_data:
-                                item['result'] = {
-                                    'id': user_data.id,
-                                    'user_id': user_data.user_id,
-                                    'data_key': user_data.data_key,
-                                    'data_value': user_data.data_value,
-                                    'created_at': user_data.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                                    'updated_at': user_data.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-                                }
                                 success_count += 1
                             else:
                                 failed_operations.append({
@@ -1067,8 +1356,6 @@ def handle_bulk_user_data():
                                     'error': '数据不存在'
                                 })
                         elif item['action'] in ['add', 'update']:
-                            # 尝试更新现有数据
-                            user_data = UserData.query.filter_by(user_id=username, data_key=item['key']).first()
                             if user_data and item['action'] == 'add':
                                 # 如果是添加操作但数据已存在
                                 failed_operations.append({
@@ -1093,10 +1380,12 @@ def handle_bulk_user_data():
                                 data_value = str(data_value)
 
                             if user_data:
+                                # 已加载的记录在提交时合并为批量UPDATE
                                 user_data.data_value = data_value
                             else:
-                                # 检查用户是否存在
-                                user_exists = UserInformation.get_user_info(username)
+                                # 检查用户是否存在(整批只查一次)
+                                if user_exists is None:
+                                    user_exists = bool(UserInformation.get_user_info(username))
                                 if not user_exists:
                                     failed_operations.append({
                                         'key': item['key'],
@@ -1104,36 +1393,22 @@ def handle_bulk_user_data():
                                     })
                                     continue
 
-                                # 使用UserData的add_data方法添加数据
-                                result = UserData.add_data(
+                                user_data = UserData(
                                     user_id=username,
                                     data_key=item['key'],
                                     data_value=data_value
                                 )
-                            
-                                if isinstance(result, dict) and 'error' in result:
-                                    failed_operations.append({
-                                        'key': item['key'],
-                                        'error': result['error']
-                                    })
-                                    continue
+                                new_rows.append(user_data)
+                                existing[item['key']] = user_data
                             success_count += 1
-                            
-                            # 返回操作结果
-                            item['result'] = {
-                                'id': user_data.id,
-                                'user_id': user_data.user_id,
-                                'data_key': user_data.data_key,
-                                'data_value': user_data.data_value,
-                                'created_at': user_data.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                                'updated_at': user_data.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-                            }
                     except Exception as op_error:
                         failed_operations.append({
                             'key': item['key'],
                             'error': str(op_error)
                         })
                 
+                # 新记录批量INSERT，与更新一起在同一事务中提交
+                db.session.add_all(new_rows)
                 db.session.commit()
                 return jsonify({
                     "message": f"批量操作完成，成功 {success_count} 条，失败 {len(failed_operations)} 条",
@@ -1158,98 +1433,89 @@ def handle_bulk_user_data():
                 keys = request.json
                 if not isinstance(keys, list):
                     return jsonify({"error": "请求体必须是数组或包含operations数组的对象"}), 400
-                
-                success_count = 0
+                total_count = len(keys)
                 failed_operations = []
-                try:
-                    for key in keys:
-                        try:
-                            user_data = UserData.query.filter_by(user_id=username, data_key=key).first()
-                            if user_data:
-                                db.session.delete(user_data)
-                                success_count += 1
-                            else:
-                                failed_operations.append({
-                                    'key': key,
-                                    'error': '数据不存在'
-                                })
-                        except Exception as op_error:
-                            failed_operations.append({
-                                'key': key,
-                                'error': str(op_error)
-                            })
-                    
-                    db.session.commit()
-                    return jsonify({
-                        "message": f"批量删除完成，成功 {success_count} 条，失败 {len(failed_operations)} 条",
-                        "success_count": success_count,
-                        "total_count": len(keys),
-                        "failed_operations": failed_operations
-                    })
-                except Exception as e:
-                    db.session.rollback()
-                    return jsonify({
-                        "error": f"批量删除失败: {str(e)}",
-                        "success_count": success_count,
-                        "total_count": len(keys),
-                        "failed_operations": failed_operations
-                    }), 400
             else:
                 # 新格式，使用operations数组
                 data_list = data['operations']
                 if not isinstance(data_list, list):
                     return jsonify({"error": "operations必须是数组"}), 400
-                
-                success_count = 0
+                total_count = len(data_list)
                 failed_operations = []
-                try:
-                    for item in data_list:
-                        if not isinstance(item, dict) or 'key' not in item or 'action' not in item:
-                            failed_operations.append({
-                                'error': '数据格式错误，每个操作必须包含key和action字段'
-                            })
-                            continue
-                        
-                        if item['action'] != 'delete':
-                            continue
-                        
-                        try:
-                            user_data = UserData.query.filter_by(user_id=username, data_key=item['key']).first()
-                            if user_data:
-                                db.session.delete(user_data)
-                                success_count += 1
-                            else:
-                                failed_operations.append({
-                                    'key': item['key'],
-                                    'error': '数据不存在'
-                                })
-                        except Exception as op_error:
-                            failed_operations.append({
-                                'key': item['key'],
-                                'error': str(op_error)
-                            })
-                    
-                    db.session.commit()
-                    return jsonify({
-                        "message": f"批量删除完成，成功 {success_count} 条，失败 {len(failed_operations)} 条",
-                        "success_count": success_count,
-                        "total_count": len(data_list),
-                        "failed_operations": failed_operations
+                keys = []
+                for item in data_list:
+                    if not isinstance(item, dict) or 'key' not in item or 'action' not in item:
+                        failed_operations.append({
+                            'error': '数据格式错误，每个操作必须包含key和action字段'
+                        })
+                        continue
+                    if item['action'] != 'delete':
+                        continue
+                    keys.append(item['key'])
+
+            success_count = 0
+            try:
+                invalid_keys = [key for key in keys if not isinstance(key, str)]
+                keys = [key for key in keys if isinstance(key, str)]
+                for key in invalid_keys:
+                    failed_operations.append({
+                        'key': key,
+                        'error': '键名必须是字符串'
                     })
-                except Exception as e:
-                    db.session.rollback()
-                    return jsonify({
-                        "error": f"批量删除失败: {str(e)}",
-                        "success_count": success_count,
-                        "total_count": len(data_list),
-                        "failed_operations": failed_operations
-                    }), 400
+
+                # 一次IN查询找出存在的记录，再用IN批量删除
+                existing = _load_user_data_rows(UserData, username, set(keys))
+                delete_ids = []
+                for key in keys:
+                    user_data = existing.pop(key, None)
+                    if user_data:
+                        delete_ids.append(user_data.id)
+                        success_count += 1
+                    else:
+                        failed_operations.append({
+                            'key': key,
+                            'error': '数据不存在'
+                        })
+
+                for chunk in _chunked(delete_ids, BULK_IN_CHUNK_SIZE):
+                    UserData.query.filter(UserData.id.in_(chunk)).delete(synchronize_session=False)
+                
+                db.session.commit()
+                return jsonify({
+                    "message": f"批量删除完成，成功 {success_count} 条，失败 {len(failed_operations)} 条",
+                    "success_count": success_count,
+                    "total_count": total_count,
+                    "failed_operations": failed_operations
+                })
+            except Exception as e:
+                db.session.rollback()
+                return jsonify({
+                    "error": f"批量删除失败: {str(e)}",
+                    "success_count": success_count,
+                    "total_count": total_count,
+                    "failed_operations": failed_operations
+                }), 400
             
     except Exception as e:
         logging.error(f"批量操作用户数据失败: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics')
+@sessionless
+def metrics():
+    """
+    Prometheus格式的请求指标
+    
+    需要服务令牌：Authorization: Bearer <server_token> 或 ?server_token=
+    """
+    auth_header = request.headers.get('Authorization', '')
+    token = auth_header[7:] if auth_header.startswith('Bearer ') else request.args.get('server_token')
+    if not ServiceTokenAuth.verify(token):
+        return jsonify({"error": "未授权"}), 401
+    return Response(Metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/<string:api_post>', methods=["POST"])
+@sessionless
 def api(api_post):
     username = request.json.get('username')
     api_token = request.json.get('api_token')
@@ -1275,6 +1541,15 @@ def api(api_post):
                 logging.info(f"用户 {username} 进行了获取服务器信息的操作")
                 return jsonify(server_info)
             case "get_user_list":
+                # 带分页或筛选参数时返回分页结果，否则保持原有的用户名数组
+                list_args = ('limit', 'cursor', 'prefix', 'vip', 'admin', 'registered_from', 'registered_to')
+                if any(request.json.get(arg) is not None for arg in list_args):
+                    try:
+                        user_list, next_cursor = UserInformation.list_users(**_user_list_filters(request.json))
+                    except ValueError as e:
+                        return jsonify({"error": f"参数格式错误: {e}"}), 400
+                    logging.info(f"用户 {username} 进行了获取用户列表的操作")
+                    return jsonify({"users": user_list, "next_cursor": next_cursor})
                 user_list = UserInformation.get_users_name_list()
                 logging.info(f"用户 {username} 进行了获取用户列表的操作")
                 return jsonify(user_list)
@@ -1296,6 +1571,14 @@ def api(api_post):
 from common.oauth_routes import oauth_bp
 app.register_blueprint(oauth_bp)
 
+# 订阅OAuth客户端变更通知(客户端在第一次查询时加载)
+from common.client_registry import ClientRegistry
+ClientRegistry.init_app(app)
+
+# Redis键后台清理(代替部署时清空Redis)，在worker进程处理第一个请求时启动
+from common.redis_keys import RedisKeyManager
+RedisKeyManager.init_app(app)
+
 # 配置CORS
 CORS(app, resources={
     r"/oauth/*": {"origins": "*"},  # 在生产环境中应该限制origins
@@ -0,0 +1,76 @@
+import sqlite3
+import argparse
+import os
+
+# 热点查询需要的索引: (表名, 索引名, 列)
+HOT_INDEXES = [
+    ('users', 'ix_users_register_time', ['register_time']),
+    ('users', 'ix_users_admin_vip', ['admin', 'vip']),
+    ('user_apply', 'ix_user_apply_username_permission', ['username', 'permission']),
+    ('user_apply', 'ix_user_apply_status_time', ['status', 'time']),
+    ('oauth_clients', 'ix_oauth_clients_created_by', ['created_by']),
+    ('user_data', 'ix_user_data_user_id_data_key', ['user_id', 'data_key']),
+]
+
+# 早期版本创建、已不再需要的索引: (表名, 索引名)
+# client_id本身唯一，按client_id查询已由唯一索引完成
+OBSOLETE_INDEXES = [
+    ('oauth_clients', 'ix_oauth_clients_client_id_active'),
+]
+
+# 可能包含这些表的数据库文件(分库布局和单数据库布局)
+DATABASE_FILES = [
+    'user.db',
+    'oauth.db',
+    'apply.db',
+    'user_management.db',
+    'user_management_dev.db',
+    'user_management_prod.db',
+]
+
+
+def migrate(source_dir=None):
+    """在所有存在对应表的数据库文件中创建热点查询索引（可重复执行）"""
+    base_dir = source_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    for filename in DATABASE_FILES:
+        db_path = os.path.join(base_dir, filename)
+        if not os.path.exists(db_path):
+            continue
+
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = {row[0] for row in cursor.fetchall()}
+
+            for table, index_name, columns in HOT_INDEXES:
+                if table not in tables:
+                    continue
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({", ".join(columns)})'
+                )
+                print(f"{filename}: 索引 {index_name} 已就绪")
+
+            for table, index_name in OBSOLETE_INDEXES:
+                if table not in tables:
+                    continue
+                cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+            # 更新统计信息，帮助查询规划器选择索引
+            cursor.execute('ANALYZE')
+            conn.commit()
+
+        except Exception as e:
+            conn.rollback()
+            print(f"迁移失败({filename}): {e}")
+            raise e
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='为热点查询列创建索引')
+    parser.add_argument('--source-dir', default=None, help='数据库文件所在目录')
+    args = parser.parse_args()
+    migrate(args.source_dir)
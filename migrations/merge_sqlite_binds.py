@@ -0,0 +1,85 @@
+import sqlite3
+import argparse
+import os
+
+# 各bind对应的数据库文件和表
+BIND_SOURCES = {
+    'user.db': ['users'],
+    'oauth.db': ['oauth_clients'],
+    'apply.db': ['user_apply'],
+}
+
+
+def migrate(target='user_management.db', source_dir=None):
+    """将 user_db、oauth_db、apply_db 三个SQLite文件合并到同一个数据库中"""
+    base_dir = source_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    target_path = target if os.path.isabs(target) else os.path.join(base_dir, target)
+
+    conn = sqlite3.connect(target_path)
+    cursor = conn.cursor()
+    try:
+        for filename, tables in BIND_SOURCES.items():
+            source_path = os.path.join(base_dir, filename)
+            if not os.path.exists(source_path):
+                print(f"跳过不存在的数据库文件: {filename}")
+                continue
+
+            cursor.execute('ATTACH DATABASE ? AS src', (source_path,))
+            try:
+                for table in tables:
+                    cursor.execute(
+                        "SELECT sql FROM src.sqlite_master WHERE type='table' AND name=?",
+                        (table,)
+                    )
+                    row = cursor.fetchone()
+                    if not row:
+                        print(f"{filename} 中没有 {table} 表，跳过")
+                        continue
+
+                    # 在目标库中按源表结构建表
+                    cursor.execute(
+                        "SELECT name FROM main.sqlite_master WHERE type='table' AND name=?",
+                        (table,)
+                    )
+                    if cursor.fetchone() is None:
+                        cursor.execute(row[0])
+
+                    # 复制索引
+                    cursor.execute(
+                        "SELECT sql FROM src.sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+                        (table,)
+                    )
+                    for (index_sql,) in cursor.fetchall():
+                        cursor.execute(index_sql.replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1)
+                                       .replace('CREATE UNIQUE INDEX', 'CREATE UNIQUE INDEX IF NOT EXISTS', 1))
+
+                    # 按列名复制数据，已存在的主键/唯一键跳过，可重复执行
+                    cursor.execute(f'PRAGMA src.table_info({table})')
+                    columns = ', '.join(f'"{col[1]}"' for col in cursor.fetchall())
+                    cursor.execute(
+                        f'INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM src.{table}'
+                    )
+                    print(f"已合并 {filename}:{table}，新增 {cursor.rowcount} 行")
+                conn.commit()
+            finally:
+                # 未提交的部分先回滚，否则无法分离数据库
+                conn.rollback()
+                cursor.execute('DETACH DATABASE src')
+
+        print(f"合并完成: {target_path}")
+        print("请在 server_config.json 中设置 \"single_database\": true 并重启服务。")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"迁移失败: {e}")
+        raise e
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='将分库的SQLite数据合并为单数据库布局')
+    parser.add_argument('--target', default='user_management.db', help='目标数据库文件(默认数据库)')
+    parser.add_argument('--source-dir', default=None, help='源数据库文件所在目录')
+    args = parser.parse_args()
+    migrate(args.target, args.source_dir)
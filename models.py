@@ -0,0 +1,49 @@
+"""
+用户数据模型
+
+这个模块负责：
+- 定义用户键值数据表 user_data(每个用户的每个键一条记录)
+- 导出全局的db实例和User模型，供路由中 from models import ... 使用
+"""
+
+from common.db_instance import db
+from common.UserInformation import User
+
+
+class UserData(db.Model):
+    __tablename__ = 'user_data'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(150), nullable=False)  # 所属用户的用户名
+    data_key = db.Column(db.String(50), nullable=False)
+    data_value = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(),
+                           onupdate=db.func.current_timestamp())
+
+    # 按用户和键查询数据时使用的索引
+    __table_args__ = (
+        db.Index('ix_user_data_user_id_data_key', 'user_id', 'data_key'),
+    )
+
+    @classmethod
+    def add_data(cls, user_id, data_key, data_value):
+        """
+        添加一条用户数据(由调用方提交)
+
+        Args:
+            user_id: 用户名
+            data_key: 数据键名
+            data_value: 数据值
+
+        Returns:
+            UserData或dict: 新记录，键已存在时返回 {'error': ...}
+        """
+        if cls.query.filter_by(user_id=user_id, data_key=data_key).first():
+            return {'error': f"数据已存在: {data_key}"}
+        user_data = cls(user_id=user_id, data_key=data_key, data_value=data_value)
+        db.session.add(user_data)
+        return user_data
+
+
+__all__ = ['UserData', 'User', 'db']
@@ -0,0 +1,80 @@
+"""
+测试公共夹具
+
+- Redis使用fakeredis(需要lupa以执行登录限流的Lua脚本)
+- 数据库使用临时目录中的SQLite文件，每个测试前重建所有表
+- index.py 在导入时创建应用，因此先修改测试配置再导入
+
+运行：
+    pip install pytest "fakeredis[lua]"
+    python -m pytest -q
+"""
+
+import pytest
+import redis
+from .utils import fake_redis, sqlite_urls
+
+
+@pytest.fixture(scope='session')
+def flask_app(tmp_path_factory):
+    """index.py 创建的应用，整个测试会话只导入一次"""
+    directory = tmp_path_factory.mktemp('db')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('FLASK_ENV', 'testing')
+        mp.setattr(redis, 'from_url', lambda url, **kwargs: fake_redis)
+
+        import common.config as config_module
+        database_uri, binds = sqlite_urls(directory)
+        mp.setattr(config_module, 'SERVER_CONFIG_FILE', str(directory / 'server_config.json'))
+        for name, value in {
+            'SQLALCHEMY_DATABASE_URI': database_uri,
+            'SQLALCHEMY_BINDS': binds,
+            'REDIS_URL': 'redis://fakeredis/0',
+            'REDIS_CLEANUP_ENABLED': False,
+            # 测试中使用低成本的哈希参数
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'PASSWORD_HASH_WORKERS': 1,
+        }.items():
+            mp.setattr(config_module.TestingConfig, name, value, raising=False)
+
+        import index
+        yield index.app
+
+
+@pytest.fixture
+def app(flask_app):
+    """
+    每个测试使用空的数据库、空的Redis和空的进程内缓存
+
+    不保持应用上下文：测试客户端的请求会复用已推入的应用上下文(包括g)，
+    与线上每个请求独立的情况不同。直接调用模块时使用 app_context 夹具。
+    """
+    from common.db_setup import db
+    from common.permission_cache import PermissionCache
+    from common.session_index import SessionIndex
+    from common.client_registry import ClientRegistry
+
+    fake_redis.flushall()
+    PermissionCache.clear()
+    SessionIndex._validated.clear()
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        ClientRegistry.mark_stale()
+    return flask_app
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def redis_store():
+    return fake_redis
@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import event
+from common.db_setup import db
+from common.UserInformation import UserApply, UserInformation
+from .utils import create_user, login
+
+BATCH_URL = '/api/apply/batch'
+
+
+@pytest.fixture
+def applicants(app):
+    for username in ('alice', 'bob'):
+        create_user(app, username)
+        with app.app_context():
+            assert UserApply.push_apply(username, 'vip', 'please')[0]
+
+
+@pytest.fixture
+def admin(app, client):
+    create_user(app, 'root', is_admin=True)
+    login(client, 'root')
+    return client
+
+
+@pytest.mark.parametrize('status, expected', [
+    (True, True), (False, False), (1, True), (0, False),
+    ('True', True), ('False', False), ('true', True), ('false', False), (' TRUE ', True), ('1', True), ('0', False),
+    ('yes', None), (2, None), (None, None), ('', None),
+])
+def test_parse_status(status, expected):
+    assert UserApply._parse_status(status) is expected
+
+
+def test_batch_commits_once_and_reports_each_item(applicants, app_context):
+    commits = []
+
+    def record(session):
+        commits.append(session)
+
+    event.listen(db.session, 'after_commit', record)
+    try:
+        success, results = UserApply.batch_change_apply([
+            {'username': 'alice', 'permission': 'vip', 'status': 1},
+            {'username': 'bob', 'permission': 'vip', 'status': 'false'},
+            {'username': 'carol', 'permission': 'vip', 'status': True},
+            {'username': 'alice', 'permission': 'vip', 'status': 'maybe'},
+        ])
+    finally:
+        event.remove(db.session, 'after_commit', record)
+
+    assert not success
+    assert len(commits) == 1
+    assert [(r['success'], r['message']) for r in results] == [
+        (True, '申请状态已更新'),
+        (True, '申请状态已更新'),
+        (False, '申请记录不存在'),
+        (False, '状态无效'),
+    ]
+    assert UserInformation.get_user_info('alice')['vip'] is True
+    assert UserInformation.get_user_info('bob')['vip'] is False
+    statuses = {apply.username: apply.status for apply in UserApply.query.all()}
+    assert statuses == {'alice': True, 'bob': False}
+
+
+def test_batch_limit(app_context):
+    decisions = [{'username': 'alice', 'permission': 'vip', 'status': True}] * (UserApply.BATCH_DECISION_LIMIT + 1)
+    with pytest.raises(ValueError):
+        UserApply.batch_change_apply(decisions)
+
+
+def test_change_apply_accepts_legacy_status(applicants, app_context):
+    assert UserApply.change_apply('alice', 'vip', 'True') == (True, '申请状态已更新', True)
+    assert UserApply.change_apply('bob', 'vip', 0) == (True, '申请状态已更新', False)
+
+
+def test_api_requires_admin(applicants, client):
+    login(client, 'alice')
+    assert client.post(BATCH_URL, json={'decisions': []}).status_code == 403
+
+
+def test_api_batch(applicants, admin, app):
+    response = admin.post(BATCH_URL, json={'decisions': [
+        {'username': 'alice', 'permission': 'vip', 'status': True},
+        {'username': 'bob', 'permission': 'nope', 'status': True},
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success'] is False
+    assert [r['success'] for r in body['results']] == [True, False]
+    assert body['results'][1]['message'] == '权限不存在'
+    with app.app_context():
+        assert UserInformation.get_user_info('alice')['vip'] is True
+
+
+def test_api_rejects_invalid_payload(admin):
+    assert admin.post(BATCH_URL, json={'decisions': 'x'}).status_code == 400
+    assert admin.post(BATCH_URL, json={'decisions': ['x']}).status_code == 400
+    too_many = [{'username': 'a', 'permission': 'vip', 'status': True}] * (UserApply.BATCH_DECISION_LIMIT + 1)
+    assert admin.post(BATCH_URL, json={'decisions': too_many}).status_code == 400
+
+
+def test_review_page_batch_form(applicants, admin, app):
+    response = admin.post('/apply_change', data={'batch_status': 'false', 'selected': ['alice:vip', 'bob:vip']})
+
+    assert response.status_code == 200
+    assert '已批量更新 2 条申请' in response.get_data(as_text=True)
+    with app.app_context():
+        assert {apply.status for apply in UserApply.query.all()} == {False}
@@ -0,0 +1,64 @@
+from flask import Flask
+from common.db_setup import db
+from common.client_registry import ClientRegistry
+from common.UserInformation import UserInformation
+from .utils import create_user, create_client, issue_token, verify_token
+
+
+def test_init_app_does_not_require_tables(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/main.db',
+        SQLALCHEMY_BINDS={name: f'sqlite:///{tmp_path}/{name}.db' for name in ('user_db', 'oauth_db', 'apply_db')},
+    )
+    db.init_app(app)
+
+    # 新数据库：oauth_clients 表还不存在
+    ClientRegistry.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        ClientRegistry.mark_stale()
+        assert ClientRegistry.get('missing') is None
+
+
+def test_deactivated_client_is_rejected(app, client):
+    create_user(app, 'alice')
+    client_id, client_secret = create_client(app)
+    token = issue_token(client, client_id, client_secret, 'alice')
+    assert verify_token(client, client_id, client_secret, token).status_code == 200
+
+    with app.app_context():
+        success, _, _ = UserInformation.manage_oauth_client(
+            'update', client_id=client_id, name='test',
+            redirect_uri='https://example.com/callback', is_active=False
+        )
+        assert success
+        assert ClientRegistry.get(client_id) is None
+
+    assert verify_token(client, client_id, client_secret, token).status_code == 401
+
+
+def test_notification_during_reload_forces_another_reload(app, app_context, monkeypatch):
+    from common import client_registry
+    from common.oauth_models import OAuthClient
+
+    client_id, _ = create_client(app)
+
+    class NotifiedDuringReload(client_registry.RegisteredClient):
+        __slots__ = ()
+
+        def __init__(self, client):
+            super().__init__(client)
+            # 模拟查询期间订阅线程收到了变更通知
+            ClientRegistry.mark_stale()
+
+    monkeypatch.setattr(client_registry, 'RegisteredClient', NotifiedDuringReload)
+    assert ClientRegistry.get(client_id) is not None
+    monkeypatch.undo()
+
+    # 该通知对应的修改：客户端已被停用
+    OAuthClient.query.filter_by(client_id=client_id).update({'is_active': False})
+    db.session.commit()
+
+    assert ClientRegistry.get(client_id) is None
@@ -0,0 +1,22 @@
+from common.db_setup import db
+from common.UserInformation import UserApply, UserInformation
+from .utils import TEST_PASSWORD, create_db_app
+
+
+def test_single_database_shares_one_engine(tmp_path):
+    app = create_db_app(tmp_path, SINGLE_DATABASE=True)
+    with app.app_context():
+        engines = set(db.engines.values())
+    assert len(engines) == 1
+
+
+def test_single_database_approve(tmp_path):
+    # 审核在同一事务中修改申请表和用户表，两个bind若各用一个引擎会互相等待写锁
+    app = create_db_app(tmp_path, SINGLE_DATABASE=True, SQLITE_BUSY_TIMEOUT=200)
+    with app.app_context():
+        assert UserInformation.store_user('alice', TEST_PASSWORD)[0]
+        assert UserApply.push_apply('alice', 'vip', 'please')[0]
+
+        result = UserApply.change_apply('alice', 'vip', True)
+        assert result[0], result
+        assert UserInformation.get_user_info('alice')['vip'] is True
@@ -0,0 +1,79 @@
+import re
+import pytest
+from common.config import save_server_config
+from common.metrics import LATENCY_BUCKETS, METRICS_KEY, Metrics
+from common.service_auth import ServiceTokenAuth
+from .utils import create_user, login
+
+
+@pytest.fixture
+def metrics_client(app, client, monkeypatch):
+    """指标清零，返回(客户端, 服务令牌)"""
+    monkeypatch.setattr(Metrics, '_totals', {})
+    monkeypatch.setattr(Metrics, '_pending', {})
+    ServiceTokenAuth._source = None
+    save_server_config({})
+    with app.app_context():
+        _, token = ServiceTokenAuth.rotate('prometheus')
+    yield client, token
+    save_server_config({})
+    ServiceTokenAuth._source = None
+
+
+def _scrape(client, token):
+    response = client.get('/metrics', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line.startswith('#'):
+            continue
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    return response.get_data(as_text=True), samples
+
+
+def test_requires_service_token(metrics_client):
+    client, _ = metrics_client
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', query_string={'server_token': 'wrong'}).status_code == 401
+
+
+def test_request_counts_and_histogram(metrics_client):
+    client, token = metrics_client
+    client.get('/login')
+    client.get('/login')
+
+    text, samples = _scrape(client, token)
+
+    assert samples['http_requests_total{endpoint="login",method="GET",status="200"}'] == 2
+    buckets = [samples[f'http_request_duration_seconds_bucket{{endpoint="login",le="{le}"}}'] for le in LATENCY_BUCKETS]
+    assert buckets == sorted(buckets)
+    assert samples['http_request_duration_seconds_bucket{endpoint="login",le="+Inf"}'] == 2
+    assert samples['http_request_duration_seconds_count{endpoint="login"}'] == 2
+    assert samples['http_request_duration_seconds_sum{endpoint="login"}'] > 0
+    for name in ('http_requests_total', 'http_request_duration_seconds', 'http_request_sql_queries_total',
+                 'http_request_sql_seconds_total', 'http_request_redis_calls_total'):
+        assert re.search(rf'^# TYPE {name} (counter|histogram)$', text, re.MULTILINE)
+
+
+def test_sql_and_redis_calls_are_counted(app, metrics_client):
+    client, token = metrics_client
+    create_user(app, 'alice')
+    assert login(client, 'alice').status_code == 302
+
+    _, samples = _scrape(client, token)
+
+    assert samples['http_requests_total{endpoint="login",method="POST",status="302"}'] == 1
+    assert samples['http_request_sql_queries_total{endpoint="login"}'] >= 1
+    assert samples['http_request_redis_calls_total{endpoint="login"}'] >= 1
+
+
+def test_totals_include_other_workers(metrics_client, redis_store):
+    client, token = metrics_client
+    # 其他worker合并到Redis中的增量
+    redis_store.hincrbyfloat(METRICS_KEY, 'req|home|GET|200', 3)
+
+    _, samples = _scrape(client, token)
+
+    assert samples['http_requests_total{endpoint="home",method="GET",status="200"}'] == 3
@@ -0,0 +1,45 @@
+import pytest
+from common.db_setup import db
+from common.UserInformation import User, _invalidate_user_cache
+from .utils import create_user, create_client, issue_token, verify_token
+
+
+@pytest.fixture
+def promoted_token(app, client):
+    """令牌签发时用户不是vip，之后在数据库中被设为vip"""
+    create_user(app, 'alice')
+    client_id, client_secret = create_client(app)
+    token = issue_token(client, client_id, client_secret, 'alice')
+    with app.app_context():
+        User.query.filter_by(username='alice').update({'vip': True})
+        db.session.commit()
+        _invalidate_user_cache('alice')
+    return client_id, client_secret, token
+
+
+def test_verify_returns_token_claims(client, promoted_token):
+    response = verify_token(client, *promoted_token)
+    assert response.status_code == 200
+    info = response.get_json()['token_info']
+    assert info['username'] == 'alice'
+    assert info['vip'] is False
+
+
+@pytest.mark.parametrize('strict, expected_vip', [
+    (True, True),
+    ('true', True),
+    ('1', True),
+    (False, False),
+    ('false', False),
+    ('0', False),
+    (None, False),
+])
+def test_strict_flag_parsing(client, promoted_token, strict, expected_vip):
+    response = verify_token(client, *promoted_token, strict=strict)
+    assert response.status_code == 200
+    assert response.get_json()['token_info']['vip'] is expected_vip
+
+
+def test_invalid_client_secret_is_rejected(client, promoted_token):
+    client_id, _, token = promoted_token
+    assert verify_token(client, client_id, 'wrong', token).status_code == 401
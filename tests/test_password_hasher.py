@@ -0,0 +1,82 @@
+import os
+import time
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import check_password_hash, generate_password_hash
+from common.hash_policy import HashPolicy
+from common.password_hasher import PasswordHasher
+
+
+def _settled_metrics():
+    """等待已结束任务的回调执行完(回调可能在result()返回之后才运行)"""
+    deadline = time.monotonic() + 5
+    metrics = PasswordHasher.get_metrics()
+    while metrics['queue_depth'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+        metrics = PasswordHasher.get_metrics()
+    return metrics
+
+
+def test_hash_and_check(app_context):
+    password_hash = PasswordHasher.hash_password('secret', 'pbkdf2:sha256:1000')
+    assert PasswordHasher.check_password(password_hash, 'secret')
+    assert not PasswordHasher.check_password(password_hash, 'wrong')
+
+
+def test_broken_pool_is_rebuilt(app_context):
+    executor = PasswordHasher._get_executor()
+    # 模拟工作进程被杀死
+    with pytest.raises(BrokenProcessPool):
+        executor.submit(os._exit, 1).result(timeout=30)
+    restarts = PasswordHasher.get_metrics()['pool_restarts']
+
+    # 本次在当前线程中计算，之后使用新的工作池
+    password_hash = PasswordHasher.hash_password('secret', 'pbkdf2:sha256:1000')
+    assert check_password_hash(password_hash, 'secret')
+    assert PasswordHasher.check_password(password_hash, 'secret')
+
+    assert PasswordHasher._executor is not executor
+    metrics = _settled_metrics()
+    assert metrics['pool_restarts'] == restarts + 1
+    assert metrics['queue_depth'] == 0
+
+
+def test_failed_tasks_are_counted_separately(app_context):
+    before = _settled_metrics()
+    with pytest.raises(Exception):
+        PasswordHasher.check_password(None, 'secret')
+    PasswordHasher.hash_password('secret', 'pbkdf2:sha256:1000')
+
+    after = _settled_metrics()
+    assert after['failed'] == before['failed'] + 1
+    assert after['completed'] == before['completed'] + 1
+    assert after['queue_depth'] == 0
+
+
+def test_hash_policy_is_warmed_at_startup(app, app_context, monkeypatch):
+    monkeypatch.setattr(HashPolicy, '_normalized', {})
+    HashPolicy.init_app(app)
+
+    def fail(*args):
+        raise AssertionError('哈希函数不应在请求中运行')
+
+    monkeypatch.setattr(PasswordHasher, 'hash_password', fail)
+    stored = generate_password_hash('secret', method='pbkdf2:sha256:1000')
+    assert not HashPolicy.needs_rehash(stored)
+    assert HashPolicy.needs_rehash(generate_password_hash('secret', method='pbkdf2:sha256:2000'))
+
+
+def test_unwarmed_hash_policy_uses_pool(app, app_context, monkeypatch):
+    monkeypatch.setattr(HashPolicy, '_normalized', {})
+    calls = []
+    hash_password = PasswordHasher.hash_password
+
+    def counting(password, method=None):
+        calls.append(method)
+        return hash_password(password, method)
+
+    monkeypatch.setattr(PasswordHasher, 'hash_password', counting)
+    stored = generate_password_hash('secret', method='pbkdf2:sha256:1000')
+    assert not HashPolicy.needs_rehash(stored)
+    assert not HashPolicy.needs_rehash(stored)
+    assert calls == ['pbkdf2:sha256:1000']
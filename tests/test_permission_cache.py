@@ -0,0 +1,35 @@
+from common import permission_cache
+from common.db_setup import db
+from common.UserInformation import User
+from common.permission_cache import PermissionCache
+from .utils import create_user
+
+
+def test_entries_are_bounded_lru(app, app_context, monkeypatch):
+    monkeypatch.setattr(permission_cache, 'PERMISSION_CACHE_MAX_ENTRIES', 3)
+    for name in ('a', 'b', 'c', 'd'):
+        create_user(app, name)
+
+    for name in ('a', 'b', 'c'):
+        PermissionCache.get(name)
+    # 最近使用过的a不会被淘汰
+    PermissionCache.get('a')
+    PermissionCache.get('d')
+
+    assert list(PermissionCache._entries) == ['c', 'a', 'd']
+
+
+def test_invalidate_reloads_snapshot(app, app_context):
+    create_user(app, 'alice')
+    assert PermissionCache.get('alice')['vip'] is False
+
+    User.query.filter_by(username='alice').update({'vip': True})
+    db.session.commit()
+    PermissionCache.invalidate('alice')
+
+    assert PermissionCache.get('alice')['vip'] is True
+
+
+def test_missing_user_is_not_cached(app_context):
+    assert PermissionCache.get('nobody') is None
+    assert 'nobody' not in PermissionCache._entries
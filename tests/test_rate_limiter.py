@@ -0,0 +1,107 @@
+import time
+import pytest
+from types import SimpleNamespace
+from common import rate_limiter
+from common.rate_limiter import LoginRateLimiter
+from .utils import client_headers, create_client
+
+
+@pytest.fixture
+def clock(app, app_context, monkeypatch):
+    """可手动推进的时钟"""
+    app.config.update(LOGIN_RATE_LIMIT_WINDOW=60, LOGIN_RATE_LIMIT_PER_USER=5, LOGIN_RATE_LIMIT_PER_IP=20)
+    now = [time.time()]
+    monkeypatch.setattr(rate_limiter, 'time', SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_per_user_window(clock):
+    for _ in range(5):
+        assert LoginRateLimiter.check('alice', '10.0.0.1') == (True, None)
+    allowed, reason = LoginRateLimiter.check('alice', '10.0.0.2')
+    assert not allowed and reason
+
+    # 其他用户不受影响
+    assert LoginRateLimiter.check('bob', '10.0.0.1')[0]
+    assert LoginRateLimiter.get_throttled_counts() == {'user': 1, 'ip': 0}
+
+
+def test_window_slides(clock):
+    for _ in range(5):
+        LoginRateLimiter.check('alice', '10.0.0.1')
+        clock[0] += 10
+    # 最早的尝试在50秒前，窗口内仍有5次
+    assert not LoginRateLimiter.check('alice', '10.0.0.1')[0]
+
+    clock[0] += 11
+    # 最早的一次已滑出窗口
+    assert LoginRateLimiter.check('alice', '10.0.0.1')[0]
+    assert not LoginRateLimiter.check('alice', '10.0.0.1')[0]
+
+
+def test_per_ip_window(clock):
+    for i in range(20):
+        assert LoginRateLimiter.check(f'user{i}', '10.0.0.1')[0]
+    assert not LoginRateLimiter.check('someone', '10.0.0.1')[0]
+    assert LoginRateLimiter.check('someone', '10.0.0.2')[0]
+    assert LoginRateLimiter.get_throttled_counts() == {'user': 0, 'ip': 1}
+
+
+def test_rejected_attempts_are_not_counted(clock):
+    for _ in range(5):
+        LoginRateLimiter.check('alice', '10.0.0.1')
+    for _ in range(10):
+        LoginRateLimiter.check('alice', '10.0.0.1')
+    # 被拒绝的尝试不占用窗口名额
+    clock[0] += 61
+    for _ in range(5):
+        assert LoginRateLimiter.check('alice', '10.0.0.1')[0]
+
+
+def test_reset_clears_user_window(clock):
+    for _ in range(5):
+        LoginRateLimiter.check('alice', '10.0.0.1')
+    LoginRateLimiter.reset('alice')
+    assert LoginRateLimiter.check('alice', '10.0.0.1')[0]
+
+
+def test_login_endpoint_returns_429(client):
+    for _ in range(5):
+        client.post('/login', data={'username': 'alice', 'password': 'wrong'})
+    response = client.post('/login', data={'username': 'alice', 'password': 'wrong'})
+    assert response.status_code == 429
+
+
+def _login_from(client, username, ip):
+    return client.post('/login', data={'username': username, 'password': 'wrong'},
+                       headers={'X-Forwarded-For': ip})
+
+
+def test_login_ip_bucket_uses_forwarded_for(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'LOGIN_RATE_LIMIT_PER_IP', 2)
+    for i in range(2):
+        assert _login_from(client, f'user{i}', '203.0.113.1').status_code == 200
+    assert _login_from(client, 'user2', '203.0.113.1').status_code == 429
+    # 同一个代理后面的其他浏览器不受影响
+    assert _login_from(client, 'user2', '203.0.113.2').status_code == 200
+
+
+def test_password_grant_is_not_limited_per_ip(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'LOGIN_RATE_LIMIT_PER_IP', 2)
+    client_id, client_secret = create_client(app)
+    for i in range(5):
+        response = client.post('/oauth/token', headers=client_headers(client_id, client_secret), json={
+            'grant_type': 'password', 'username': f'user{i}', 'password': 'wrong'
+        })
+        assert response.status_code == 401
+
+
+def test_password_grant_is_limited_per_user(app, client):
+    client_id, client_secret = create_client(app)
+    statuses = [
+        client.post('/oauth/token', headers=client_headers(client_id, client_secret), json={
+            'grant_type': 'password', 'username': 'alice', 'password': 'wrong'
+        }).status_code
+        for _ in range(6)
+    ]
+    assert statuses == [401] * 5 + [429]
@@ -0,0 +1,98 @@
+import time
+import pytest
+from flask import Flask
+from common import redis_keys
+from common.redis_keys import REPORT_KEY, RedisKeyManager
+from .utils import create_user, fake_redis
+
+
+@pytest.fixture
+def keys(app, redis_store):
+    """每种清理策略各有需要保留和需要删除的键"""
+    create_user(app, 'alice')
+    redis_store.flushall()
+    prefix = app.config.get('SESSION_KEY_PREFIX', 'session:')
+    now = time.time()
+    redis_store.set(f'{prefix}live', 'x', ex=60)
+    redis_store.set(f'{prefix}orphan', 'x')
+    redis_store.set('user_session:alice', 'x', ex=60)
+    redis_store.zadd('user_sessions:alice', {'active': now + 60, 'expired': now - 60})
+    redis_store.zadd('user_sessions:bob', {'expired': now - 60})
+    redis_store.set('permission_version:alice', 1)
+    redis_store.set('permission_version:ghost', 1)
+    redis_store.set('server_stats:snapshot', '{}')
+    redis_store.set('unknown:key', 'x')
+    return prefix
+
+
+def test_cleanup_applies_each_policy(app, app_context, redis_store, keys):
+    report = RedisKeyManager.cleanup(app)
+
+    remaining = {key.decode() for key in redis_store.scan_iter()} - {REPORT_KEY}
+    assert remaining == {f'{keys}live', 'user_sessions:alice', 'permission_version:alice',
+                         'server_stats:snapshot', 'unknown:key'}
+    assert redis_store.zrange('user_sessions:alice', 0, -1) == [b'active']
+    assert {name: stats['deleted'] for name, stats in report.items() if stats['deleted']} == {
+        'session': 1, 'legacy_user_session': 1, 'session_index': 1, 'permission_version': 1
+    }
+    assert report['session']['keys'] == 1
+    assert report['other']['keys'] == 1
+    assert RedisKeyManager.get_report(redis_store)['namespaces']['session_index']['deleted'] == 1
+
+
+def test_dry_run_only_reports(app, app_context, redis_store, keys):
+    before = set(redis_store.scan_iter())
+
+    report = RedisKeyManager.cleanup(app, dry_run=True)
+
+    assert set(redis_store.scan_iter()) - {REPORT_KEY.encode()} == before
+    assert all(stats['deleted'] == 0 for stats in report.values())
+    assert report['permission_version']['keys'] == 2
+
+
+def test_cleanup_in_small_batches(app, app_context, redis_store, keys, monkeypatch):
+    monkeypatch.setitem(app.config, 'REDIS_CLEANUP_BATCH_SIZE', 1)
+    monkeypatch.setitem(app.config, 'REDIS_CLEANUP_PAUSE', 0)
+
+    report = RedisKeyManager.cleanup(app)
+
+    assert sum(stats['deleted'] for stats in report.values()) == 4
+
+
+def test_worker_starts_once_per_process(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(RedisKeyManager, '_worker_pid', None)
+    monkeypatch.setattr(RedisKeyManager, '_run_forever', classmethod(lambda cls, app: started.append(app)))
+
+    assert RedisKeyManager.ensure_worker(app)
+    assert not RedisKeyManager.ensure_worker(app)
+
+    # fork后的子进程pid不同，需要启动自己的线程
+    monkeypatch.setattr(redis_keys.os, 'getpid', lambda: -1)
+    assert RedisKeyManager.ensure_worker(app)
+    deadline = time.monotonic() + 5
+    while len(started) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert started == [app, app]
+
+
+def test_init_app_defers_start_to_first_request(monkeypatch):
+    started = []
+    monkeypatch.setattr(RedisKeyManager, '_worker_pid', None)
+    monkeypatch.setattr(RedisKeyManager, 'ensure_worker', classmethod(lambda cls, app: started.append(app)))
+    worker_app = Flask(__name__)
+    worker_app.config['SESSION_REDIS'] = fake_redis
+    worker_app.add_url_rule('/', 'index', lambda: 'ok')
+
+    RedisKeyManager.init_app(worker_app)
+    assert started == []
+
+    worker_app.test_client().get('/')
+    assert started == [worker_app]
+
+
+def test_init_app_disabled(monkeypatch):
+    worker_app = Flask(__name__)
+    worker_app.config.update(SESSION_REDIS=fake_redis, REDIS_CLEANUP_ENABLED=False)
+    RedisKeyManager.init_app(worker_app)
+    assert not worker_app.before_request_funcs
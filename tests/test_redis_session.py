@@ -0,0 +1,150 @@
+import pytest
+from datetime import timedelta
+from flask import Flask, session
+from common.redis_session import RedisSessionInterface, regenerate_session
+from .utils import TEST_PASSWORD, create_user, fake_redis
+
+COOKIE_NAME = 'session'
+
+
+@pytest.fixture
+def session_app():
+    """只启用Redis会话的最小应用"""
+    fake_redis.flushall()
+    app = Flask(__name__)
+    app.secret_key = 'test-secret'
+    app.permanent_session_lifetime = timedelta(hours=1)
+    app.config['SESSION_REFRESH_EACH_REQUEST'] = False
+    app.session_interface = RedisSessionInterface(fake_redis, key_prefix='session:')
+
+    @app.route('/login')
+    def login():
+        session.permanent = True
+        session['IsLogin'] = True
+        session['username'] = 'alice'
+        return 'ok'
+
+    @app.route('/read')
+    def read():
+        return session.get('username') or ''
+
+    @app.route('/same')
+    def same():
+        session['username'] = 'alice'
+        return 'ok'
+
+    @app.route('/oauth')
+    def oauth():
+        session['oauth_state'] = 'xyz'
+        return 'ok'
+
+    @app.route('/untouched')
+    def untouched():
+        return 'ok'
+
+    @app.route('/rotate')
+    def rotate():
+        regenerate_session(session)
+        session['username'] = 'bob'
+        return 'ok'
+
+    @app.route('/state')
+    def state():
+        return session.get('oauth_state') or ''
+
+    return app
+
+
+def _session_keys():
+    return sorted(key.decode() for key in fake_redis.scan_iter('session:*'))
+
+
+def _logged_in_client(app):
+    client = app.test_client()
+    response = client.get('/login')
+    assert COOKIE_NAME in response.headers.get('Set-Cookie', '')
+    keys = _session_keys()
+    assert len(keys) == 1
+    # 去掉过期时间：之后任何写入(SET/EXPIRE)都会重新设置TTL
+    fake_redis.persist(keys[0])
+    return client, keys[0]
+
+
+@pytest.mark.parametrize('path', ['/read', '/same', '/untouched'])
+def test_unchanged_session_is_not_written(session_app, path):
+    client, key = _logged_in_client(session_app)
+    before = fake_redis.get(key)
+
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert 'Set-Cookie' not in response.headers
+    assert fake_redis.get(key) == before
+    assert fake_redis.ttl(key) == -1
+
+
+def test_read_returns_stored_value(session_app):
+    client, _ = _logged_in_client(session_app)
+    assert client.get('/read').get_data(as_text=True) == 'alice'
+
+
+def test_rare_fields_are_written_to_extra_key_only(session_app):
+    client, key = _logged_in_client(session_app)
+    before = fake_redis.get(key)
+
+    client.get('/oauth')
+
+    # 主键的数据不变，只续期；罕用字段写入附加键
+    assert fake_redis.get(key) == before
+    assert fake_redis.ttl(key) > 0
+    assert fake_redis.exists(f'{key}:x')
+
+
+def test_regenerate_moves_data_to_new_key(session_app):
+    client, key = _logged_in_client(session_app)
+    client.get('/oauth')
+
+    response = client.get('/rotate')
+
+    assert COOKIE_NAME in response.headers.get('Set-Cookie', '')
+    assert not fake_redis.exists(key, f'{key}:x')
+    new_keys = _session_keys()
+    assert len(new_keys) == 2 and key not in new_keys
+    assert client.get('/read').get_data(as_text=True) == 'bob'
+    # 罕用字段也复制到了新键
+    assert client.get('/state').get_data(as_text=True) == 'xyz'
+
+
+def test_old_session_key_is_rejected_after_login(app, client, redis_store):
+    """登录前设置的会话键(例如攻击者预先植入的)登录后失效"""
+    create_user(app, 'alice')
+    with client.session_transaction() as pre_login:
+        pre_login['oauth_state'] = 'xyz'
+    old_cookie = client.get_cookie(COOKIE_NAME, domain='localhost').value
+    key = f"{app.config['SESSION_KEY_PREFIX']}{old_cookie.rsplit('.', 1)[0]}"
+    assert redis_store.exists(f'{key}:x')
+
+    response = client.post('/login', data={'username': 'alice', 'password': TEST_PASSWORD})
+
+    assert response.status_code == 302
+    cookie = client.get_cookie(COOKIE_NAME, domain='localhost')
+    assert cookie.value != old_cookie
+    # Cookie与Redis中的会话同时过期，而不是浏览器关闭时
+    assert cookie.expires is not None
+    assert not redis_store.exists(key, f'{key}:x')
+
+    attacker = app.test_client()
+    attacker.set_cookie(COOKIE_NAME, old_cookie, domain='localhost')
+    assert attacker.get('/home').status_code == 302
+    assert client.get('/home').status_code == 200
+
+
+def test_relogin_drops_previous_session_from_index(app, client):
+    from common.session_index import SessionIndex
+
+    create_user(app, 'alice')
+    client.post('/login', data={'username': 'alice', 'password': TEST_PASSWORD})
+    client.post('/login', data={'username': 'alice', 'password': TEST_PASSWORD})
+
+    with app.app_context():
+        assert SessionIndex.count('alice') == 1
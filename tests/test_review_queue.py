@@ -0,0 +1,111 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from common.db_setup import db
+from common.UserInformation import UserApply, UserInformation
+from .utils import TEST_PASSWORD, create_db_app
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def applies(app_context):
+    """待审核、通过、拒绝的申请交错分布在不同时间"""
+    statuses = [None, True, False, None, False, True, None, True, None, False]
+    for minute, status in enumerate(statuses):
+        db.session.add(UserApply(username=f'user{minute}', permission='vip', reason='test',
+                                 status=status, time=START + timedelta(minutes=minute)))
+    db.session.commit()
+    # 期望顺序：待审核在前，各组内按时间倒序
+    pending = [i for i in reversed(range(len(statuses))) if statuses[i] is None]
+    reviewed = [i for i in reversed(range(len(statuses))) if statuses[i] is not None]
+    return [f'user{i}' for i in pending + reviewed]
+
+
+def _pages(status, limit):
+    usernames, cursor = [], None
+    while True:
+        items, cursor = UserApply.review_queue(status, limit=limit, cursor=cursor)
+        usernames.extend(item['username'] for item in items)
+        if not cursor:
+            return usernames
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 4, 10, 50])
+def test_all_pages_pending_first(applies, limit):
+    assert _pages('all', limit) == applies
+
+
+def test_single_status_pages(applies):
+    assert _pages('approved', 2) == ['user7', 'user5', 'user1']
+    assert _pages('rejected', 2) == ['user9', 'user4', 'user2']
+
+
+def test_all_uses_status_time_index(applies):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'user_apply' in statement:
+            statements.append((statement, parameters))
+
+    engine = db.engines['apply_db']
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        UserApply.review_queue('all', limit=5)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert statements
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = ' '.join(row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+            assert 'ix_user_apply_status_time' in plan
+            assert 'TEMP B-TREE' not in plan
+
+
+def _count_selects(engine, func):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        return func(), statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def test_items_carry_applicant_permissions(app_context):
+    assert UserInformation.store_user('alice', TEST_PASSWORD, True, False)[0]
+    assert UserApply.push_apply('alice', 'admin', 'please')[0]
+    assert UserApply.push_apply('ghost', 'vip', 'please')[0]
+
+    items, _ = UserApply.review_queue('pending')
+    by_name = {item['username']: item for item in items}
+    assert by_name['alice']['user_exists'] and by_name['alice']['user_vip']
+    assert not by_name['alice']['user_admin']
+    assert not by_name['ghost']['user_exists']
+
+
+def test_single_database_joins_applicants_in_scan(tmp_path):
+    app = create_db_app(tmp_path, SINGLE_DATABASE=True)
+    with app.app_context():
+        assert UserInformation.store_user('alice', TEST_PASSWORD, True, False)[0]
+        for username in ('alice', 'ghost'):
+            assert UserApply.push_apply(username, 'vip', 'please')[0]
+        engine = db.engines['apply_db']
+
+        (items, cursor), statements = _count_selects(engine, lambda: UserApply.review_queue('pending'))
+
+        assert cursor is None
+        assert [(item['username'], item['user_exists'], item['user_vip']) for item in items] == \
+            [('ghost', False, None), ('alice', True, True)]
+        # 一页待审核申请只需一条查询，申请人随申请一起JOIN查出
+        assert len(statements) == 1
+        statement, parameters = statements[0]
+        with engine.connect() as conn:
+            plan = ' '.join(row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+        assert 'ix_user_apply_status_time' in plan
+        assert 'TEMP B-TREE' not in plan
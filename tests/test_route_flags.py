@@ -0,0 +1,71 @@
+import pytest
+from flask import Blueprint, Flask
+from common.permission_cache import PermissionCache
+from common.route_flags import is_sessionless_request, sessionless
+from .utils import create_user, login
+
+
+@pytest.fixture
+def session_reads(app, redis_store, monkeypatch):
+    """记录对会话键的Redis读取"""
+    prefix = app.config.get('SESSION_KEY_PREFIX', 'session:')
+    reads = []
+    get = redis_store.get
+
+    def recording_get(name):
+        key = name.decode() if isinstance(name, bytes) else name
+        if key.startswith(prefix):
+            reads.append(key)
+        return get(name)
+
+    monkeypatch.setattr(redis_store, 'get', recording_get)
+    return reads
+
+
+@pytest.fixture
+def alice(app, client):
+    create_user(app, 'alice')
+    login(client, 'alice')
+    return client
+
+
+def test_flags():
+    app = Flask(__name__)
+    machine = Blueprint('machine', __name__)
+    machine.sessionless = True
+    machine.add_url_rule('/ping', 'ping', lambda: 'ok')
+    app.register_blueprint(machine, url_prefix='/machine')
+    app.add_url_rule('/page', 'page', lambda: 'ok')
+    app.add_url_rule('/hook', 'hook', sessionless(lambda: 'ok'))
+
+    expected = {'/page': False, '/hook': True, '/machine/ping': True, '/static/x.css': True, '/missing': False}
+    for path, flag in expected.items():
+        with app.test_request_context(path):
+            assert is_sessionless_request() is flag, path
+    assert not is_sessionless_request()
+
+
+def test_sessionless_route_skips_session_and_permission_sync(alice, session_reads, monkeypatch):
+    def fail(username):
+        raise AssertionError('不应同步权限')
+
+    monkeypatch.setattr(PermissionCache, 'get', fail)
+
+    response = alice.get('/set_language/en')
+
+    assert response.status_code == 302
+    assert session_reads == []
+    assert 'session=' not in response.headers.get('Set-Cookie', '')
+
+
+def test_page_route_reads_session(alice, session_reads):
+    assert alice.get('/home').status_code == 200
+    assert len(session_reads) == 1
+
+
+def test_sessionless_api_works_without_cookie(app, client, session_reads):
+    create_user(app, 'alice')
+    response = client.post('/api/get_user_info', json={'username': 'alice', 'api_token': 'x'})
+    assert response.status_code == 403
+    assert session_reads == []
+    assert 'Set-Cookie' not in response.headers
@@ -0,0 +1,47 @@
+import os
+import stat
+import pytest
+from flask import Flask
+from common import config as config_module
+from common.config import Config, load_server_config, save_server_config
+
+
+@pytest.fixture
+def config_app(app, monkeypatch):
+    """读取服务器配置文件的最小应用"""
+    monkeypatch.setattr(Config, 'SQLALCHEMY_POOL_SIZE', Config.SQLALCHEMY_POOL_SIZE)
+    config_app = Flask(__name__)
+    config_app.config['LOG_LEVEL'] = 'INFO'
+    yield config_app
+    save_server_config({})
+
+
+def test_update_db_config_keeps_other_settings(config_app):
+    save_server_config({'single_database': True, 'database_settings': {'pool_size': 5, 'echo': False}})
+
+    Config.update_db_config(db_pool_size=7)
+
+    config_data = load_server_config()
+    assert config_data['single_database'] is True
+    assert config_data['database_settings']['pool_size'] == 7
+    assert config_data['database_settings']['echo'] is False
+
+    Config.init_app(config_app)
+    assert config_app.config['SINGLE_DATABASE'] is True
+    assert config_app.config['SQLALCHEMY_POOL_SIZE'] == 7
+
+
+def test_legacy_single_database_setting(config_app):
+    save_server_config({'database_settings': {'single_database': True}})
+    Config.init_app(config_app)
+    assert config_app.config['SINGLE_DATABASE'] is True
+
+
+def test_save_keeps_file_mode(config_app):
+    save_server_config({})
+    os.chmod(config_module.SERVER_CONFIG_FILE, 0o644)
+
+    save_server_config({'server_name': 'test'})
+
+    assert stat.S_IMODE(os.stat(config_module.SERVER_CONFIG_FILE).st_mode) == 0o644
+    assert load_server_config()['server_name'] == 'test'
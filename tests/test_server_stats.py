@@ -0,0 +1,55 @@
+import pytest
+from common.server_stats import SERVER_STATS_KEY, ServerStats
+from common.UserInformation import UserApply, UserInformation
+from .utils import TEST_PASSWORD
+
+
+@pytest.fixture
+def population(app_context):
+    UserInformation.store_user('alice', TEST_PASSWORD, True, False)
+    UserInformation.store_user('bob', TEST_PASSWORD, False, True)
+    UserInformation.store_user('carol', TEST_PASSWORD)
+    UserApply.push_apply('carol', 'vip', 'please')
+    UserApply.push_apply('carol', 'admin', 'please')
+    UserApply.change_apply('carol', 'admin', False)
+
+
+def test_snapshot_counts(population, redis_store):
+    stats = ServerStats.get()
+
+    assert stats['users'] == {'total': 3, 'vip': 1, 'admin': 1}
+    assert stats['applications'] == {'pending': 1, 'approved': 0, 'rejected': 1, 'total': 2}
+    assert 0 < redis_store.ttl(SERVER_STATS_KEY) <= 30
+
+
+def test_writes_do_not_invalidate_snapshot(population, redis_store, monkeypatch):
+    first = ServerStats.get()
+
+    def fail():
+        raise AssertionError('快照未过期时不应重新统计')
+
+    monkeypatch.setattr(ServerStats, '_compute', fail)
+    UserInformation.store_user('dave', TEST_PASSWORD)
+    UserApply.push_apply('dave', 'vip', 'please')
+    UserApply.change_apply('carol', 'vip', True)
+    UserInformation.delete_user('alice')
+
+    assert ServerStats.get() == first
+
+
+def test_expired_snapshot_is_recomputed(population, redis_store):
+    ServerStats.get()
+    UserInformation.store_user('dave', TEST_PASSWORD)
+    redis_store.delete(SERVER_STATS_KEY)  # 相当于TTL到期
+
+    assert ServerStats.get()['users']['total'] == 4
+
+
+def test_without_redis_computes_each_time(app, population):
+    app.config['SESSION_REDIS'], redis_store = None, app.config['SESSION_REDIS']
+    try:
+        assert ServerStats.get()['users']['total'] == 3
+        UserInformation.store_user('dave', TEST_PASSWORD)
+        assert ServerStats.get()['users']['total'] == 4
+    finally:
+        app.config['SESSION_REDIS'] = redis_store
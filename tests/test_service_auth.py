@@ -0,0 +1,100 @@
+import json
+import pytest
+from common import config as config_module
+from common import service_auth
+from common.config import load_server_config, save_server_config
+from common.service_auth import LEGACY_TOKEN_NAME, ServiceTokenAuth, hash_token
+from .utils import create_user
+
+LEGACY_TOKEN = 'legacy-plaintext-token'
+
+
+@pytest.fixture
+def tokens(app):
+    """每个测试从空的服务令牌配置开始"""
+    ServiceTokenAuth._source = None
+    save_server_config({})
+    yield
+    save_server_config({})
+    ServiceTokenAuth._source = None
+
+
+def _entries():
+    return {entry['name']: entry for entry in load_server_config()['server_settings']['service_tokens']}
+
+
+def test_legacy_token_is_hashed_on_first_load(tokens):
+    save_server_config({'server_settings': {'server_token': LEGACY_TOKEN, 'other': 1}})
+
+    assert ServiceTokenAuth.verify(LEGACY_TOKEN)
+
+    with open(config_module.SERVER_CONFIG_FILE, encoding='utf-8') as f:
+        on_disk = f.read()
+    assert LEGACY_TOKEN not in on_disk
+    settings = json.loads(on_disk)['server_settings']
+    assert settings['other'] == 1
+    assert [(e['name'], e['sha256']) for e in settings['service_tokens']] == \
+        [(LEGACY_TOKEN_NAME, hash_token(LEGACY_TOKEN))]
+    assert not ServiceTokenAuth.verify('wrong')
+
+
+def test_legacy_token_still_valid_when_save_fails(tokens, monkeypatch):
+    save_server_config({'server_settings': {'server_token': LEGACY_TOKEN}})
+    monkeypatch.setattr(service_auth, 'save_server_config', lambda config_data: False)
+
+    assert ServiceTokenAuth.verify(LEGACY_TOKEN)
+    assert load_server_config()['server_settings']['server_token'] == LEGACY_TOKEN
+
+
+def test_rotate_expires_only_named_token(tokens):
+    _, backend = ServiceTokenAuth.rotate('backend')
+    _, worker = ServiceTokenAuth.rotate('worker')
+    assert 'expires_at' not in _entries()['backend']
+
+    success, new_backend = ServiceTokenAuth.rotate('backend', grace_hours=1)
+
+    assert success
+    entries = load_server_config()['server_settings']['service_tokens']
+    by_digest = {entry['sha256']: entry for entry in entries}
+    assert 'expires_at' in by_digest[hash_token(backend)]
+    assert 'expires_at' not in by_digest[hash_token(worker)]
+    assert 'expires_at' not in by_digest[hash_token(new_backend)]
+    assert all(ServiceTokenAuth.verify(token) for token in (backend, worker, new_backend))
+
+
+def test_rotate_without_grace_drops_old_token(tokens):
+    _, old = ServiceTokenAuth.rotate('backend')
+    _, other = ServiceTokenAuth.rotate('worker')
+
+    _, new = ServiceTokenAuth.rotate('backend', grace_hours=0)
+
+    assert not ServiceTokenAuth.verify(old)
+    assert ServiceTokenAuth.verify(new)
+    assert ServiceTokenAuth.verify(other)
+
+
+def test_rotate_legacy_token_by_name(tokens):
+    save_server_config({'server_settings': {'server_token': LEGACY_TOKEN}})
+    _, other = ServiceTokenAuth.rotate('backend')
+    assert 'server_token' not in load_server_config()['server_settings']
+    assert 'expires_at' not in _entries()[LEGACY_TOKEN_NAME]
+
+    ServiceTokenAuth.rotate(LEGACY_TOKEN_NAME, grace_hours=0)
+
+    assert not ServiceTokenAuth.verify(LEGACY_TOKEN)
+    assert ServiceTokenAuth.verify(other)
+
+
+def test_user_data_with_service_token(tokens, app, client):
+    create_user(app, 'alice')
+    _, token = ServiceTokenAuth.rotate('backend')
+
+    response = client.post('/api/user_data', json={
+        'server_token': token, 'username': 'alice', 'key': 'k', 'value': 'v'
+    })
+    assert response.status_code == 200, response.get_json()
+
+    body = client.get('/api/user_data', query_string={'server_token': token, 'username': 'alice'}).get_json()
+    assert [(item['data_key'], item['data_value']) for item in body] == [('k', 'v')]
+    # 无效令牌不能读取其他用户的数据
+    assert client.get('/api/user_data', query_string={'server_token': 'wrong', 'username': 'alice'}).get_json() == []
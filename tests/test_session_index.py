@@ -0,0 +1,110 @@
+from common import session_index
+from common.db_setup import db
+from common.UserInformation import User, UserInformation
+from common.permission_cache import PermissionCache
+from common.session_index import SessionIndex
+from .utils import create_user, login
+
+
+def _session_count(app, username):
+    with app.app_context():
+        return SessionIndex.count(username)
+
+
+def _is_logged_out(client):
+    response = client.get('/home')
+    return response.status_code == 302 and response.headers['Location'].endswith('/login')
+
+
+def test_login_registers_session(app, client):
+    create_user(app, 'alice')
+    assert login(client, 'alice').status_code == 302
+    assert _session_count(app, 'alice') == 1
+    assert client.get('/home').status_code == 200
+
+
+def test_logout_everywhere_ends_all_sessions(app):
+    create_user(app, 'alice')
+    first, second = app.test_client(), app.test_client()
+    login(first, 'alice')
+    login(second, 'alice')
+    assert _session_count(app, 'alice') == 2
+
+    with app.app_context():
+        success, _ = UserInformation.logout_everywhere('alice')
+    assert success
+    assert _is_logged_out(first)
+    assert _is_logged_out(second)
+
+
+def test_force_logout_flag_is_enforced_and_cleared(app, client):
+    create_user(app, 'alice')
+    login(client, 'alice')
+    assert client.get('/home').status_code == 200
+
+    with app.app_context():
+        User.query.filter_by(username='alice').update({'force_logout': True})
+        db.session.commit()
+        PermissionCache.invalidate('alice')
+
+    assert _is_logged_out(client)
+    assert _session_count(app, 'alice') == 0
+    with app.app_context():
+        assert not User.query.filter_by(username='alice').first().force_logout
+
+    # 标记已清除，可以重新登录
+    login(client, 'alice')
+    assert client.get('/home').status_code == 200
+
+
+def test_logout_revokes_only_current_session(app):
+    create_user(app, 'alice')
+    first, second = app.test_client(), app.test_client()
+    login(first, 'alice')
+    login(second, 'alice')
+
+    first.get('/logout')
+    assert _session_count(app, 'alice') == 1
+    assert _is_logged_out(first)
+    assert second.get('/home').status_code == 200
+
+
+def test_deleted_user_is_logged_out(app, client):
+    create_user(app, 'alice')
+    login(client, 'alice')
+
+    with app.app_context():
+        UserInformation.delete_user('alice')
+    assert _is_logged_out(client)
+
+
+def test_validated_cache_is_bounded_lru(app_context, monkeypatch):
+    monkeypatch.setattr(session_index, 'SESSION_INDEX_MAX_USERS', 3)
+    sids = {name: SessionIndex.register(name) for name in ('a', 'b', 'c', 'd')}
+
+    for name in ('a', 'b', 'c'):
+        assert SessionIndex.is_active(name, sids[name], version=0)
+    # 最近校验过的a不会被淘汰
+    assert SessionIndex.is_active('a', sids['a'], version=0)
+    assert SessionIndex.is_active('d', sids['d'], version=0)
+
+    assert list(SessionIndex._validated) == ['c', 'a', 'd']
+
+
+def test_validated_entry_is_dropped_with_its_last_session(app_context):
+    first, second = SessionIndex.register('alice'), SessionIndex.register('alice')
+    assert SessionIndex.is_active('alice', first, version=0)
+    assert SessionIndex.is_active('alice', second, version=0)
+
+    SessionIndex.revoke('alice', first)
+    assert 'alice' in SessionIndex._validated
+    SessionIndex.revoke('alice', second)
+    assert 'alice' not in SessionIndex._validated
+
+
+def test_version_change_replaces_validated_sids(app_context):
+    first, second = SessionIndex.register('alice'), SessionIndex.register('alice')
+    assert SessionIndex.is_active('alice', first, version=0)
+    assert SessionIndex.is_active('alice', second, version=1)
+
+    assert SessionIndex._validated['alice'] == (1, {second})
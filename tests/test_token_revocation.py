@@ -0,0 +1,82 @@
+import time
+import pytest
+import redis
+from types import SimpleNamespace
+from common import token_denylist, token_manager
+from common.UserInformation import UserApply, UserInformation
+from .utils import create_user, create_client, issue_token, verify_token
+
+
+@pytest.fixture
+def issued(app, client):
+    """vip用户alice持有一个有效令牌"""
+    create_user(app, 'alice', is_vip=True)
+    client_id, client_secret = create_client(app)
+    token = issue_token(client, client_id, client_secret, 'alice')
+    assert verify_token(client, client_id, client_secret, token).status_code == 200
+    return client_id, client_secret, token
+
+
+def test_deleted_user_token_is_revoked(app, client, issued):
+    with app.app_context():
+        UserInformation.delete_user('alice')
+    assert verify_token(client, *issued).status_code == 401
+
+
+def test_logout_everywhere_revokes_tokens(app, client, issued):
+    with app.app_context():
+        UserInformation.logout_everywhere('alice')
+    assert verify_token(client, *issued).status_code == 401
+
+
+def test_vip_removal_revokes_tokens(app, client, issued):
+    with app.app_context():
+        result = UserApply.change_apply('alice', 'vip', False, need_entry=False)
+    assert result[0], result
+    assert verify_token(client, *issued).status_code == 401
+
+
+def test_deactivated_client_tokens_stay_revoked(app, client, issued):
+    client_id, _, _ = issued
+    for is_active in (False, True):
+        with app.app_context():
+            success, message, _ = UserInformation.manage_oauth_client(
+                'update', client_id=client_id, name='test',
+                redirect_uri='https://example.com/callback', is_active=is_active
+            )
+        assert success, message
+    assert verify_token(client, *issued).status_code == 401
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """令牌签发和撤销共用的可手动设置的时钟，从某一整秒的0.2秒开始"""
+    now = [int(time.time()) + 0.2]
+    fake_time = SimpleNamespace(time=lambda: now[0])
+    monkeypatch.setattr(token_manager, 'time', fake_time)
+    monkeypatch.setattr(token_denylist, 'time', fake_time)
+    return now
+
+
+def test_relogin_in_same_second_after_logout_everywhere(app, client, issued, clock):
+    client_id, client_secret, _ = issued
+    old_token = issue_token(client, client_id, client_secret, 'alice')
+
+    clock[0] += 0.3
+    with app.app_context():
+        UserInformation.logout_everywhere('alice')
+    clock[0] += 0.3
+    new_token = issue_token(client, client_id, client_secret, 'alice')
+
+    assert verify_token(client, client_id, client_secret, old_token).status_code == 401
+    assert verify_token(client, client_id, client_secret, new_token).status_code == 200
+
+
+@pytest.mark.parametrize('fail_open, expected', [(True, 200), (False, 401)])
+def test_denylist_read_failure(app, client, issued, redis_store, monkeypatch, fail_open, expected):
+    def broken_mget(keys, *args):
+        raise redis.ConnectionError('down')
+
+    monkeypatch.setitem(app.config, 'OAUTH_DENYLIST_FAIL_OPEN', fail_open)
+    monkeypatch.setattr(redis_store, 'mget', broken_mget)
+    assert verify_token(client, *issued).status_code == expected
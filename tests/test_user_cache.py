@@ -0,0 +1,29 @@
+from common.UserInformation import UserInformation
+from common.user_cache import UserInfoCache
+from .utils import create_user
+
+
+def test_stale_read_is_not_cached_after_invalidate(app_context):
+    cached, version = UserInfoCache.get('alice')
+    assert cached is None
+
+    # 读取数据库期间用户信息被修改并失效
+    UserInfoCache.invalidate('alice')
+    UserInfoCache.set('alice', {'username': 'alice', 'vip': False}, version)
+
+    assert UserInfoCache.get('alice')[0] is None
+
+
+def test_unchanged_version_is_cached(app_context):
+    _, version = UserInfoCache.get('alice')
+    UserInfoCache.set('alice', {'username': 'alice', 'vip': True}, version)
+    assert UserInfoCache.get('alice')[0] == {'username': 'alice', 'vip': True}
+
+
+def test_profile_update_is_visible(app, app_context):
+    create_user(app, 'alice')
+    assert UserInformation.get_user_info('alice')['bio'] is None
+    assert UserInfoCache.get('alice')[0] is not None
+
+    UserInformation.update_user_profile('alice', {'bio': 'hello'})
+    assert UserInformation.get_user_info('alice')['bio'] == 'hello'
@@ -0,0 +1,93 @@
+import pytest
+from models import UserData
+from .utils import create_user, login
+
+BULK_URL = '/api/user_data/bulk'
+
+
+@pytest.fixture
+def alice(app, client):
+    create_user(app, 'alice')
+    login(client, 'alice')
+    return client
+
+
+def _values(app, username):
+    with app.app_context():
+        return {row.data_key: row.data_value for row in UserData.query.filter_by(user_id=username)}
+
+
+def test_requires_login(client):
+    assert client.post(BULK_URL, json={'operations': []}).status_code == 401
+
+
+def test_post_reports_each_operation(app, alice):
+    alice.post(BULK_URL, json={'operations': [{'key': 'a', 'value': '1', 'action': 'add'}]})
+
+    response = alice.post(BULK_URL, json={'operations': [
+        {'key': 'a', 'value': '2', 'action': 'update'},
+        {'key': 'b', 'value': {'x': 1}, 'action': 'add'},
+        {'key': 'a', 'value': '3', 'action': 'add'},
+        {'key': 'missing', 'value': '', 'action': 'update'},
+        {'key': 'missing', 'value': '', 'action': 'get'},
+        {'key': 'a', 'value': '', 'action': 'get'},
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success_count'] == 3
+    assert body['total_count'] == 6
+    assert body['message'] == '批量操作完成，成功 3 条，失败 3 条'
+    assert body['failed_operations'] == [
+        {'key': 'a', 'error': '数据已存在'},
+        {'key': 'missing', 'error': '数据不存在'},
+        {'key': 'missing', 'error': '数据不存在'},
+    ]
+    assert _values(app, 'alice') == {'a': '2', 'b': '{"x": 1}'}
+
+
+def test_non_string_key_fails_only_its_operation(app, alice):
+    response = alice.post(BULK_URL, json={'operations': [
+        {'key': ['a'], 'value': '', 'action': 'get'},
+        {'key': {'k': 1}, 'value': '', 'action': 'get'},
+        {'key': 'a', 'value': '1', 'action': 'add'},
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success_count'] == 1
+    assert body['failed_operations'] == [
+        {'key': ['a'], 'error': '键名必须是字符串'},
+        {'key': {'k': 1}, 'error': '键名必须是字符串'},
+    ]
+    assert _values(app, 'alice') == {'a': '1'}
+
+
+def test_post_rejects_invalid_payload(alice):
+    assert alice.post(BULK_URL, json={}).status_code == 400
+    assert alice.post(BULK_URL, json={'operations': {}}).status_code == 400
+    response = alice.post(BULK_URL, json={'operations': [{'key': 'a', 'action': 'add'}]})
+    assert response.status_code == 400
+    response = alice.post(BULK_URL, json={'operations': [{'key': 'k' * 51, 'value': '', 'action': 'add'}]})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('payload', [
+    {'operations': [{'key': 'a', 'action': 'delete'}, {'key': 'missing', 'action': 'delete'},
+                    {'key': ['x'], 'action': 'delete'}]},
+    ['a', 'missing', ['x']],
+])
+def test_delete_reports_each_key(app, alice, payload):
+    alice.post(BULK_URL, json={'operations': [
+        {'key': 'a', 'value': '1', 'action': 'add'},
+        {'key': 'b', 'value': '2', 'action': 'add'},
+    ]})
+
+    response = alice.delete(BULK_URL, json=payload)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success_count'] == 1
+    assert body['total_count'] == 3
+    assert sorted(failure['error'] for failure in body['failed_operations']) == ['数据不存在', '键名必须是字符串']
+    assert _values(app, 'alice') == {'b': '2'}
@@ -0,0 +1,70 @@
+import json
+import pytest
+from common.db_setup import db
+from models import UserData
+from .utils import create_user, login
+
+
+@pytest.fixture
+def admin(app, client):
+    """管理员已登录，alice和bob各有若干条数据"""
+    create_user(app, 'root', is_admin=True)
+    create_user(app, 'alice')
+    create_user(app, 'bob')
+    with app.app_context():
+        for i in range(5):
+            db.session.add(UserData(user_id='alice' if i % 2 == 0 else 'bob',
+                                    data_key=f'k{i}', data_value=json.dumps({'i': i})))
+        db.session.commit()
+    login(client, 'root')
+    return client
+
+
+def _pages(client, **params):
+    keys, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        body = client.get('/api/user_data', query_string=query).get_json()
+        keys.extend(item['data_key'] for item in body['items'])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return keys, pages
+
+
+def test_keyset_pages_cover_all_rows_in_id_order(admin):
+    assert _pages(admin, limit=2) == (['k0', 'k1', 'k2', 'k3', 'k4'], 3)
+
+
+def test_page_items_are_parsed(admin):
+    body = admin.get('/api/user_data', query_string={'limit': 1}).get_json()
+    assert body['limit'] == 1
+    assert body['items'][0]['data_value'] == {'i': 0}
+    assert body['items'][0]['user_id'] == 'alice'
+
+
+def test_pages_filtered_by_username(admin):
+    assert _pages(admin, limit=2, username='alice') == (['k0', 'k2', 'k4'], 2)
+
+
+def test_invalid_page_args(admin):
+    assert admin.get('/api/user_data', query_string={'limit': 'x'}).status_code == 400
+
+
+def test_ndjson_stream(admin):
+    response = admin.get('/api/user_data', query_string={'format': 'ndjson', 'username': 'bob'})
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row['data_key'], row['data_value']) for row in rows] == [('k1', {'i': 1}), ('k3', {'i': 3})]
+
+
+def test_unpaged_request_keeps_array_format(admin):
+    body = admin.get('/api/user_data').get_json()
+    assert [item['data_key'] for item in body] == ['k0', 'k1', 'k2', 'k3', 'k4']
+
+
+def test_manage_page_is_paged(admin):
+    response = admin.get('/user_data_manage', query_string={'limit': 2})
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'k1' in page and 'k2' not in page
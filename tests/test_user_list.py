@@ -0,0 +1,70 @@
+import pytest
+from datetime import datetime
+from common.db_setup import db
+from common.UserInformation import User, UserInformation
+from .utils import create_user, login, query_plans
+
+EMOJI_NAME = 'ab\U0001F600'
+
+
+@pytest.fixture
+def users(app):
+    for name, kwargs in [('ab', {}), (EMOJI_NAME, {'is_vip': True}), ('abc', {'is_admin': True}),
+                         ('ac', {'is_vip': True}), ('b', {})]:
+        create_user(app, name, **kwargs)
+    with app.app_context():
+        for day, name in enumerate(['ab', EMOJI_NAME, 'abc', 'ac', 'b'], start=1):
+            User.query.filter_by(username=name).update({'register_time': datetime(2024, 1, day)})
+        db.session.commit()
+
+
+def _all_pages(**filters):
+    names, cursor = [], 0
+    while True:
+        page, cursor = UserInformation.list_users(cursor=cursor, **filters)
+        names.extend(user['username'] for user in page)
+        if cursor is None:
+            return names
+
+
+def test_pages_by_id(users, app_context):
+    assert _all_pages(limit=2) == ['ab', EMOJI_NAME, 'abc', 'ac', 'b']
+
+
+def test_filters(users, app_context):
+    assert _all_pages(limit=1, vip=True) == [EMOJI_NAME, 'ac']
+    assert _all_pages(admin=True) == ['abc']
+    assert _all_pages(registered_from='2024-01-02 00:00:00', registered_to='2024-01-04 00:00:00') == \
+        [EMOJI_NAME, 'abc', 'ac']
+
+
+@pytest.mark.parametrize('limit', [1, 2, 10])
+def test_prefix_pages_by_username(users, app_context, limit):
+    # 码点大于U+FFFF的字符紧跟在前缀之后也要包含在内
+    assert _all_pages(limit=limit, username_prefix='ab') == ['ab', 'abc', EMOJI_NAME]
+
+
+def test_prefix_listing_is_index_only(users, app, app_context):
+    plans = query_plans(db.engines['user_db'],
+                        lambda: UserInformation.list_users(limit=2, cursor='ab', username_prefix='ab'))
+    assert plans
+    for plan in plans:
+        assert 'TEMP B-TREE' not in plan
+        assert 'INDEX' in plan
+
+
+@pytest.mark.parametrize('prefix, expected', [
+    ('ab', 'ac'),
+    ('a\U0010FFFF', 'b'),
+    ('a\ud7ff', 'a\ue000'),
+    ('\U0010FFFF', None),
+])
+def test_prefix_upper_bound(prefix, expected):
+    assert UserInformation._prefix_upper_bound(prefix) == expected
+
+
+def test_user_manage_page_links_next_page(users, app, client):
+    create_user(app, 'root', is_admin=True)
+    login(client, 'root')
+    page = client.get('/user_manage', query_string={'prefix': 'ab', 'limit': 2}).get_data(as_text=True)
+    assert 'cursor=abc' in page
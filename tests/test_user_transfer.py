@@ -0,0 +1,96 @@
+import io
+import json
+import pytest
+from datetime import datetime
+from common.db_setup import db
+from common.UserInformation import User, UserInformation
+from common.user_transfer import UserTransfer, read_records
+from .utils import TEST_PASSWORD, create_user, login
+
+
+def _export(fmt, include_hash=True):
+    return ''.join(UserTransfer.export_users(fmt, include_hash=include_hash))
+
+
+def _import(text, fmt, **kwargs):
+    return UserTransfer.import_users(read_records(io.StringIO(text), fmt), workers=1, **kwargs)
+
+
+@pytest.fixture
+def users(app):
+    create_user(app, 'alice', is_vip=True)
+    create_user(app, '李雷', is_admin=True)
+    with app.app_context():
+        User.query.filter_by(username='alice').update({
+            'register_time': datetime(2024, 1, 2, 3, 4, 5), 'email': 'alice@example.com', 'bio': 'a,"b"\nc'
+        })
+        db.session.commit()
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_round_trip_keeps_users_and_hashes(users, app_context, fmt):
+    exported = _export(fmt)
+    hashes = dict(User.query.with_entities(User.username, User.password_hash))
+    User.query.delete()
+    db.session.commit()
+
+    stats = _import(exported, fmt, chunk_size=1)
+
+    assert stats == {'imported': 2, 'skipped': 0, 'failed': 0, 'errors': []}
+    assert _export(fmt) == exported
+    # 迁移时直接使用导出的哈希，不重新哈希
+    assert dict(User.query.with_entities(User.username, User.password_hash)) == hashes
+    assert UserInformation.verify_user('alice', TEST_PASSWORD)
+
+
+def test_export_without_hash(users, app_context):
+    rows = [json.loads(line) for line in _export('ndjson', include_hash=False).splitlines()]
+    assert [row['username'] for row in rows] == ['alice', '李雷']
+    assert 'password_hash' not in rows[0]
+    assert rows[0]['register_time'] == '2024-01-02 03:04:05'
+    assert rows[0]['vip'] is True and rows[1]['admin'] is True
+
+
+def test_import_hashes_plaintext_passwords(app_context):
+    text = 'username,password,vip\nbob,pw-bob,1\ncarol,pw-carol,false\n'
+
+    stats = _import(text, 'csv')
+
+    assert stats['imported'] == 2
+    assert UserInformation.verify_user('bob', 'pw-bob') == {'username': 'bob', 'vip': True, 'admin': False}
+    assert UserInformation.verify_user('carol', 'pw-carol')['vip'] is False
+
+
+def test_import_reports_invalid_and_duplicate_lines(users, app_context):
+    text = '\n'.join([
+        json.dumps({'username': 'alice', 'password': 'x'}),
+        json.dumps({'username': 'dave', 'password': 'x'}),
+        json.dumps({'username': 'dave', 'password': 'y'}),
+        json.dumps({'username': 'erin'}),
+        '{broken',
+        json.dumps({'username': 'frank', 'password': 'x', 'last_login': 'yesterday'}),
+    ])
+
+    stats = _import(text, 'ndjson')
+
+    assert (stats['imported'], stats['skipped'], stats['failed']) == (1, 2, 3)
+    assert [line_no for line_no, _ in stats['errors']] == [3, 4, 5, 6, 1]
+    assert User.query.filter_by(username='dave').count() == 1
+
+
+def test_dry_run_writes_nothing(app_context):
+    stats = _import('username,password\nbob,pw\n', 'csv', dry_run=True)
+    assert stats['imported'] == 1
+    assert User.query.count() == 0
+
+
+def test_export_endpoint_requires_admin(users, app, client):
+    login(client, 'alice')
+    assert client.get('/api/users/export').status_code == 403
+
+    login(client, '李雷')
+    response = client.get('/api/users/export', query_string={'format': 'csv'})
+    assert response.status_code == 200
+    header = response.get_data(as_text=True).splitlines()[0]
+    assert header.startswith('username,') and 'password_hash' not in header
+    assert client.get('/api/users/export', query_string={'format': 'xml'}).status_code == 400
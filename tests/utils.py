@@ -0,0 +1,117 @@
+"""测试辅助函数"""
+
+import fakeredis
+from flask import Flask
+
+# 所有测试共用的Redis，每个测试前清空
+fake_redis = fakeredis.FakeRedis()
+
+TEST_PASSWORD = 'secret-password'
+
+
+def sqlite_urls(directory):
+    """默认数据库和各bind的临时SQLite文件"""
+    return (
+        f'sqlite:///{directory}/user_management.db',
+        {
+            'user_db': f'sqlite:///{directory}/user.db',
+            'oauth_db': f'sqlite:///{directory}/oauth.db',
+            'apply_db': f'sqlite:///{directory}/apply.db',
+        }
+    )
+
+
+def create_user(app, username, password=TEST_PASSWORD, **kwargs):
+    """创建用户"""
+    from common.UserInformation import UserInformation
+
+    with app.app_context():
+        success, message = UserInformation.store_user(username, password, **kwargs)
+    assert success, message
+
+
+def login(client, username, password=TEST_PASSWORD):
+    """通过登录页面登录，返回响应"""
+    return client.post('/login', data={'username': username, 'password': password})
+
+
+def create_db_app(directory, **config):
+    """
+    只初始化数据库的独立应用，用于测试不同的数据库布局
+
+    Args:
+        directory: 存放SQLite文件的临时目录
+        config: 覆盖的配置项
+    """
+    from common.config import TestingConfig
+    from common.db_setup import init_db
+
+    database_uri, binds = sqlite_urls(directory)
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        SQLALCHEMY_BINDS=binds,
+        PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+        PASSWORD_HASH_WORKERS=1,
+    )
+    app.config.update(config)
+    init_db(app)
+    return app
+
+
+def create_client(app, created_by='alice'):
+    """创建OAuth客户端，返回(client_id, client_secret)"""
+    from common.UserInformation import UserInformation
+
+    with app.app_context():
+        success, message, client = UserInformation.manage_oauth_client(
+            'create', name='test', redirect_uri='https://example.com/callback', created_by=created_by
+        )
+        assert success, message
+        return client.client_id, client.client_secret
+
+
+def client_headers(client_id, client_secret):
+    return {'Client-ID': client_id, 'Client-Secret': client_secret}
+
+
+def issue_token(client, client_id, client_secret, username, password=TEST_PASSWORD):
+    """通过密码模式获取访问令牌"""
+    response = client.post('/oauth/token', headers=client_headers(client_id, client_secret), json={
+        'grant_type': 'password', 'username': username, 'password': password
+    })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['access_token']
+
+
+def verify_token(client, client_id, client_secret, token, **params):
+    """调用 /oauth/verify，返回响应"""
+    return client.post('/oauth/verify', headers=client_headers(client_id, client_secret),
+                       json={'token': token, **params})
+
+
+def query_plans(engine, func):
+    """
+    执行func，返回其间对engine发出的每条SELECT的查询计划
+
+    Returns:
+        list: 每条SELECT的 EXPLAIN QUERY PLAN 结果拼接成的字符串
+    """
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    with engine.connect() as conn:
+        return [' '.join(row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+                for statement, parameters in statements]
@@ -0,0 +1,88 @@
+"""
+用户批量导入导出脚本
+
+此脚本用于：
+- 从CSV/NDJSON文件批量导入用户(密码并行哈希，按块事务插入)
+- 将用户流式导出为CSV/NDJSON，可选包含密码哈希用于迁移
+
+CSV需包含表头，至少有 username 和 password(或 password_hash) 列。
+
+用法：
+    python transfer_users.py import users.csv [--format csv|ndjson] [--chunk-size 1000] [--workers N] [--dry-run]
+    python transfer_users.py export users.ndjson [--format csv|ndjson] [--include-hash]
+"""
+
+import os
+import sys
+import logging
+import argparse
+from flask import Flask
+from common.config import init_app
+from common.db_setup import db, init_db
+from common.user_transfer import UserTransfer, read_records, TRANSFER_CHUNK_SIZE
+
+# 创建临时Flask应用
+app = Flask(__name__)
+init_app(app)
+init_db(app)
+
+
+def _guess_format(path, fmt):
+    """未指定格式时按扩展名判断"""
+    if fmt:
+        return fmt
+    return 'csv' if os.path.splitext(path)[1].lower() == '.csv' else 'ndjson'
+
+
+def run_import(args):
+    fmt = _guess_format(args.file, args.format)
+    with app.app_context(), open(args.file, encoding='utf-8-sig', newline='') as f:
+        stats = UserTransfer.import_users(
+            read_records(f, fmt),
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            dry_run=args.dry_run
+        )
+
+    for line_no, error in stats['errors'][:args.max_errors]:
+        print(f"第 {line_no} 行: {error}")
+    if len(stats['errors']) > args.max_errors:
+        print(f"... 另有 {len(stats['errors']) - args.max_errors} 条错误未显示")
+    action = "可导入" if args.dry_run else "已导入"
+    print(f"{action} {stats['imported']} 个用户，跳过 {stats['skipped']} 个，失败 {stats['failed']} 个")
+    return 1 if stats['failed'] else 0
+
+
+def run_export(args):
+    fmt = _guess_format(args.file, args.format)
+    count = 0
+    with app.app_context(), open(args.file, 'w', encoding='utf-8', newline='') as f:
+        for chunk in UserTransfer.export_users(fmt, include_hash=args.include_hash):
+            f.write(chunk)
+            count += chunk.count('\n')
+    if fmt == 'csv':
+        count -= 1  # 表头
+    print(f"已导出 {count} 个用户到 {args.file}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='用户批量导入导出')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='从文件导入用户')
+    import_parser.add_argument('file')
+    import_parser.add_argument('--format', choices=['csv', 'ndjson'], default=None)
+    import_parser.add_argument('--chunk-size', type=int, default=TRANSFER_CHUNK_SIZE, help='每个事务插入的用户数')
+    import_parser.add_argument('--workers', type=int, default=None, help='哈希进程数，默认CPU核数')
+    import_parser.add_argument('--dry-run', action='store_true', help='只校验，不写入数据库')
+    import_parser.add_argument('--max-errors', type=int, default=50, help='最多显示的错误条数')
+
+    export_parser = subparsers.add_parser('export', help='导出用户到文件')
+    export_parser.add_argument('file')
+    export_parser.add_argument('--format', choices=['csv', 'ndjson'], default=None)
+    export_parser.add_argument('--include-hash', action='store_true', help='包含密码哈希(用于迁移)')
+
+    args = parser.parse_args()
+    sys.exit(run_import(args) if args.command == 'import' else run_export(args))